@@ -42,6 +42,10 @@ import app.models.user            # noqa: F401
 import app.models.question        # noqa: F401
 import app.models.response        # noqa: F401
 import app.models.enumerator      # noqa: F401
+import app.models.aggregate       # noqa: F401
+import app.models.llm_cache       # noqa: F401
+import app.models.job             # noqa: F401
+import app.models.audio_upload    # noqa: F401
 
 # If you add these models in the future, import here as well:
 # import app.models.translation   # for multilingual
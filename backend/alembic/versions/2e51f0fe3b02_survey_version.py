@@ -0,0 +1,25 @@
+"""survey version
+
+Revision ID: 2e51f0fe3b02
+Revises: ac9df4903cde
+Create Date: 2026-10-18 11:12:54.630281
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2e51f0fe3b02'
+down_revision = 'ac9df4903cde'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('surveys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('surveys', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,44 @@
+"""llm cache entries
+
+Revision ID: 5c7d3e9a1f24
+Revises: 2e51f0fe3b02
+Create Date: 2026-10-18 11:20:44.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5c7d3e9a1f24'
+down_revision = '2e51f0fe3b02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('llm_cache_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('normalized_prompt', sa.Text(), nullable=False),
+    sa.Column('num_questions', sa.Integer(), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('signature', sa.JSON(), nullable=True),
+    sa.Column('questions', sa.JSON(), nullable=False),
+    sa.Column('generation_seconds', sa.Float(), nullable=True),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cache_key')
+    )
+    with op.batch_alter_table('llm_cache_entries', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_llm_cache_entries_id'), ['id'], unique=False)
+        batch_op.create_index('ix_llm_cache_entries_lookup', ['model', 'num_questions', 'expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('llm_cache_entries', schema=None) as batch_op:
+        batch_op.drop_index('ix_llm_cache_entries_lookup')
+        batch_op.drop_index(batch_op.f('ix_llm_cache_entries_id'))
+
+    op.drop_table('llm_cache_entries')
@@ -0,0 +1,46 @@
+"""response lookup indexes
+
+Revision ID: 63aee6e75b3b
+Revises: 22e1e4726aaa
+Create Date: 2026-10-18 10:02:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '63aee6e75b3b'
+down_revision = '22e1e4726aaa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep only the latest answer per (survey, respondent, question) so the
+    # unique index can be built on databases filled by the old read-then-write path
+    op.execute(sa.text(
+        "DELETE FROM responses WHERE id NOT IN ("
+        " SELECT keep_id FROM ("
+        "  SELECT MAX(id) AS keep_id FROM responses"
+        "  GROUP BY survey_id, respondent_id, question_id"
+        " ) AS latest"
+        ")"
+    ))
+
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_responses_survey_respondent_question',
+            ['survey_id', 'respondent_id', 'question_id'],
+            unique=True,
+        )
+        batch_op.create_index(
+            'ix_responses_survey_created_at',
+            ['survey_id', 'created_at'],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.drop_index('ix_responses_survey_created_at')
+        batch_op.drop_index('ix_responses_survey_respondent_question')
@@ -0,0 +1,40 @@
+"""response answer codes
+
+Revision ID: a3c5e7f9b142
+Revises: e6f2a8c4d913
+Create Date: 2026-10-18 15:31:47.902654
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f9b142'
+down_revision = 'e6f2a8c4d913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are coded by: python -m app.services.response_service --backfill-codes
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('answer_code', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('answer_mask', sa.BigInteger(), nullable=True))
+        batch_op.create_index(
+            'ix_responses_survey_question_code',
+            ['survey_id', 'question_id', 'answer_code'],
+            unique=False,
+        )
+        batch_op.create_index(
+            'ix_responses_survey_question_mask',
+            ['survey_id', 'question_id', 'answer_mask'],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.drop_index('ix_responses_survey_question_mask')
+        batch_op.drop_index('ix_responses_survey_question_code')
+        batch_op.drop_column('answer_mask')
+        batch_op.drop_column('answer_code')
@@ -0,0 +1,45 @@
+"""survey question aggregates
+
+Revision ID: ac9df4903cde
+Revises: 63aee6e75b3b
+Create Date: 2026-10-18 10:31:07.402915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'ac9df4903cde'
+down_revision = '63aee6e75b3b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('survey_question_aggregates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('survey_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(length=32), nullable=False),
+    sa.Column('bucket', sa.String(length=255), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('survey_question_aggregates', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_survey_question_aggregates_id'), ['id'], unique=False)
+        batch_op.create_index(
+            'ix_survey_question_aggregates_bucket',
+            ['survey_id', 'question_id', 'dimension', 'bucket'],
+            unique=True,
+        )
+    # Existing responses are folded in with the aggregate rebuild command
+
+
+def downgrade():
+    with op.batch_alter_table('survey_question_aggregates', schema=None) as batch_op:
+        batch_op.drop_index('ix_survey_question_aggregates_bucket')
+        batch_op.drop_index(batch_op.f('ix_survey_question_aggregates_id'))
+
+    op.drop_table('survey_question_aggregates')
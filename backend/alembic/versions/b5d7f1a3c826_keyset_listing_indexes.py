@@ -0,0 +1,52 @@
+"""keyset listing indexes
+
+Revision ID: b5d7f1a3c826
+Revises: a3c5e7f9b142
+Create Date: 2026-10-18 16:48:03.517290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b5d7f1a3c826'
+down_revision = 'a3c5e7f9b142'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Listings page on (created_at, id); the id tiebreaker belongs in the index too
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.drop_index('ix_responses_survey_created_at')
+        batch_op.create_index(
+            'ix_responses_survey_created_at',
+            ['survey_id', 'created_at', 'id'],
+            unique=False,
+        )
+        batch_op.create_index(
+            'ix_responses_survey_status_created_at',
+            ['survey_id', 'validation_status', 'created_at', 'id'],
+            unique=False,
+        )
+
+    with op.batch_alter_table('surveys', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_surveys_created_at',
+            ['created_at', 'id'],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('surveys', schema=None) as batch_op:
+        batch_op.drop_index('ix_surveys_created_at')
+
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.drop_index('ix_responses_survey_status_created_at')
+        batch_op.drop_index('ix_responses_survey_created_at')
+        batch_op.create_index(
+            'ix_responses_survey_created_at',
+            ['survey_id', 'created_at'],
+            unique=False,
+        )
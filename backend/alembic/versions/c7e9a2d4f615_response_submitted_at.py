@@ -0,0 +1,26 @@
+"""response submitted_at
+
+Revision ID: c7e9a2d4f615
+Revises: b5d7f1a3c826
+Create Date: 2026-10-19 09:12:40.215883
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c7e9a2d4f615'
+down_revision = 'b5d7f1a3c826'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable, no default: rows written before this column compare as older than any submit
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('submitted_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.drop_column('submitted_at')
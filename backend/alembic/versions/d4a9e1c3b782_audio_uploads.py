@@ -0,0 +1,40 @@
+"""audio uploads
+
+Revision ID: d4a9e1c3b782
+Revises: b81f42c6d0e7
+Create Date: 2026-10-18 13:05:51.207734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd4a9e1c3b782'
+down_revision = 'b81f42c6d0e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('audio_uploads',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('survey_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('respondent_id', sa.String(length=100), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('total_bytes', sa.BigInteger(), nullable=True),
+    sa.Column('received_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=True),
+    sa.Column('uri', sa.String(length=255), nullable=True),
+    sa.Column('audio_metadata', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('audio_uploads')
@@ -0,0 +1,25 @@
+"""audio upload answer index
+
+Revision ID: e2b6c8f1a904
+Revises: c7e9a2d4f615
+Create Date: 2026-10-18 14:27:03.518240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6c8f1a904'
+down_revision = 'c7e9a2d4f615'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('audio_uploads', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_audio_uploads_survey_respondent_question'), ['survey_id', 'respondent_id', 'question_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('audio_uploads', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_audio_uploads_survey_respondent_question'))
@@ -0,0 +1,36 @@
+"""response updated_at
+
+Revision ID: e6f2a8c4d913
+Revises: d4a9e1c3b782
+Create Date: 2026-10-18 14:05:12.408117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e6f2a8c4d913'
+down_revision = 'd4a9e1c3b782'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite cannot ADD COLUMN with a CURRENT_TIMESTAMP default, so rebuild the table there
+    with op.batch_alter_table('responses', schema=None, recreate='always') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True))
+
+    op.execute(sa.text("UPDATE responses SET updated_at = created_at"))
+
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_responses_survey_updated_at',
+            ['survey_id', 'updated_at'],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.drop_index('ix_responses_survey_updated_at')
+        batch_op.drop_column('updated_at')
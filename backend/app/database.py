@@ -1,6 +1,7 @@
 # backend/app/database.py
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -10,13 +11,43 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL", "sqlite:///./survey.db")
 
+def _async_url(url: str) -> str:
+    """Map a sync URL onto its async driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql+psycopg2:", "postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg:", 1)
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("SQLALCHEMY_ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+
+def _pool_options(url: str) -> dict:
+    """Pool sizing from env; SQLite keeps SQLAlchemy's defaults (one file lock anyway)."""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),   # seconds
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),     # seconds
+    }
+
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-    pool_pre_ping=True  # robust for cloud/docker/advanced usage
+    pool_pre_ping=True,  # robust for cloud/docker/advanced usage
+    **_pool_options(DATABASE_URL),
+)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    **_pool_options(ASYNC_DATABASE_URL),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # Dependency for FastAPI routes
@@ -26,3 +57,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency for async FastAPI routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
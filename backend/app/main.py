@@ -1,11 +1,16 @@
 import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+import importlib
 import os
 
 # Absolute imports for app modules
-from app.routes import survey_routes, voice_routes, analytics_routes, response_routes
-from app.database import Base, engine
+from app.routes import survey_routes, voice_routes, analytics_routes, response_routes, job_routes
+from app.database import Base, async_engine, engine
+from app.services import job_service, metrics_service, profiling_service, write_buffer_service
 from app.models import survey, question, response, user, enumerator
 
 # Setup basic logging
@@ -14,7 +19,19 @@ logging.basicConfig(
     format="%(asctime)s | %(levelname)s | %(message)s",
 )
 
-app = FastAPI(title="AI Smart Survey Tool")
+# What a process does about the schema when it starts:
+#   create  - create missing tables from the models (local development)
+#   migrate - alembic upgrade head
+#   check   - fail fast if a model table is missing
+#   skip    - nothing; a release step or the gunicorn master already did it
+DB_SCHEMA = os.getenv("DB_SCHEMA", "create")
+SCHEMA_MODES = ("create", "migrate", "check", "skip")
+
+# Voice/LLM dependencies, imported on first use. The preload profile imports
+# them once in the gunicorn master so forked workers share the pages.
+HEAVY_MODULES = ("openai", "gtts", "speech_recognition")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
 
 # CORS setup
 origins = [
@@ -24,44 +41,111 @@ origins = [
     "https://ai-smart-survey-tool-szm5.onrender.com",    # Replace with your actual Vercel domain after first deploy
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def prepare_database(mode: str = DB_SCHEMA) -> None:
+    """Bring the schema up (or verify it) once, before serving."""
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"DB_SCHEMA must be one of {', '.join(SCHEMA_MODES)}, not {mode!r}")
+    if mode == "create":
+        logging.info("Creating missing tables...")
+        Base.metadata.create_all(bind=engine)
+        logging.info("Tables ready")
+    elif mode == "migrate":
+        from alembic import command
+        from alembic.config import Config
+
+        config = Config(str(BACKEND_DIR / "alembic.ini"))
+        config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+        logging.info("Running alembic upgrade head...")
+        command.upgrade(config, "head")
+    elif mode == "check":
+        from sqlalchemy import inspect
+
+        missing = sorted(set(Base.metadata.tables) - set(inspect(engine).get_table_names()))
+        if missing:
+            raise RuntimeError(f"Missing tables: {', '.join(missing)}; run `alembic upgrade head`")
+        logging.info("Schema check passed")
+    # Connections opened here must not be inherited by forked workers
+    engine.dispose()
+
+def preload_heavy_modules() -> None:
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logging.warning(f"Preload skipped {name}: {e}")
+
+def reset_after_fork() -> None:
+    """In a freshly forked worker: drop pooled connections inherited from the parent."""
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+def create_app(schema: str = DB_SCHEMA) -> FastAPI:
+    """
+    Build the API. `schema` is the DB_SCHEMA mode this process runs at
+    startup; multi-worker servers pass "skip" and prepare the database once.
+    """
+    if schema not in SCHEMA_MODES:
+        raise ValueError(f"schema must be one of {', '.join(SCHEMA_MODES)}, not {schema!r}")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        prepare_database(schema)
+        # Optional worker threads in this process; dedicated workers run `python -m app.services.job_service`
+        job_service.start_inprocess_worker()
+        # RESPONSE_WRITE_BEHIND: replays orphaned journal segments, then starts the flusher
+        write_buffer_service.start()
+        yield
+        # Commit whatever is still buffered before the process exits
+        write_buffer_service.stop()
+
+    app = FastAPI(title="AI Smart Survey Tool", lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Profile", "Server-Timing"],
+    )
+    # Outermost, so the latency histograms include every other middleware
+    app.add_middleware(profiling_service.RequestMetricsMiddleware)
+
+    # Root route
+    @app.get("/")
+    def read_root():
+        return {"status": "ok", "message": "AI Survey Tool API is running!"}
+
+    # Render health check route
+    @app.get("/healthz")
+    def health_check():
+        return {"status": "ok"}
+
+    # OpenAI API Key test endpoint
+    @app.get("/test-openai-key")
+    def test_openai_key():
+        key = os.getenv("OPENAI_API_KEY")
+        if key:
+            preview = key[:4] + "***" if len(key) > 4 else key
+            logging.info("OpenAI API key detected and loaded.")
+            return {"key_exists": True, "key_preview": preview}
+        else:
+            logging.warning("OpenAI API key NOT found in environment variables.")
+            return {"key_exists": False, "key_preview": None}
+
+    # Prometheus scrape endpoint (per worker process)
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(metrics_service.render_prometheus(), media_type="text/plain; version=0.0.4")
 
+    # API routes (all support advanced features in their router logic)
+    app.include_router(survey_routes.router, prefix="/api/surveys", tags=["Surveys"])
+    app.include_router(voice_routes.router, prefix="/api/voice", tags=["Voice"])
+    app.include_router(analytics_routes.router, prefix="/api/analytics", tags=["Analytics"])
+    app.include_router(response_routes.router, prefix="/api/responses", tags=["Responses"])
+    app.include_router(response_routes.batch_router, prefix="/api/responses", tags=["Responses"])
+    app.include_router(job_routes.router, prefix="/api/jobs", tags=["Jobs"])
+    return app
 
-# Root route
-@app.get("/")
-def read_root():
-    return {"status": "ok", "message": "AI Survey Tool API is running!"}
-
-# Render health check route
-@app.get("/healthz")
-def health_check():
-    return {"status": "ok"}
-
-# OpenAI API Key test endpoint
-@app.get("/test-openai-key")
-def test_openai_key():
-    key = os.getenv("OPENAI_API_KEY")
-    if key:
-        preview = key[:4] + "***" if len(key) > 4 else key
-        logging.info("OpenAI API key detected and loaded.")
-        return {"key_exists": True, "key_preview": preview}
-    else:
-        logging.warning("OpenAI API key NOT found in environment variables.")
-        return {"key_exists": False, "key_preview": None}
-
-# API routes (all support advanced features in their router logic)
-app.include_router(survey_routes.router, prefix="/api/surveys", tags=["Surveys"])
-app.include_router(voice_routes.router, prefix="/api/voice", tags=["Voice"])
-app.include_router(analytics_routes.router, prefix="/api/analytics", tags=["Analytics"])
-app.include_router(response_routes.router, prefix="/api/responses", tags=["Responses"])
-
-# Create tables on startup
-print("📌 Creating all tables...")
-Base.metadata.create_all(bind=engine)
-print("✅ Tables created successfully!")
+# `uvicorn app.main:app` (development). Tables are created at startup, not on import.
+app = create_app()
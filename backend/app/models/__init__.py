@@ -3,3 +3,7 @@ from app.models.question import Question
 from app.models.response import Response
 from app.models.user import User, UserRole
 from app.models.enumerator import EnumeratorAssignment
+from app.models.aggregate import SurveyQuestionAggregate
+from app.models.llm_cache import LLMCacheEntry
+from app.models.job import Job
+from app.models.audio_upload import AudioUpload
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+
+from app.database import Base
+
+class SurveyQuestionAggregate(Base):
+    __tablename__ = "survey_question_aggregates"
+    __table_args__ = (
+        Index(
+            "ix_survey_question_aggregates_bucket",
+            "survey_id", "question_id", "dimension", "bucket",
+            unique=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id", ondelete="CASCADE"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    dimension = Column(String(32), nullable=False)   # total, option, language, validation_status, voice, day
+    bucket = Column(String(255), nullable=False)     # option label, language code, YYYY-MM-DD, ...
+    count = Column(Integer, nullable=False, default=0)
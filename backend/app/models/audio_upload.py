@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, JSON, DateTime, Index
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class AudioUpload(Base):
+    __tablename__ = "audio_uploads"
+    __table_args__ = (
+        # Submits look up the recording of each (respondent, question) they save
+        Index("ix_audio_uploads_survey_respondent_question", "survey_id", "respondent_id", "question_id"),
+    )
+
+    id = Column(String(36), primary_key=True)                 # uuid4 hex, handed to the client
+    survey_id = Column(Integer, ForeignKey("surveys.id", ondelete="CASCADE"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    respondent_id = Column(String(100), nullable=False)
+    content_type = Column(String(100), default="audio/wav")
+    total_bytes = Column(BigInteger, nullable=True)            # declared size, if the client knows it
+    received_bytes = Column(BigInteger, nullable=False, default=0)
+    status = Column(String(20), nullable=False, default="uploading")  # uploading, complete
+    sha256 = Column(String(64), nullable=True)
+    uri = Column(String(255), nullable=True)
+    audio_metadata = Column(JSON, default=dict)                # format, duration, bytes once finalized
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest runnable job per provider
+        Index("ix_jobs_claim", "status", "provider", "run_after"),
+    )
+
+    id = Column(String(36), primary_key=True)                  # uuid4 hex, handed to clients
+    kind = Column(String(50), nullable=False)                  # generate_survey, tts, stt
+    provider = Column(String(50), nullable=False)              # concurrency bucket: openai, gtts, google_stt
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed
+    payload = Column(JSON, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False)    # backoff: not claimable before this
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
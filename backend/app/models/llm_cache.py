@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Float, Index
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache_entries"
+    __table_args__ = (
+        # Near-duplicate scans filter on these and read the newest first
+        Index("ix_llm_cache_entries_lookup", "model", "num_questions", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True)    # sha256 of the normalized key
+    normalized_prompt = Column(Text, nullable=False)
+    num_questions = Column(Integer, nullable=False)
+    model = Column(String(100), nullable=False)                    # requested primary model
+    signature = Column(JSON, default=list)                         # MinHash over prompt shingles
+    questions = Column(JSON, nullable=False)                       # generated question dicts
+    generation_seconds = Column(Float, default=0.0)                # what a hit saves
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, JSON, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -6,6 +6,22 @@ from app.database import Base  # Use absolute import!
 
 class Response(Base):
     __tablename__ = "responses"
+    __table_args__ = (
+        # One answer per respondent per question; also serves the hot lookups
+        Index(
+            "ix_responses_survey_respondent_question",
+            "survey_id", "respondent_id", "question_id",
+            unique=True,
+        ),
+        # Keyset listings on (created_at, id), optionally by review status
+        Index("ix_responses_survey_created_at", "survey_id", "created_at", "id"),
+        Index("ix_responses_survey_status_created_at", "survey_id", "validation_status", "created_at", "id"),
+        # Rows changed since a columnar snapshot was compacted (the delta)
+        Index("ix_responses_survey_updated_at", "survey_id", "updated_at"),
+        # Choice frequencies as integer GROUP BYs
+        Index("ix_responses_survey_question_code", "survey_id", "question_id", "answer_code"),
+        Index("ix_responses_survey_question_mask", "survey_id", "question_id", "answer_mask"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False)
@@ -13,10 +29,14 @@ class Response(Base):
     respondent_id = Column(String(100), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     answer = Column(JSON, nullable=True)
+    answer_code = Column(Integer, nullable=True)       # radio: option id (position in Question.options)
+    answer_mask = Column(BigInteger, nullable=True)    # checkbox: bit i set when option i is selected
     confidence_score = Column(Integer, default=100)
     validation_status = Column(String(50), default="pending")
     extra_metadata = Column(JSON, default=dict)    # custom metadata, analytics, tracking
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    submitted_at = Column(DateTime(timezone=True), nullable=True)   # when the answer was given (app clock); orders write-behind commits
 
     # Multilingual support
     language = Column(String(10), default="en")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -7,6 +7,9 @@ from app.models.question import Question
 
 class Survey(Base):
     __tablename__ = "surveys"
+    __table_args__ = (
+        Index("ix_surveys_created_at", "created_at", "id"),   # keyset listing
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -22,6 +25,7 @@ class Survey(Base):
     ai_generated = Column(Boolean, default=False)       # LLM/AI survey flag
     ai_metadata = Column(JSON, default=dict)            # AI prompt/context/history
     status = Column(String(50), default="draft")
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on survey/question edits
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
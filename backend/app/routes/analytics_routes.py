@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Any, Dict, Optional
 
-from app.database import get_db
-from app.services import analytics_service
+from app.database import SessionLocal, get_db
+from app.models import Survey
+from app.routes.job_routes import job_accepted
+from app.services import aggregate_service, analytics_service, job_service, snapshot_service
 
 router = APIRouter()
 
@@ -19,10 +21,14 @@ def get_survey_analytics(
     voice_enabled: Optional[bool] = Query(None, description="Filter by voice/audio surveys"),# Voice/audio analytics
     adaptive_enabled: Optional[bool] = Query(None, description="Filter by adaptive logic"),  # Adaptive analytics
     ai_generated: Optional[bool] = Query(None, description="Filter by AI/LLM-generated surveys"), # AI analytics
+    live: bool = Query(False, description="Recompute from raw responses instead of stored aggregates or snapshots"),
     db: Session = Depends(get_db)
 ) -> dict:
     """
     Get analytics for a specific survey, with advanced feature filters.
+    Requests without date, language or voice filters are served from the
+    materialized aggregates, the others from the survey's columnar snapshot
+    when it has one; the report has the same shape either way.
     """
     try:
         analytics = analytics_service.generate_survey_analytics(
@@ -33,8 +39,51 @@ def get_survey_analytics(
             language=language,
             voice_enabled=voice_enabled,
             adaptive_enabled=adaptive_enabled,
-            ai_generated=ai_generated
+            ai_generated=ai_generated,
+            use_snapshot=not live,
+            use_aggregates=not live,
         )
-        return analytics
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get analytics: {str(e)}")
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    return analytics
+
+@router.post("/survey/{survey_id}/rebuild-aggregates", response_model=dict)
+def rebuild_survey_aggregates(survey_id: int, db: Session = Depends(get_db)) -> dict:
+    """
+    Recompute a survey's stored aggregates from raw responses and report drift.
+    """
+    try:
+        return aggregate_service.rebuild_survey_aggregates(db, survey_id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild aggregates: {str(e)}")
+
+@router.post("/survey/{survey_id}/snapshot", response_model=dict)
+def compact_survey_snapshot(
+    survey_id: int,
+    background: bool = Query(False, description="Queue the compaction and return a job id (202)"),
+    db: Session = Depends(get_db),
+) -> dict:
+    """
+    Write the survey's responses to a fresh columnar snapshot, used by
+    filtered analytics and exports together with the rows written since.
+    """
+    if db.get(Survey, survey_id) is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    if background:
+        job = job_service.enqueue(db, "compact_snapshot", {"survey_id": survey_id})
+        db.commit()
+        return job_accepted(job)
+    try:
+        return snapshot_service.compact_survey(db, survey_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compact snapshot: {str(e)}")
+
+@job_service.handler("compact_snapshot", provider="local")
+def _compact_snapshot_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    with SessionLocal() as db:
+        return snapshot_service.compact_survey(db, payload["survey_id"])
@@ -0,0 +1,54 @@
+import os
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.models import Job
+from app.schemas import JobAcceptedResponse, JobStatusResponse
+from app.services import job_service
+
+router = APIRouter()
+
+NO_WORKER_NOTE = "No worker runs in the API process; the job stays queued until `python -m app.services.job_service` runs"
+INLINE_NOTE = "No worker runs in the API process; the job runs in the background of this request"
+
+def job_accepted(job: Job, inline: bool = False) -> JSONResponse:
+    """202 reply for routes that queued work instead of running it inline (inline: see job_service.run_inline)."""
+    body = JobAcceptedResponse(job_id=job.id, kind=job.kind, status=job.status, status_url=f"/api/jobs/{job.id}")
+    if job_service.JOB_INPROCESS_THREADS <= 0:
+        body.note = INLINE_NOTE if inline else NO_WORKER_NOTE
+    return JSONResponse(body.model_dump(), status_code=202)
+
+async def _get_job(db: AsyncSession, job_id: str) -> Job:
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# --------- Job Status ---------
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_async_db)) -> JobStatusResponse:
+    job = await _get_job(db, job_id)
+    return JobStatusResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+# --------- Job Artifact (e.g. TTS audio) ---------
+@router.get("/{job_id}/artifact")
+async def get_job_artifact(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await _get_job(db, job_id)
+    result = job.result or {}
+    path = result.get("artifact_path")
+    if job.status != "succeeded" or not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Job has no artifact")
+    return FileResponse(path, media_type=result.get("media_type", "application/octet-stream"))
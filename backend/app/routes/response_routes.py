@@ -1,94 +1,280 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import os
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
 
-from app.database import get_db
-from app.models import Response
-from app.schemas import SubmitResponseRequest, SubmitResponseResult
+from app.database import get_async_db
+from app.models import AudioUpload
+from app.schemas import (
+    SubmitResponseRequest,
+    SubmitResponseResult,
+    SubmitResponseBatchRequest,
+    SubmitResponseBatchResult,
+    AudioUploadInitRequest,
+    AudioUploadFinalizeRequest,
+    AudioUploadStatus,
+    WriteBehindStatus,
+)
+from app.services import audio_upload_service, response_service, session_state_service, write_buffer_service
 
 router = APIRouter(prefix="/responses", tags=["Responses"])
+# Mounted without the /responses prefix: POST /api/responses/submit-batch
+batch_router = APIRouter(tags=["Responses"])
+
+def _response_values(payload: SubmitResponseRequest) -> Dict[str, Any]:
+    """Column values for a Response row built from a submit payload."""
+    return {
+        "survey_id": payload.survey_id,
+        "question_id": payload.question_id,
+        "respondent_id": payload.respondent_id,
+        "answer": payload.answer,
+        "confidence_score": payload.confidence_score,
+        "validation_status": payload.validation_status,
+        "extra_metadata": payload.extra_metadata or {},
+        "language": payload.language,
+        "translations": payload.translations or {},
+        "audio_file_uri": payload.audio_file_uri,
+        "voice_enabled": payload.voice_enabled,
+        "audio_metadata": payload.audio_metadata or {},
+        "adaptive_data": payload.adaptive_data or {},
+        "ai_context": payload.ai_context or {},
+        "submitted_at": datetime.now(timezone.utc),
+    }
+
+def _attach_and_validate(db: Session, rows: List[Dict[str, Any]]) -> None:
+    # Recordings finalized before their answer are linked here, and validated
+    # against the cached plans with it: validation_status feeds the aggregates
+    audio_upload_service.attach_audio(db, rows)
+    response_service.validate_responses(db, rows)
+
+def _save_responses(db: Session, rows: List[Dict[str, Any]]):
+    _attach_and_validate(db, rows)
+    return response_service.upsert_responses(db, rows)
+
+async def _buffer_responses(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Write-behind mode: validate, then return once journaled; the flusher commits in groups."""
+    await db.run_sync(_attach_and_validate, rows)
+    await db.rollback()   # read-only; release the connection before waiting on the journal
+    await asyncio.wrap_future(write_buffer_service.submit(rows))
+    session_state_service.record_answers(rows)
+
+def _submit_message(inserted: Optional[bool]) -> str:
+    if inserted is None:
+        return "Response accepted"
+    return "Response submitted successfully" if inserted else "Response updated successfully"
+
+def _submit_result(values: Dict[str, Any], response_id: Optional[int], inserted: Optional[bool]) -> SubmitResponseResult:
+    return SubmitResponseResult(
+        response_id=response_id,
+        survey_id=values["survey_id"],
+        question_id=values["question_id"],
+        respondent_id=values["respondent_id"],
+        validation_status=values["validation_status"],
+        message=_submit_message(inserted),
+        language=values["language"],
+        audio_file_uri=values["audio_file_uri"],
+        voice_enabled=values["voice_enabled"],
+        adaptive_data=values["adaptive_data"],
+        ai_context=values["ai_context"],
+    )
 
 @router.post("/submit", response_model=SubmitResponseResult)
-def submit_response(
+async def submit_response(
     payload: SubmitResponseRequest,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ) -> SubmitResponseResult:
+    """
+    Upsert one answer. In write-behind mode the reply is 202 with
+    response_id=None once the answer is journaled; if the database later
+    refuses it, it is counted by GET /write-behind rather than reported here.
+    """
     try:
-        # Check if the respondent has already answered this question
-        existing = (
-            db.query(Response)
-            .filter(
-                Response.survey_id == payload.survey_id,
-                Response.question_id == payload.question_id,
-                Response.respondent_id == payload.respondent_id,
-            )
-            .first()
-        )
+        values = _response_values(payload)
+        if write_buffer_service.enabled():
+            await _buffer_responses(db, [values])
+            response.status_code = 202
+            return _submit_result(values, None, None)
 
-        if existing:
-            # Update the existing response with all advanced fields
-            existing.answer = payload.answer
-            existing.confidence_score = payload.confidence_score
-            existing.validation_status = payload.validation_status
-            existing.extra_metadata = payload.extra_metadata or {}
-            existing.language = payload.language
-            existing.translations = payload.translations or {}
-            existing.audio_file_uri = payload.audio_file_uri
-            existing.voice_enabled = payload.voice_enabled
-            existing.audio_metadata = payload.audio_metadata or {}
-            existing.adaptive_data = payload.adaptive_data or {}
-            existing.ai_context = payload.ai_context or {}
-            db.commit()
-            db.refresh(existing)
-
-            return SubmitResponseResult(
-                response_id=existing.id,
-                survey_id=existing.survey_id,
-                question_id=existing.question_id,
-                respondent_id=existing.respondent_id,
-                validation_status=existing.validation_status,
-                message="Response updated successfully",
-                language=existing.language,
-                audio_file_uri=existing.audio_file_uri,
-                voice_enabled=existing.voice_enabled,
-                adaptive_data=existing.adaptive_data,
-                ai_context=existing.ai_context,
+        # Single INSERT ... ON CONFLICT DO UPDATE, safe under concurrent submits
+        saved = await db.run_sync(_save_responses, [values])
+        await db.commit()
+        session_state_service.record_answers([values])
+
+        response_id, inserted = saved[response_service.response_key(values)]
+        return _submit_result(values, response_id, inserted)
+
+    except write_buffer_service.BufferFull as e:
+        raise HTTPException(status_code=503, detail=f"Responses are backing up, retry shortly: {str(e)}", headers={"Retry-After": "1"})
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error submitting response: {str(e)}")
+
+@batch_router.post("/submit-batch", response_model=SubmitResponseBatchResult)
+async def submit_response_batch(
+    payload: SubmitResponseBatchRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+) -> SubmitResponseBatchResult:
+    """
+    Upsert many answers (one or many respondents) in a single transaction,
+    one set-based INSERT ... ON CONFLICT DO UPDATE per chunk. In write-behind
+    mode the whole upload is journaled as one unit and committed with its group
+    (202, accepted set, response_id=None per result; see submit_response).
+    """
+    try:
+        rows = [_response_values(item) for item in payload.responses]
+        if write_buffer_service.enabled():
+            await _buffer_responses(db, rows)
+            response.status_code = 202
+            return SubmitResponseBatchResult(
+                results=[_submit_result(values, None, None) for values in rows],
+                accepted=len(rows),
             )
 
-        # Create a new response record with all advanced fields
-        new_response = Response(
-            survey_id=payload.survey_id,
-            question_id=payload.question_id,
-            respondent_id=payload.respondent_id,
-            answer=payload.answer,
-            confidence_score=payload.confidence_score,
-            validation_status=payload.validation_status,
-            extra_metadata=payload.extra_metadata or {},
-            language=payload.language,
-            translations=payload.translations or {},
-            audio_file_uri=payload.audio_file_uri,
-            voice_enabled=payload.voice_enabled,
-            audio_metadata=payload.audio_metadata or {},
-            adaptive_data=payload.adaptive_data or {},
-            ai_context=payload.ai_context or {},
+        saved = await db.run_sync(_save_responses, rows)
+        await db.commit()
+        session_state_service.record_answers(rows)
+
+        # Duplicate keys in one upload share the row written by the last of them
+        latest = {response_service.response_key(values): values for values in rows}
+        results = []
+        for values in rows:
+            key = response_service.response_key(values)
+            response_id, inserted = saved[key]
+            results.append(_submit_result(latest[key], response_id, inserted))
+
+        inserted_count = sum(1 for _, inserted in saved.values() if inserted)
+        return SubmitResponseBatchResult(
+            results=results,
+            inserted=inserted_count,
+            updated=len(saved) - inserted_count,
         )
-        db.add(new_response)
-        db.commit()
-        db.refresh(new_response)
-
-        return SubmitResponseResult(
-            response_id=new_response.id,
-            survey_id=new_response.survey_id,
-            question_id=new_response.question_id,
-            respondent_id=new_response.respondent_id,
-            validation_status=new_response.validation_status,
-            message="Response submitted successfully",
-            language=new_response.language,
-            audio_file_uri=new_response.audio_file_uri,
-            voice_enabled=new_response.voice_enabled,
-            adaptive_data=new_response.adaptive_data,
-            ai_context=new_response.ai_context,
+
+    except write_buffer_service.BufferFull as e:
+        raise HTTPException(status_code=503, detail=f"Responses are backing up, retry shortly: {str(e)}", headers={"Retry-After": "1"})
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error submitting responses: {str(e)}")
+
+@router.get("/write-behind", response_model=WriteBehindStatus)
+def write_behind_status() -> WriteBehindStatus:
+    """Answers this process has acknowledged with 202 but not committed, and all rejected so far."""
+    return WriteBehindStatus(**write_buffer_service.status())
+
+def _upload_status(upload: AudioUpload, linked: Optional[bool] = None) -> AudioUploadStatus:
+    return AudioUploadStatus(
+        upload_id=upload.id,
+        status=upload.status,
+        offset=upload.received_bytes if upload.status == "complete" else audio_upload_service.current_offset(upload.id),
+        total_bytes=upload.total_bytes,
+        sha256=upload.sha256,
+        uri=upload.uri,
+        audio_metadata=upload.audio_metadata,
+        linked=linked,
+    )
+
+async def _get_upload(db: AsyncSession, upload_id: str) -> AudioUpload:
+    upload = await db.get(AudioUpload, upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+@router.post("/audio-uploads", response_model=AudioUploadStatus, status_code=201)
+async def create_audio_upload(
+    payload: AudioUploadInitRequest,
+    db: AsyncSession = Depends(get_async_db)
+) -> AudioUploadStatus:
+    """
+    Start a resumable upload of a recorded answer. Send the bytes with
+    PUT /audio-uploads/{upload_id}?offset=N, then finalize with the sha256.
+    """
+    try:
+        upload = audio_upload_service.create_upload(
+            db, payload.survey_id, payload.question_id, payload.respondent_id,
+            payload.content_type, payload.total_bytes,
         )
+        await db.commit()
+        return _upload_status(upload)
+    except audio_upload_service.UploadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error starting upload: {str(e)}")
 
+@router.get("/audio-uploads/{upload_id}", response_model=AudioUploadStatus)
+async def get_audio_upload(upload_id: str, db: AsyncSession = Depends(get_async_db)) -> AudioUploadStatus:
+    """Current offset of an upload: where to resume after a dropped connection."""
+    return _upload_status(await _get_upload(db, upload_id))
+
+@router.put("/audio-uploads/{upload_id}", response_model=AudioUploadStatus)
+async def append_audio_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Byte offset of this chunk; must equal the server offset"),
+    db: AsyncSession = Depends(get_async_db)
+) -> AudioUploadStatus:
+    """
+    Append the raw request body at `offset`. A stale offset gets 409 with
+    the server offset in the Upload-Offset header.
+    """
+    upload = await _get_upload(db, upload_id)
+    try:
+        await audio_upload_service.append_chunk(upload, offset, request.stream())
+    except audio_upload_service.OffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.expected)})
+    except audio_upload_service.UploadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _upload_status(upload)
+
+@router.post("/audio-uploads/{upload_id}/finalize", response_model=AudioUploadStatus)
+async def finalize_audio_upload(
+    upload_id: str,
+    payload: AudioUploadFinalizeRequest,
+    db: AsyncSession = Depends(get_async_db)
+) -> AudioUploadStatus:
+    """
+    Verify the checksum, move the audio into the object store and link it
+    to the respondent's answer. Repeating a completed finalize is a no-op.
+    """
+    upload = await _get_upload(db, upload_id)
+    if upload.status == "complete":
+        if upload.sha256 != payload.sha256.lower():
+            raise HTTPException(status_code=422, detail="Upload was finalized with a different checksum")
+        return _upload_status(upload)
+    try:
+        # Hashing a long recording is disk-bound; keep it off the event loop
+        stored = await asyncio.to_thread(audio_upload_service.store_object, upload, payload.sha256)
+    except audio_upload_service.UploadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        linked = await db.run_sync(audio_upload_service.finalize_upload, upload, stored)
+        await db.commit()
+        return _upload_status(upload, linked)
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error submitting response: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error finalizing upload: {str(e)}")
+
+@router.get("/audio/{filename}")
+def get_uploaded_audio(filename: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Serve an uploaded recording by content hash (see Response.audio_file_uri).
+    """
+    sha256, _, ext = filename.partition(".")
+    media_type = audio_upload_service.MEDIA_TYPES.get(ext)
+    path = audio_upload_service.object_path(sha256, ext) if media_type and audio_upload_service.is_sha256(sha256) else None
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    headers = {"ETag": f'"{sha256}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and headers["ETag"] in if_none_match:
+        return Response(status_code=304, headers=headers)
+    if audio_upload_service.AUDIO_ACCEL_REDIRECT_PREFIX:
+        # nginx serves the file itself (sendfile) from the internal location
+        headers["X-Accel-Redirect"] = f"{audio_upload_service.AUDIO_ACCEL_REDIRECT_PREFIX}{sha256[:2]}/{filename}"
+        return Response(media_type=media_type, headers=headers)
+    # FileResponse handles Range requests and uses zero-copy pathsend where the server supports it
+    return FileResponse(path, media_type=media_type, headers=headers)
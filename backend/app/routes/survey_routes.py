@@ -1,14 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+import json
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Header, Query
+from fastapi import Response as HTTPResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, SessionLocal, get_async_db, get_db
+from app.routes.job_routes import job_accepted
+from app.models.job import Job
 from app.models.survey import Survey
-from app.models.question import Question
-from app.models.response import Response
-from app.schemas import SurveyCreateRequest, SurveyResponse, AdaptiveQuestionResponse
-from app.services import nss_service, llm_service, analytics_service
+from app.schemas import (
+    SurveyCreateRequest, SurveyResponse, AdaptiveQuestionResponse,
+    BulkQuestionsRequest, BulkQuestionsResult,
+    ValidateAnswersRequest, ValidateAnswersResult, AnswerValidationResult,
+    SurveyPage, ResponsePage,
+)
+from app.services.validation_service import AnswerCheck
+from app.services import (
+    nss_service, llm_service, analytics_service, export_service, job_service, listing_service, question_service,
+    session_state_service, survey_cache_service, tts_cache_service,
+)
 
 router = APIRouter()
 
@@ -50,7 +64,7 @@ class SurveyPromptResult(BaseModel):
 
 # --------- Create Survey (Manual) ---------
 @router.post("/", response_model=SurveyResponse)
-def create_survey(payload: SurveyCreateRequest, db: Session = Depends(get_db)) -> SurveyResponse:
+async def create_survey(payload: SurveyCreateRequest, db: AsyncSession = Depends(get_async_db)) -> SurveyResponse:
     try:
         new_survey = Survey(
             title=payload.title,
@@ -68,146 +82,369 @@ def create_survey(payload: SurveyCreateRequest, db: Session = Depends(get_db)) -
             status=payload.status or "draft",
         )
         db.add(new_survey)
-        db.commit()
-        db.refresh(new_survey)
+        await db.flush()  # assigns new_survey.id inside the same transaction
 
-        # If it's an NSS template, pre-fill with template questions
+        # If it's an NSS template, pre-fill with template questions in one bulk insert
         if payload.survey_type == "nss" and payload.nss_template_type:
             nss_questions = nss_service.get_questions_from_template(payload.nss_template_type)
-            for q in nss_questions:
-                question = Question(
-                    survey_id=new_survey.id,
-                    question_text=q.get("question_text") or q.get("text", ""),
-                    question_type=q.get("question_type", "text"),
-                    options=q.get("options", []),
-                    validation_rules=q.get("validation_rules", {}),
-                    nss_code=q.get("nss_code"),
-                    lgd_location_type=q.get("lgd_location_type"),
-                    translations=q.get("translations", {}),
-                    order_index=q.get("order_index", 0),
-                    is_mandatory=q.get("is_mandatory", False),
-                    audio_file_uri=q.get("audio_file_uri"),
-                    voice_enabled=q.get("voice_enabled", False),
-                    audio_metadata=q.get("audio_metadata", {}),
-                    adaptive_enabled=q.get("adaptive_enabled", True),
-                    adaptive_config=q.get("adaptive_config", {}),
-                    ai_generated=q.get("ai_generated", False),
-                    ai_metadata=q.get("ai_metadata", {}),
-                )
-                db.add(question)
-            db.commit()
+            rows = [question_service.question_values(new_survey.id, q) for q in nss_questions]
+            await db.run_sync(
+                lambda session: question_service.bulk_insert_questions(session, new_survey.id, rows, survey_is_new=True)
+            )
 
+        await db.commit()
+        await db.refresh(new_survey, ["questions"])
         return new_survey
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Survey creation failed: {str(e)}")
 
+# --------- List Surveys / Responses (keyset pages) ---------
+def _include(include: Optional[str]) -> List[str]:
+    return [name.strip() for name in (include or "").split(",")]
+
+async def _list_page(db: AsyncSession, lister, **params):
+    try:
+        return await db.run_sync(lambda session: lister(session, **params))
+    except listing_service.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Listing failed: {str(e)}")
+
+@router.get("/", response_model=SurveyPage, response_model_exclude_unset=True)
+async def list_surveys(
+    status: Optional[str] = Query(None),
+    language: Optional[str] = Query(None),
+    include: Optional[str] = Query(None, description="Comma-separated JSON fields to add, e.g. description,translations"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(listing_service.DEFAULT_PAGE_SIZE, ge=1, le=listing_service.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+) -> SurveyPage:
+    """Surveys, newest first, one keyset page at a time."""
+    items, next_cursor = await _list_page(
+        db, listing_service.list_surveys,
+        status=status, language=language, include=_include(include), cursor=cursor, limit=limit,
+    )
+    return SurveyPage(items=items, next_cursor=next_cursor)
+
+@router.get("/{survey_id}/responses", response_model=ResponsePage, response_model_exclude_unset=True)
+async def list_survey_responses(
+    survey_id: int,
+    language: Optional[str] = Query(None),
+    validation_status: Optional[str] = Query(None),
+    respondent_id: Optional[str] = Query(None),
+    question_id: Optional[int] = Query(None),
+    include: Optional[str] = Query(None, description="Comma-separated JSON fields to add, e.g. ai_context,audio_metadata"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(listing_service.DEFAULT_PAGE_SIZE, ge=1, le=listing_service.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+) -> ResponsePage:
+    """A survey's responses, newest first, one keyset page at a time (deep pages cost the same as the first)."""
+    if await db.get(Survey, survey_id) is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    items, next_cursor = await _list_page(
+        db, listing_service.list_responses,
+        survey_id=survey_id, language=language, validation_status=validation_status,
+        respondent_id=respondent_id, question_id=question_id,
+        include=_include(include), cursor=cursor, limit=limit,
+    )
+    return ResponsePage(items=items, next_cursor=next_cursor)
+
 # --------- Get Survey by ID ---------
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
 @router.get("/{survey_id}", response_model=SurveyResponse)
-def get_survey(survey_id: int, db: Session = Depends(get_db)) -> SurveyResponse:
-    survey = db.query(Survey).filter(Survey.id == survey_id).first()
-    if not survey:
+async def get_survey(
+    survey_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+) -> SurveyResponse:
+    # Serialized bytes are cached per survey version; clients revalidate with the ETag
+    document = await db.run_sync(lambda session: survey_cache_service.get_survey_document(session, survey_id))
+    if not document:
         raise HTTPException(status_code=404, detail="Survey not found")
-    return survey
+    headers = {"ETag": document.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, document.etag):
+        return HTTPResponse(status_code=304, headers=headers)
+    return HTTPResponse(content=document.body, media_type="application/json", headers=headers)
 
 # --------- AI Generate Survey from Prompt ---------
+def _question_data(q: Dict[str, Any]) -> Dict[str, Any]:
+    # Normalize fields for frontend compatibility
+    return {
+        "question_text": q.get("question_text") or q.get("text", ""),
+        "text": q.get("text", ""),
+        "type": q.get("type", "text"),
+        "options": q.get("options", []),
+        "translations": q.get("translations", {}),
+        "audio_file_uri": q.get("audio_file_uri"),
+        "voice_enabled": q.get("voice_enabled", False),
+        "audio_metadata": q.get("audio_metadata", {}),
+        "adaptive_enabled": q.get("adaptive_enabled", True),
+        "adaptive_config": q.get("adaptive_config", {}),
+        "ai_generated": q.get("ai_generated", True),
+        "ai_metadata": q.get("ai_metadata", {}),
+    }
+
+def _save_generated_survey(db: Session, payload: SurveyPromptPayload, questions: List[Dict[str, Any]]) -> SurveyPromptResult:
+    survey = Survey(
+        title=payload.survey_title,
+        description=payload.survey_description,
+        survey_type="ai_generated",
+        languages=payload.languages,
+        translations=payload.translations,
+        adaptive_enabled=payload.adaptive_enabled,
+        adaptive_config=payload.adaptive_config,
+        voice_enabled=payload.voice_enabled,
+        audio_metadata=payload.audio_metadata,
+        ai_generated=True,
+        ai_metadata=payload.ai_metadata,
+        status="draft",
+    )
+    db.add(survey)
+    db.flush()  # assigns survey.id; questions go in the same transaction
+
+    rows = []
+    saved_questions = []
+    for idx, q in enumerate(questions):
+        question_data = _question_data(q)
+        rows.append(question_service.question_values(
+            survey.id, question_data, order_index=idx + 1, is_mandatory=True,
+        ))
+        saved_questions.append(QuestionResponse(**question_data))
+
+    question_service.bulk_insert_questions(db, survey.id, rows, survey_is_new=True)
+    db.commit()
+
+    return SurveyPromptResult(
+        survey_id=survey.id,
+        title=survey.title,
+        description=survey.description,
+        questions=saved_questions,
+    )
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.post("/generate-from-prompt", response_model=SurveyPromptResult)
-def generate_from_prompt(payload: SurveyPromptPayload, db: Session = Depends(get_db)) -> SurveyPromptResult:
+async def generate_from_prompt(
+    payload: SurveyPromptPayload,
+    stream: bool = Query(False, description="Emit questions as server-sent events while the model writes them"),
+    background: bool = Query(False, description="Queue the generation and return a job id (202)"),
+    db: AsyncSession = Depends(get_async_db),
+) -> SurveyPromptResult:
+    if background:
+        job = job_service.enqueue(db, "generate_survey", payload.model_dump())
+        await db.commit()
+        return job_accepted(job)
+    if stream:
+        return StreamingResponse(_stream_generated_survey(payload), media_type="text/event-stream")
     try:
-        questions = llm_service.generate_questions(
+        # Hedged between the primary and fallback model, each call with a deadline
+        questions = await llm_service.generate_questions_async(
             prompt=payload.prompt,
             num_questions=payload.num_questions,
         )
+        result = await db.run_sync(lambda session: _save_generated_survey(session, payload, questions))
+        return result
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"LLM-based survey generation failed: {str(e)}")
 
-        survey = Survey(
-            title=payload.survey_title,
-            description=payload.survey_description,
-            survey_type="ai_generated",
-            languages=payload.languages,
-            translations=payload.translations,
-            adaptive_enabled=payload.adaptive_enabled,
-            adaptive_config=payload.adaptive_config,
-            voice_enabled=payload.voice_enabled,
-            audio_metadata=payload.audio_metadata,
-            ai_generated=True,
-            ai_metadata=payload.ai_metadata,
-            status="draft",
-        )
-        db.add(survey)
+@job_service.handler("generate_survey", provider="openai")
+def _generate_survey_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    request = SurveyPromptPayload(**payload)
+    questions = llm_service.generate_questions(prompt=request.prompt, num_questions=request.num_questions)
+    with SessionLocal() as db:
+        return _save_generated_survey(db, request, questions).model_dump()
+
+async def _stream_generated_survey(payload: SurveyPromptPayload):
+    """`question` events as each JSON element is parsed, then `survey` once saved (or `error`)."""
+    questions = []
+    try:
+        async for q in llm_service.stream_questions(payload.prompt, payload.num_questions):
+            questions.append(q)
+            yield _sse("question", QuestionResponse(**_question_data(q)).model_dump())
+        # The request's session may already be released while streaming, so use our own
+        async with AsyncSessionLocal() as db:
+            result = await db.run_sync(lambda session: _save_generated_survey(session, payload, questions))
+        yield _sse("survey", result.model_dump())
+    except Exception as e:
+        yield _sse("error", {"detail": f"LLM-based survey generation failed: {str(e)}"})
+
+# --------- Bulk Question Import ---------
+@router.post("/{survey_id}/questions/bulk", response_model=BulkQuestionsResult)
+async def bulk_add_questions(
+    survey_id: int,
+    payload: BulkQuestionsRequest,
+    db: AsyncSession = Depends(get_async_db),
+) -> BulkQuestionsResult:
+    if await db.get(Survey, survey_id) is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    try:
+        def insert_all(session: Session):
+            start = question_service.next_order_index(session, survey_id)
+            rows = []
+            for item in payload.questions:
+                values = question_service.question_values(survey_id, item.model_dump())
+                if item.order_index is None:
+                    values["order_index"] = start
+                    start += 1
+                rows.append(values)
+            return question_service.bulk_insert_questions(session, survey_id, rows)
+
+        question_ids = await db.run_sync(insert_all)
+        await db.commit()
+        return BulkQuestionsResult(survey_id=survey_id, inserted=len(question_ids), question_ids=question_ids)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Bulk question import failed: {str(e)}")
+
+# --------- Publish Survey (question audio is pre-rendered by a job) ---------
+def _publish(db: Session, survey_id: int) -> Job:
+    survey = db.get(Survey, survey_id)
+    survey.status = "published"
+    # The job's audio URI writes bump Survey.version, so cached copies in every worker pick them up
+    job = job_service.enqueue(db, "prewarm_survey", {"survey_id": survey_id})
+    db.commit()
+    return job
+
+@router.post("/{survey_id}/publish")
+def publish_survey(
+    survey_id: int,
+    tasks: BackgroundTasks,
+    background: bool = Query(False, description="Reply 202 with the audio pre-render job instead of 200"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    Publish and pre-render question audio on the job queue. With no worker
+    in this process (JOB_INPROCESS_THREADS=0) the pre-render runs after the
+    reply instead, unless a standalone worker claims it first.
+    """
+    if db.get(Survey, survey_id) is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    try:
+        job = _publish(db, survey_id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Survey publishing failed: {str(e)}")
+    inline = job_service.JOB_INPROCESS_THREADS <= 0
+    if inline:
+        tasks.add_task(job_service.run_inline, job.id)
+    if background:
+        return job_accepted(job, inline=inline)
+    return {"survey_id": survey_id, "status": "published", "prewarm_job_id": job.id, "prewarm_status_url": f"/api/jobs/{job.id}"}
+
+@job_service.handler("prewarm_survey", provider="gtts")
+def _prewarm_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    with SessionLocal() as db:
+        if db.get(Survey, payload["survey_id"]) is None:
+            raise job_service.PermanentJobError("Survey not found")
+        report = tts_cache_service.prewarm_survey(db, payload["survey_id"])
         db.commit()
-        db.refresh(survey)
-
-        saved_questions = []
-        for idx, q in enumerate(questions):
-            # Normalize fields for frontend compatibility
-            question_data = {
-                "question_text": q.get("question_text") or q.get("text", ""),
-                "text": q.get("text", ""),
-                "type": q.get("type", "text"),
-                "options": q.get("options", []),
-                "translations": q.get("translations", {}),
-                "audio_file_uri": q.get("audio_file_uri"),
-                "voice_enabled": q.get("voice_enabled", False),
-                "audio_metadata": q.get("audio_metadata", {}),
-                "adaptive_enabled": q.get("adaptive_enabled", True),
-                "adaptive_config": q.get("adaptive_config", {}),
-                "ai_generated": q.get("ai_generated", True),
-                "ai_metadata": q.get("ai_metadata", {}),
-            }
-
-            question = Question(
-                survey_id=survey.id,
-                question_text=question_data["question_text"],
-                question_type=question_data["type"],
-                options=question_data["options"],
-                order_index=idx + 1,
-                is_mandatory=True,
-                translations=question_data["translations"],
-                audio_file_uri=question_data["audio_file_uri"],
-                voice_enabled=question_data["voice_enabled"],
-                audio_metadata=question_data["audio_metadata"],
-                adaptive_enabled=question_data["adaptive_enabled"],
-                adaptive_config=question_data["adaptive_config"],
-                ai_generated=question_data["ai_generated"],
-                ai_metadata=question_data["ai_metadata"],
-            )
-            db.add(question)
-            saved_questions.append(QuestionResponse(**question_data))
+    return {"survey_id": payload["survey_id"], **report}
 
+@job_service.handler("publish_survey", provider="gtts")
+def _publish_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Jobs queued by ?background=true before the pre-render became its own job
+    with SessionLocal() as db:
+        survey = db.get(Survey, payload["survey_id"])
+        if survey is None:
+            raise job_service.PermanentJobError("Survey not found")
+        survey.status = "published"
         db.commit()
+    return _prewarm_job(payload)
 
-        return SurveyPromptResult(
-            survey_id=survey.id,
-            title=survey.title,
-            description=survey.description,
-            questions=saved_questions,
+# --------- Export Responses ---------
+@router.get("/{survey_id}/export")
+async def export_survey_responses(
+    survey_id: int,
+    fmt: str = Query("csv", alias="format", pattern="^(csv|jsonl|parquet)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Stream every respondent's answers, one row per respondent and one column
+    per question (nss_code header when present).
+    """
+    if await db.get(Survey, survey_id) is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    if fmt == "parquet" and export_service.pa is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    return StreamingResponse(
+        export_service.export_survey(survey_id, fmt),
+        media_type=export_service.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="survey_{survey_id}.{fmt}"'},
+    )
+
+# --------- Batch Validation ---------
+@router.post("/{survey_id}/validate", response_model=ValidateAnswersResult)
+async def validate_answers(
+    survey_id: int,
+    payload: ValidateAnswersRequest,
+    db: AsyncSession = Depends(get_async_db),
+) -> ValidateAnswersResult:
+    """
+    Validate many answers against the survey's compiled validation plans
+    without storing them. Same verdicts as /api/responses/responses/submit.
+    """
+    compiled = await db.run_sync(survey_cache_service.get_compiled_survey, survey_id)
+    if compiled is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    try:
+        verdicts = compiled.validate(
+            AnswerCheck(a.question_id, a.answer, a.language, a.audio_file_uri, a.ai_context)
+            for a in payload.answers
         )
+        results, counts = [], {}
+        for item, verdict in zip(payload.answers, verdicts):
+            status, score = verdict if verdict is not None else ("unknown_question", 0)
+            counts[status] = counts.get(status, 0) + 1
+            results.append(AnswerValidationResult(question_id=item.question_id, validation_status=status, score=score))
+        return ValidateAnswersResult(survey_id=survey_id, results=results, counts=counts)
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"LLM-based survey generation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Validation failed: {str(e)}")
 
 # --------- Adaptive Question Logic ---------
 @router.get("/{survey_id}/adaptive", response_model=AdaptiveQuestionResponse)
-def get_next_adaptive_question(
+async def get_next_adaptive_question(
     survey_id: int,
     respondent_id: str = Query(...),
     language: str = Query("en"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> AdaptiveQuestionResponse:
     try:
-        question = analytics_service.get_next_adaptive_question(survey_id, respondent_id, language, db)
-        if question:
-            return question
-        return {"message": "Survey completed", "completed": True}
+        found = await db.run_sync(
+            lambda session: analytics_service.get_next_adaptive_question(survey_id, respondent_id, language, session)
+        )
+        if found:
+            # Payload is serialized once per survey version and language
+            question, step = found
+            payload = question.payload(language, step.roster_member, step.roster_size)
+            return HTTPResponse(content=payload, media_type="application/json")
+        return JSONResponse({"message": "Survey completed", "completed": True})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Adaptive logic failed: {str(e)}")
 
 # --------- Get Progress ---------
 @router.get("/{survey_id}/progress")
-def get_survey_progress(survey_id: int, respondent_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def get_survey_progress(survey_id: int, respondent_id: str, db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
     try:
-        total = db.query(Question).filter_by(survey_id=survey_id).count()
-        answered = db.query(Response).filter_by(survey_id=survey_id, respondent_id=respondent_id).count()
+        def load(session: Session):
+            compiled = survey_cache_service.get_compiled_survey(session, survey_id)
+            version = compiled.version if compiled else None
+            state = session_state_service.load_state(session, survey_id, respondent_id, version)
+            return (len(compiled.question_ids) if compiled else 0), state.answered
+
+        # Served from the compiled survey and the respondent's session state
+        total, answered = await db.run_sync(load)
         percent = round((answered / total) * 100, 2) if total > 0 else 0
         return {
             "survey_id": survey_id,
@@ -1,63 +1,130 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse
-import tempfile
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import asyncio
 import os
-from gtts import gTTS
-import speech_recognition as sr
-from typing import Dict, Any
+import shutil
+from typing import Dict, Any, Optional
+
+from app.database import get_async_db, get_db
+from app.routes.job_routes import job_accepted
+from app.services import job_service, stt_service, tts_cache_service
 
 router = APIRouter()
 
 @router.post("/speech-to-text", response_model=Dict[str, Any])
 async def speech_to_text(
-    audio_file: UploadFile = File(...), 
-    language: str = Form("en")
+    audio_file: UploadFile = File(...),
+    language: str = Form("en"),
+    background: bool = Query(False, description="Queue the transcription and return a job id (202)"),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     """
     Transcribe speech from an uploaded audio file to text, supporting multiple languages.
     """
-    temp_path = None
+    if background:
+        # The upload is kept until the job has transcribed it
+        job_id = job_service.new_job_id()
+        path = job_service.artifact_path(job_id, ".wav")
+        await asyncio.to_thread(_save_upload, audio_file.file, path)
+        job = job_service.enqueue(db, "stt", {"audio_path": path, "language": language}, job_id=job_id)
+        await db.commit()
+        return job_accepted(job)
+
+    try:
+        # Starlette already spooled the multipart body; decode and recognize it on the STT pool
+        return await stt_service.transcribe(audio_file.file, language)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"STT failed: {str(e)}")
+
+def _save_upload(source, path: str) -> None:
+    with open(path, "wb") as out:
+        shutil.copyfileobj(source, out, stt_service.STT_CHUNK_SIZE)
+
+@router.post("/speech-to-text/stream", response_model=Dict[str, Any])
+async def speech_to_text_stream(request: Request, language: str = Query("en")) -> Dict[str, Any]:
+    """
+    Transcribe a raw audio request body (WAV/AIFF/FLAC), read in chunks and
+    spooled in memory up to STT_SPOOL_MAX_BYTES.
+    """
     try:
-        # Save audio to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            contents = await audio_file.read()
-            tmp.write(contents)
-            temp_path = tmp.name
-
-        recognizer = sr.Recognizer()
-        with sr.AudioFile(temp_path) as source:
-            audio_data = recognizer.record(source)
-            text = recognizer.recognize_google(audio_data, language=language)
-        return {"text": text, "error": None}
-    except sr.UnknownValueError:
-        return {"text": "", "error": "Speech unintelligible"}
+        with await stt_service.spool_stream(request.stream()) as spool:
+            return await stt_service.transcribe(spool, language)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"STT failed: {str(e)}")
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+
+@job_service.handler("stt", provider="google_stt")
+def _stt_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    path = payload["audio_path"]
+    if not os.path.exists(path):
+        raise job_service.PermanentJobError("Uploaded audio is gone")
+    try:
+        result = stt_service.transcribe_sync(path, payload.get("language", "en"))
+    except (ValueError, AssertionError) as e:
+        # Unreadable audio: retrying will not help
+        os.remove(path)
+        raise job_service.PermanentJobError(f"STT failed: {e}")
+    os.remove(path)
+    return result
 
 @router.post("/text-to-speech")
 def text_to_speech(
-    text: str = Form(...), 
-    language: str = Form("en"), 
-    slow: bool = Form(False)
+    text: str = Form(...),
+    language: str = Form("en"),
+    slow: bool = Form(False),
+    background: bool = Query(False, description="Queue the synthesis and return a job id (202)"),
+    db: Session = Depends(get_db),
 ):
     """
     Generate speech audio from text input. Returns MP3 stream, supporting multiple languages.
     """
-    temp_path = None
-    try:
-        tts = gTTS(text=text, lang=language, slow=slow)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tts.write_to_fp(tmp)
-            temp_path = tmp.name
-
-        def iterfile():
-            with open(temp_path, "rb") as f:
-                yield from f
-            os.remove(temp_path)
+    if background:
+        job = job_service.enqueue(db, "tts", {"text": text, "language": language, "slow": slow})
+        db.commit()
+        return job_accepted(job)
 
-        return StreamingResponse(iterfile(), media_type="audio/mpeg")
+    try:
+        # Content-addressed: repeated prompts are synthesized once and served from disk
+        key, path = tts_cache_service.get_or_synthesize(text, language, slow)
+        return _audio_response(key, path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TTS failed: {str(e)}")
+
+def _audio_response(key: str, path: str) -> FileResponse:
+    # FileResponse answers Range / If-Range itself; the key doubles as a strong ETag
+    return FileResponse(
+        path,
+        media_type="audio/mpeg",
+        headers={"ETag": f'"{key}"', "Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+@router.get("/audio/{filename}")
+def get_audio(filename: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Serve pre-rendered speech by content key (see Question.audio_file_uri).
+    """
+    key = filename.removesuffix(".mp3")
+    path = tts_cache_service.audio_path(key) if tts_cache_service.is_key(key) else None
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    if if_none_match and f'"{key}"' in if_none_match:
+        return Response(status_code=304, headers={"ETag": f'"{key}"'})
+    tts_cache_service.touch(path)
+    return _audio_response(key, path)
+
+@job_service.handler("tts", provider="gtts")
+def _tts_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        key, path = tts_cache_service.get_or_synthesize(
+            payload["text"], payload.get("language", "en"), payload.get("slow", False)
+        )
+    except ValueError as e:
+        # Unsupported language or empty text
+        raise job_service.PermanentJobError(f"TTS failed: {e}")
+    return {
+        "artifact_path": path,
+        "audio_file_uri": tts_cache_service.audio_uri(key),
+        "media_type": "audio/mpeg",
+        "bytes": os.path.getsize(path),
+    }
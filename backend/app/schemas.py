@@ -1,5 +1,6 @@
 # backend/app/schemas.py
 
+from datetime import datetime
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 
@@ -46,6 +47,35 @@ class QuestionSchema(BaseModel):
     class Config:
         from_attributes = True
 
+# --------------------------
+# Bulk Question Import (Request + Result)
+# --------------------------
+class QuestionCreateRequest(BaseModel):
+    question_text: str
+    question_type: str = "text"
+    options: Optional[List[Any]] = []
+    validation_rules: Optional[Dict[str, Any]] = {}
+    order_index: Optional[int] = None                       # Appended after existing questions if omitted
+    is_mandatory: bool = False
+    translations: Optional[Dict[str, Any]] = {}
+    nss_code: Optional[str] = None
+    lgd_location_type: Optional[str] = None
+    audio_file_uri: Optional[str] = None
+    voice_enabled: bool = False
+    audio_metadata: Optional[Dict[str, Any]] = {}
+    adaptive_enabled: bool = True
+    adaptive_config: Optional[Dict[str, Any]] = {}
+    ai_generated: bool = False
+    ai_metadata: Optional[Dict[str, Any]] = {}
+
+class BulkQuestionsRequest(BaseModel):
+    questions: List[QuestionCreateRequest]                  # Whole schedules, 500+ items is fine
+
+class BulkQuestionsResult(BaseModel):
+    survey_id: int
+    inserted: int
+    question_ids: List[int]                                 # Same order as the request
+
 # --------------------------
 # Survey Response
 # --------------------------
@@ -87,6 +117,8 @@ class AdaptiveQuestionResponse(BaseModel):
     adaptive_config: Optional[Dict[str, Any]] = {}
     ai_generated: bool = False
     ai_metadata: Optional[Dict[str, Any]] = {}
+    roster_member: Optional[int] = None     # 1-based member for roster (looped) questions
+    roster_size: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -114,7 +146,9 @@ class SubmitResponseRequest(BaseModel):
         from_attributes = True
 
 class SubmitResponseResult(BaseModel):
-    response_id: int
+    # None when accepted in write-behind mode (HTTP 202): the answer is journaled,
+    # not yet in the database; see GET /api/responses/responses/write-behind
+    response_id: Optional[int] = None
     survey_id: int
     question_id: int
     respondent_id: str
@@ -129,6 +163,140 @@ class SubmitResponseResult(BaseModel):
     class Config:
         from_attributes = True
 
+# --------------------------
+# Batch Submit (Request + Result)
+# --------------------------
+class SubmitResponseBatchRequest(BaseModel):
+    responses: List[SubmitResponseRequest]  # Whole page or queued offline interviews
+
+class SubmitResponseBatchResult(BaseModel):
+    results: List[SubmitResponseResult]     # One result per submitted item, in order
+    inserted: int = 0
+    updated: int = 0
+    accepted: int = 0                        # Journaled for a later group commit (write-behind mode)
+
+class WriteBehindStatus(BaseModel):
+    enabled: bool
+    pending: int = 0                         # Accepted by this process, not yet committed
+    rejected: int = 0                        # Accepted, then refused by the database (all processes)
+    rejected_file: Optional[str] = None      # Where the refused rows are kept
+
+# --------------------------
+# Keyset-Paginated Listings
+# --------------------------
+class SurveyListItem(BaseModel):
+    id: int
+    title: str
+    survey_type: Optional[str] = None
+    nss_template_type: Optional[str] = None
+    status: Optional[str] = None
+    version: int = 1
+    languages: Optional[List[str]] = []
+    adaptive_enabled: Optional[bool] = None
+    voice_enabled: Optional[bool] = None
+    ai_generated: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    # Only present when named in ?include=
+    description: Optional[str] = None
+    translations: Optional[Dict[str, Any]] = None
+    adaptive_config: Optional[Dict[str, Any]] = None
+    audio_metadata: Optional[Dict[str, Any]] = None
+    ai_metadata: Optional[Dict[str, Any]] = None
+
+class SurveyPage(BaseModel):
+    items: List[SurveyListItem]
+    next_cursor: Optional[str] = None       # Pass back as ?cursor= for the next page; None on the last
+
+class ResponseListItem(BaseModel):
+    id: int
+    survey_id: int
+    question_id: int
+    respondent_id: str
+    answer: Any = None
+    confidence_score: Optional[int] = None
+    validation_status: Optional[str] = None
+    language: Optional[str] = None
+    audio_file_uri: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    # Only present when named in ?include=
+    extra_metadata: Optional[Dict[str, Any]] = None
+    translations: Optional[Dict[str, Any]] = None
+    audio_metadata: Optional[Dict[str, Any]] = None
+    adaptive_data: Optional[Dict[str, Any]] = None
+    ai_context: Optional[Dict[str, Any]] = None
+
+class ResponsePage(BaseModel):
+    items: List[ResponseListItem]
+    next_cursor: Optional[str] = None
+
+# --------------------------
+# Batch Validation (Request + Result)
+# --------------------------
+class AnswerToValidate(BaseModel):
+    question_id: int
+    answer: Any
+    language: Optional[str] = "en"
+    audio_file_uri: Optional[str] = None
+    ai_context: Optional[Dict[str, Any]] = {}
+
+class ValidateAnswersRequest(BaseModel):
+    answers: List[AnswerToValidate]         # Thousands per call, e.g. a queued offline round
+
+class AnswerValidationResult(BaseModel):
+    question_id: int
+    validation_status: str                  # valid, invalid, review, error, unknown_question
+    score: int = 0
+
+class ValidateAnswersResult(BaseModel):
+    survey_id: int
+    results: List[AnswerValidationResult]   # One per answer, in order
+    counts: Dict[str, int] = {}             # validation_status -> answers
+
+# --------------------------
+# Background Jobs
+# --------------------------
+class JobAcceptedResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str = "queued"
+    status_url: str                         # Poll with GET until succeeded/failed
+    note: Optional[str] = None              # Set when no worker runs in the API process
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str                             # queued, running, succeeded, failed
+    attempts: int = 0
+    max_attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+# --------------------------
+# Resumable Audio Uploads
+# --------------------------
+class AudioUploadInitRequest(BaseModel):
+    survey_id: int
+    question_id: int
+    respondent_id: str
+    content_type: str = "audio/wav"
+    total_bytes: Optional[int] = None       # Enables the completeness check on finalize
+
+class AudioUploadFinalizeRequest(BaseModel):
+    sha256: str                             # Hex digest of the whole file
+
+class AudioUploadStatus(BaseModel):
+    upload_id: str
+    status: str                             # uploading, complete
+    offset: int                             # Next byte the server expects
+    total_bytes: Optional[int] = None
+    sha256: Optional[str] = None
+    uri: Optional[str] = None
+    audio_metadata: Optional[Dict[str, Any]] = None
+    linked: Optional[bool] = None           # Finalize only: a Response row now points at the audio
+
 # --------------------------
 # Survey Creation (Alternative)
 # --------------------------
@@ -0,0 +1,255 @@
+# backend/app/services/aggregate_service.py
+
+import argparse
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import String, cast, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import Question, Response, Survey, SurveyQuestionAggregate
+from app.services.analytics_service import ANALYTICS_STREAM_BATCH, decode_answer
+from app.services.validation_service import mask_bits
+
+# Aggregate rows written per upsert statement
+AGGREGATE_CHUNK_SIZE = 500
+
+BUCKET_LENGTH = 255
+
+# Day bucket of a response. Evaluated by the database both in the upsert's
+# RETURNING (incremental deltas) and in _recount, so the two always agree.
+RESPONSE_DAY = func.date(Response.created_at)
+
+def _bucket(value: Any) -> str:
+    return str(value)[:BUCKET_LENGTH]
+
+def _option_buckets(
+    question_type: Optional[str],
+    answer: Any,
+    options: Optional[List[Any]] = None,
+    answer_code: Optional[int] = None,
+    answer_mask: Optional[int] = None,
+) -> List[str]:
+    """
+    Option labels an answer counts toward; free-text answers have none.
+    Coded answers count under the base-language label whatever language
+    they were given in.
+    """
+    if options and question_type == "radio" and answer_code is not None and answer_code < len(options):
+        return [_bucket(options[answer_code])]
+    if options and question_type == "checkbox" and answer_mask is not None:
+        return [_bucket(options[i]) for i in mask_bits(answer_mask) if i < len(options)]
+    if answer is None:
+        return []
+    if question_type == "radio":
+        return [_bucket(answer)]
+    if question_type == "checkbox":
+        selected = answer if isinstance(answer, list) else [answer]
+        return [_bucket(opt) for opt in selected if opt is not None]
+    return []
+
+def _add_response(
+    deltas: Counter, question_type: Optional[str], values: Dict[str, Any], sign: int, options: Optional[List[Any]]
+) -> None:
+    sid, qid = values["survey_id"], values["question_id"]
+    deltas[(sid, qid, "total", "all")] += sign
+    deltas[(sid, qid, "language", _bucket(values.get("language") or "unknown"))] += sign
+    deltas[(sid, qid, "validation_status", _bucket(values.get("validation_status") or "unknown"))] += sign
+    deltas[(sid, qid, "voice", "voice" if values.get("voice_enabled") else "text")] += sign
+    buckets = _option_buckets(
+        question_type, values.get("answer"), options, values.get("answer_code"), values.get("answer_mask")
+    )
+    for bucket in buckets:
+        deltas[(sid, qid, "option", bucket)] += sign
+
+def response_deltas(
+    question_type: Optional[str],
+    old: Optional[Dict[str, Any]],
+    new: Dict[str, Any],
+    day: Any = None,
+    options: Optional[List[Any]] = None,
+) -> Counter:
+    """
+    Aggregate count changes for one upserted answer. An update removes the
+    old answer's contribution; created_at is kept, so the day bucket only
+    moves on insert, where day is the new row's RESPONSE_DAY.
+    """
+    deltas: Counter = Counter()
+    if old is not None:
+        _add_response(deltas, question_type, old, -1, options)
+    else:
+        deltas[(new["survey_id"], new["question_id"], "day", str(day))] += 1
+    _add_response(deltas, question_type, new, 1, options)
+    return deltas
+
+def _chunks(rows: List[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def apply_deltas(db: Session, deltas: Counter) -> None:
+    """Add count deltas to the aggregate table. Does not commit."""
+    # Sorted so concurrent writers lock buckets in the same order
+    rows = [
+        {"survey_id": sid, "question_id": qid, "dimension": dim, "bucket": bucket, "count": delta}
+        for (sid, qid, dim, bucket), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        for chunk in _chunks(rows, AGGREGATE_CHUNK_SIZE):
+            stmt = dialect_insert(SurveyQuestionAggregate).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["survey_id", "question_id", "dimension", "bucket"],
+                set_={"count": SurveyQuestionAggregate.count + stmt.excluded.count},
+            )
+            db.execute(stmt)
+        return
+
+    for row in rows:
+        updated = db.execute(
+            update(SurveyQuestionAggregate)
+            .where(
+                SurveyQuestionAggregate.survey_id == row["survey_id"],
+                SurveyQuestionAggregate.question_id == row["question_id"],
+                SurveyQuestionAggregate.dimension == row["dimension"],
+                SurveyQuestionAggregate.bucket == row["bucket"],
+            )
+            .values(count=SurveyQuestionAggregate.count + row["count"])
+        ).rowcount
+        if not updated:
+            db.execute(insert(SurveyQuestionAggregate).values(**row))
+
+# --------- Reads ---------
+def question_buckets(db: Session, survey_id: int) -> Dict[int, Dict[str, Dict[str, int]]]:
+    """
+    Stored counts of a survey as {question_id: {dimension: {bucket: count}}};
+    analytics_service turns them into the dashboard report.
+    """
+    buckets: Dict[int, Dict[str, Dict[str, int]]] = defaultdict(lambda: defaultdict(dict))
+    rows = db.execute(
+        select(SurveyQuestionAggregate.question_id, SurveyQuestionAggregate.dimension,
+               SurveyQuestionAggregate.bucket, SurveyQuestionAggregate.count)
+        .where(SurveyQuestionAggregate.survey_id == survey_id, SurveyQuestionAggregate.count != 0)
+    )
+    for qid, dimension, bucket, count in rows:
+        buckets[qid][dimension][bucket] = count
+    return buckets
+
+# --------- Rebuild ---------
+def _recount(db: Session, survey_id: int) -> Counter:
+    """Recompute every bucket for a survey from raw responses."""
+    counts: Counter = Counter()
+    where = Response.survey_id == survey_id
+
+    def grouped(dimension: str, column, label):
+        rows = db.execute(
+            select(Response.question_id, column, func.count()).where(where).group_by(Response.question_id, column)
+        )
+        for qid, value, count in rows:
+            counts[(survey_id, qid, dimension, label(value))] += count
+
+    for qid, count in db.execute(
+        select(Response.question_id, func.count()).where(where).group_by(Response.question_id)
+    ):
+        counts[(survey_id, qid, "total", "all")] += count
+    grouped("language", Response.language, lambda v: _bucket(v or "unknown"))
+    grouped("validation_status", Response.validation_status, lambda v: _bucket(v or "unknown"))
+    grouped("voice", Response.voice_enabled, lambda v: "voice" if v else "text")
+    grouped("day", RESPONSE_DAY, lambda v: str(v))
+
+    radio_options = dict(db.execute(
+        select(Question.id, Question.options).where(Question.survey_id == survey_id, Question.question_type == "radio")
+    ).all())
+    checkbox_options = dict(db.execute(
+        select(Question.id, Question.options).where(Question.survey_id == survey_id, Question.question_type == "checkbox")
+    ).all())
+
+    # Coded answers group on integers; only uncoded ones need their JSON
+    answer_text = cast(Response.answer, String)
+    if radio_options:
+        in_radio = Response.question_id.in_(radio_options)
+        for qid, code, count in db.execute(
+            select(Response.question_id, Response.answer_code, func.count())
+            .where(where, in_radio, Response.answer_code.isnot(None))
+            .group_by(Response.question_id, Response.answer_code)
+        ):
+            for bucket in _option_buckets("radio", None, radio_options[qid], answer_code=code):
+                counts[(survey_id, qid, "option", bucket)] += count
+        for qid, raw, count in db.execute(
+            select(Response.question_id, answer_text, func.count())
+            .where(where, in_radio, Response.answer_code.is_(None))
+            .group_by(Response.question_id, answer_text)
+        ):
+            for bucket in _option_buckets("radio", decode_answer(raw)):
+                counts[(survey_id, qid, "option", bucket)] += count
+    if checkbox_options:
+        in_checkbox = Response.question_id.in_(checkbox_options)
+        for qid, mask, count in db.execute(
+            select(Response.question_id, Response.answer_mask, func.count())
+            .where(where, in_checkbox, Response.answer_mask.isnot(None))
+            .group_by(Response.question_id, Response.answer_mask)
+        ):
+            for bucket in _option_buckets("checkbox", None, checkbox_options[qid], answer_mask=mask):
+                counts[(survey_id, qid, "option", bucket)] += count
+        rows = db.execute(
+            select(Response.question_id, Response.answer)
+            .where(where, in_checkbox, Response.answer_mask.is_(None))
+            .execution_options(yield_per=ANALYTICS_STREAM_BATCH)
+        )
+        for qid, answer in rows:
+            for bucket in _option_buckets("checkbox", answer):
+                counts[(survey_id, qid, "option", bucket)] += 1
+    return counts
+
+def rebuild_survey_aggregates(db: Session, survey_id: int) -> Dict[str, Any]:
+    """
+    Replace a survey's aggregates with a fresh recount and report how many
+    buckets had drifted from the incremental values. Commits.
+    """
+    current = Counter({
+        (survey_id, qid, dim, bucket): count
+        for qid, dim, bucket, count in db.execute(
+            select(SurveyQuestionAggregate.question_id, SurveyQuestionAggregate.dimension,
+                   SurveyQuestionAggregate.bucket, SurveyQuestionAggregate.count)
+            .where(SurveyQuestionAggregate.survey_id == survey_id)
+        )
+        if count
+    })
+    fresh = _recount(db, survey_id)
+    drifted = sorted(key for key in set(current) | set(fresh) if current.get(key, 0) != fresh.get(key, 0))
+
+    db.execute(delete(SurveyQuestionAggregate).where(SurveyQuestionAggregate.survey_id == survey_id))
+    apply_deltas(db, fresh)
+    db.commit()
+    return {
+        "survey_id": survey_id,
+        "buckets": len(fresh),
+        "drifted_buckets": len(drifted),
+        "drifted": [
+            {"question_id": qid, "dimension": dim, "bucket": bucket,
+             "stored": current.get((sid, qid, dim, bucket), 0), "actual": fresh.get((sid, qid, dim, bucket), 0)}
+            for sid, qid, dim, bucket in drifted[:100]
+        ],
+    }
+
+if __name__ == "__main__":
+    # python -m app.services.aggregate_service [--survey-id N]
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild survey_question_aggregates from responses")
+    parser.add_argument("--survey-id", type=int, help="Rebuild one survey (default: all)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        survey_ids = [args.survey_id] if args.survey_id else [sid for (sid,) in db.query(Survey.id)]
+        for sid in survey_ids:
+            report = rebuild_survey_aggregates(db, sid)
+            print(f"survey {sid}: {report['buckets']} buckets, {report['drifted_buckets']} drifted")
+    finally:
+        db.close()
@@ -1,60 +1,431 @@
-from typing import Optional
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import String, case, cast, distinct, func, select
 from sqlalchemy.orm import Session
-from app.models import Question, Response
-from app.schemas import AdaptiveQuestionResponse
+from app.models import Question, Response, Survey
+from app.services import session_state_service, snapshot_service, survey_cache_service
+from app.services.branching_service import NextStep
+from app.services.snapshot_service import to_float
+from app.services.survey_cache_service import CompiledQuestion
+from app.services.validation_service import mask_bits
+
+# Rows fetched per round trip when streaming answers for in-memory aggregation
+ANALYTICS_STREAM_BATCH = 10000
+
+NUMERIC_PERCENTILES = (5, 25, 50, 75, 95)
 
 def get_next_adaptive_question(
     survey_id: int, respondent_id: str, language: str, db: Session
-) -> Optional[AdaptiveQuestionResponse]:
+) -> Optional[Tuple[CompiledQuestion, NextStep]]:
+    """
+    Next question to ask, following the survey's compiled branching plan
+    from the respondent's cached session state.
+    The caller renders it with question.payload(language, ...).
+    Returns None if the survey is missing or fully answered.
+    """
     try:
-        # Fetch already answered question IDs for this respondent
-        answered_qs = (
-            db.query(Response.question_id)
-            .filter(
-                Response.survey_id == survey_id,
-                Response.respondent_id == respondent_id,
-            )
-            .distinct()
-            .all()
-        )
-        answered_ids = {q[0] for q in answered_qs}
-
-        # Get next unanswered question ordered by order_index
-        next_q = (
-            db.query(Question)
-            .filter(Question.survey_id == survey_id)
-            .filter(~Question.id.in_(answered_ids))
-            .order_by(Question.order_index)
-            .first()
-        )
-
-        if not next_q:
-            return None  # All questions answered
-
-        # Multilingual question text
-        question_text = (
-            next_q.translations.get(language, next_q.question_text)
-            if getattr(next_q, "translations", None)
-            else next_q.question_text
-        )
-
-        # Build response with all features
-        return AdaptiveQuestionResponse(
-            question_id=next_q.id,
-            question_text=question_text,
-            question_type=next_q.question_type,
-            options=next_q.options or [],
-            order_index=next_q.order_index,
-            completed=False,
-            translations=next_q.translations,
-            audio_file_uri=next_q.audio_file_uri,
-            voice_enabled=next_q.voice_enabled,
-            audio_metadata=next_q.audio_metadata,
-            adaptive_enabled=next_q.adaptive_enabled,
-            adaptive_config=next_q.adaptive_config,
-            ai_generated=next_q.ai_generated,
-            ai_metadata=next_q.ai_metadata,
-        )
+        compiled = survey_cache_service.get_compiled_survey(db, survey_id)
+        if compiled is None:
+            return None
+
+        state = session_state_service.load_state(db, survey_id, respondent_id, compiled.version)
+        step = compiled.next_step(state.answers, state.cursor)
+        state.cursor = step.cursor if step else len(compiled.question_ids)
+        session_state_service.save_state(state)
+        if step is None:
+            return None
+        return compiled.question_at(step), step
 
     except Exception as e:
         raise Exception(f"Adaptive question fetch failed: {str(e)}")
+
+# --------- Survey Analytics ---------
+def _parse_day(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Invalid {name} '{value}', expected YYYY-MM-DD")
+
+def _numeric_summary(values: np.ndarray) -> Dict[str, Any]:
+    valid = values[~np.isnan(values)]
+    if valid.size == 0:
+        return {"count": 0, "invalid": int(values.size)}
+    percentiles = np.percentile(valid, NUMERIC_PERCENTILES)
+    return {
+        "count": int(valid.size),
+        "invalid": int(values.size - valid.size),
+        "mean": round(float(valid.mean()), 4),
+        "median": round(float(np.median(valid)), 4),
+        "std": round(float(valid.std()), 4),
+        "min": float(valid.min()),
+        "max": float(valid.max()),
+        "percentiles": {f"p{p}": round(float(v), 4) for p, v in zip(NUMERIC_PERCENTILES, percentiles)},
+    }
+
+def decode_answer(raw: Optional[str]) -> Any:
+    """Answer value from JSON text, as answers grouped on cast(answer, String) come back."""
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+def _stream_answers(db: Session, filters: List[Any], question_ids: List[int]):
+    """Yield (question_ids, answers) column batches without building ORM objects."""
+    if not question_ids:
+        return
+    stmt = (
+        select(Response.question_id, Response.answer)
+        .where(*filters, Response.question_id.in_(question_ids))
+        .execution_options(yield_per=ANALYTICS_STREAM_BATCH)
+    )
+    for partition in db.execute(stmt).partitions():
+        qids, answers = zip(*partition)
+        yield np.fromiter(qids, dtype=np.int64, count=len(qids)), answers
+
+class _Counts(NamedTuple):
+    """Everything the analytics report needs, from whichever source computed it."""
+    total_responses: int
+    respondents_started: int
+    respondents_completed: int
+    reached: Dict[int, int]
+    languages: Dict[str, int]
+    voice: Dict[str, int]
+    validation_status: Dict[str, int]
+    choice_counts: Dict[int, Counter]
+    multi_counts: Dict[int, Counter]
+    numeric: Dict[int, np.ndarray]
+
+def _respondent_totals(db: Session, filters: List[Any], question_count: int) -> Tuple[int, int]:
+    """(respondents started, respondents who answered every counted question), one GROUP BY."""
+    per_respondent = (
+        select(func.count(distinct(Response.question_id)).label("answered"))
+        .where(*filters)
+        .group_by(Response.respondent_id)
+        .subquery()
+    )
+    started, completed = db.execute(
+        select(func.count(), func.coalesce(func.sum(case((per_respondent.c.answered >= question_count, 1), else_=0)), 0))
+        .select_from(per_respondent)
+    ).one()
+    return started, (completed if question_count else 0)
+
+def _numeric_values(db: Session, filters: List[Any], question_ids: List[int]) -> Dict[int, np.ndarray]:
+    """Numeric answers per question as float arrays (NaN where not numeric), streamed in column batches."""
+    chunks: Dict[int, List[np.ndarray]] = defaultdict(list)
+    for qids, answers in _stream_answers(db, filters, question_ids):
+        values = np.fromiter((to_float(a) for a in answers), dtype=np.float64, count=len(answers))
+        for qid in np.unique(qids):
+            chunks[int(qid)].append(values[qids == qid])
+    return {qid: np.concatenate(parts) for qid, parts in chunks.items()}
+
+def _numeric_ids(questions) -> List[int]:
+    return [q.id for q in questions if (q.validation_rules or {}).get("numeric_only")]
+
+def _option_label(labels: List[str], code: int) -> str:
+    return labels[code] if 0 <= code < len(labels) else f"#{code}"
+
+def _live_counts(db: Session, questions, filters: List[Any]) -> _Counts:
+    question_ids = [q.id for q in questions]
+
+    def grouped(column, label) -> Dict[str, int]:
+        counts: Counter = Counter()
+        for value, count in db.execute(select(column, func.count()).where(*filters).group_by(column)):
+            counts[label(value)] += count
+        return dict(counts)
+
+    total_responses = db.execute(select(func.count()).where(*filters)).scalar()
+    started, completed = _respondent_totals(db, filters, len(question_ids))
+
+    # Completion funnel: distinct respondents reaching each question
+    reached = dict(db.execute(
+        select(Response.question_id, func.count(distinct(Response.respondent_id)))
+        .where(*filters)
+        .group_by(Response.question_id)
+    ).all())
+
+    # Choice frequencies are integer GROUP BYs on the option codes; answers
+    # without a code (legacy rows, labels outside the options) group on their JSON
+    labels = {q.id: [str(opt) for opt in (q.options or [])] for q in questions}
+    answer_text = cast(Response.answer, String)
+    choice_ids = [q.id for q in questions if q.question_type == "radio"]
+    choice_counts: Dict[int, Counter] = defaultdict(Counter)
+    if choice_ids:
+        in_choice = Response.question_id.in_(choice_ids)
+        for qid, code, count in db.execute(
+            select(Response.question_id, Response.answer_code, func.count())
+            .where(*filters, in_choice, Response.answer_code.isnot(None))
+            .group_by(Response.question_id, Response.answer_code)
+        ):
+            choice_counts[qid][_option_label(labels[qid], code)] += count
+        rows = db.execute(
+            select(Response.question_id, answer_text, func.count())
+            .where(*filters, in_choice, Response.answer_code.is_(None))
+            .group_by(Response.question_id, answer_text)
+        ).all()
+        for qid, raw, count in rows:
+            choice_counts[qid][str(decode_answer(raw))] += count
+
+    checkbox_ids = [q.id for q in questions if q.question_type == "checkbox"]
+    multi_counts: Dict[int, Counter] = defaultdict(Counter)
+    if checkbox_ids:
+        for qid, mask, count in db.execute(
+            select(Response.question_id, Response.answer_mask, func.count())
+            .where(*filters, Response.question_id.in_(checkbox_ids), Response.answer_mask.isnot(None))
+            .group_by(Response.question_id, Response.answer_mask)
+        ):
+            for code in mask_bits(mask):
+                multi_counts[qid][_option_label(labels[qid], code)] += count
+
+    # Uncoded multi-select and numeric answers need per-row parsing, done in column batches
+    for qids, answers in _stream_answers(db, [*filters, Response.answer_mask.is_(None)], checkbox_ids):
+        for qid, answer in zip(qids.tolist(), answers):
+            selected = answer if isinstance(answer, list) else [answer]
+            multi_counts[qid].update(str(opt) for opt in selected if opt is not None)
+
+    return _Counts(
+        total_responses=total_responses,
+        respondents_started=started,
+        respondents_completed=completed,
+        reached=reached,
+        languages=grouped(Response.language, lambda lang: lang or "unknown"),
+        voice=grouped(Response.voice_enabled, lambda flag: "voice" if flag else "text"),
+        validation_status=grouped(Response.validation_status, lambda status: status or "unknown"),
+        choice_counts=choice_counts,
+        multi_counts=multi_counts,
+        numeric=_numeric_values(db, filters, _numeric_ids(questions)),
+    )
+
+def _snapshot_counts(
+    table: snapshot_service.MergedTable,
+    questions,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    language: Optional[str],
+    voice_enabled: Optional[bool],
+) -> _Counts:
+    """Same counts as _live_counts, computed on the memory-mapped snapshot plus delta."""
+    question_ids = [q.id for q in questions]
+    question_col = table.column("question_id")
+    mask = np.isin(question_col, question_ids)
+    if start or end:
+        mask &= table.created_mask(start, end + timedelta(days=1) if end else None)
+    if language:
+        code = table.language_code(language)
+        mask &= table.column("language") == (code if code is not None else -2)
+    if voice_enabled is not None:
+        mask &= table.column("voice") == int(voice_enabled)
+
+    qids = question_col[mask]
+    respondents = table.column("respondent")[mask]
+    answers = table.column("answer")[mask]
+
+    def grouped(name: str, label) -> Dict[str, int]:
+        counts: Counter = Counter()
+        codes, freq = np.unique(table.column(name)[mask], return_counts=True)
+        for code, count in zip(codes.tolist(), freq.tolist()):
+            counts[label(code)] += count
+        return dict(counts)
+
+    # One row per (respondent, question), so row counts are respondent counts
+    reached = dict(zip(*(a.tolist() for a in np.unique(qids, return_counts=True))))
+    _, answered = np.unique(respondents, return_counts=True)
+    completed = int((answered >= len(question_ids)).sum()) if question_ids else 0
+
+    def pair_counts(ids: List[int], values: np.ndarray, where: np.ndarray):
+        # Each distinct (question, value) pair is labelled or decoded once rather than every row
+        selected = np.isin(qids, ids) & where
+        if not selected.any():
+            return []
+        pairs, freq = np.unique(np.stack([qids[selected], values[selected]], axis=1), axis=0, return_counts=True)
+        return [(int(qid), int(value), int(count)) for (qid, value), count in zip(pairs, freq)]
+
+    labels = {q.id: [str(opt) for opt in (q.options or [])] for q in questions}
+    radio_ids = [q.id for q in questions if q.question_type == "radio"]
+    checkbox_ids = [q.id for q in questions if q.question_type == "checkbox"]
+    codes = table.column("answer_code")[mask]
+    coded = codes >= 0
+    choice_counts: Dict[int, Counter] = defaultdict(Counter)
+    for qid, code, count in pair_counts(radio_ids, codes, coded):
+        choice_counts[qid][_option_label(labels[qid], code)] += count
+    for qid, code, count in pair_counts(radio_ids, answers, ~coded):
+        choice_counts[qid][str(table.answer_value(code))] += count
+
+    has_mask = table.column("has_mask")[mask]
+    multi_counts: Dict[int, Counter] = defaultdict(Counter)
+    for qid, bits, count in pair_counts(checkbox_ids, table.column("answer_mask")[mask], has_mask):
+        for code in mask_bits(bits):
+            multi_counts[qid][_option_label(labels[qid], code)] += count
+    for qid, code, count in pair_counts(checkbox_ids, answers, ~has_mask):
+        answer = table.answer_value(code)
+        for opt in (answer if isinstance(answer, list) else [answer]):
+            if opt is not None:
+                multi_counts[qid][str(opt)] += count
+
+    numeric = {}
+    for q in questions:
+        if (q.validation_rules or {}).get("numeric_only"):
+            numeric[q.id] = table.answer_numbers[answers[qids == q.id]]
+
+    statuses, languages = table.statuses, table.languages
+    return _Counts(
+        total_responses=int(mask.sum()),
+        respondents_started=int(answered.size),
+        respondents_completed=completed,
+        reached=reached,
+        languages=grouped("language", lambda code: (languages[code] if code >= 0 else None) or "unknown"),
+        voice=grouped("voice", lambda flag: "voice" if flag > 0 else "text"),
+        validation_status=grouped("validation_status", lambda code: (statuses[code] if code >= 0 else None) or "unknown"),
+        choice_counts=choice_counts,
+        multi_counts=multi_counts,
+        numeric=numeric,
+    )
+
+def _aggregate_counts(db: Session, survey_id: int, questions) -> _Counts:
+    """
+    Counts from survey_question_aggregates; cost grows with questions, not
+    responses. Respondent totals and numeric summaries are not materialized
+    and come from the responses table.
+    """
+    # Local import: aggregate_service imports this module
+    from app.services import aggregate_service
+
+    buckets = aggregate_service.question_buckets(db, survey_id)
+    question_ids = [q.id for q in questions]
+    summed: Dict[str, Counter] = defaultdict(Counter)
+    for qid in question_ids:
+        for dimension in ("total", "language", "voice", "validation_status"):
+            summed[dimension].update(buckets.get(qid, {}).get(dimension, {}))
+    options = {q.id: Counter(buckets.get(q.id, {}).get("option", {})) for q in questions}
+
+    filters = [Response.survey_id == survey_id, Response.question_id.in_(question_ids)]
+    started, completed = _respondent_totals(db, filters, len(question_ids))
+    return _Counts(
+        total_responses=summed["total"].get("all", 0),
+        respondents_started=started,
+        respondents_completed=completed,
+        reached={qid: buckets[qid]["total"]["all"] for qid in question_ids if buckets.get(qid, {}).get("total", {}).get("all")},
+        languages=dict(summed["language"]),
+        voice=dict(summed["voice"]),
+        validation_status=dict(summed["validation_status"]),
+        choice_counts={q.id: options[q.id] for q in questions if q.question_type == "radio"},
+        multi_counts={q.id: options[q.id] for q in questions if q.question_type == "checkbox"},
+        numeric=_numeric_values(db, filters, _numeric_ids(questions)),
+    )
+
+def generate_survey_analytics(
+    survey_id: int,
+    db: Session,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    language: Optional[str] = None,
+    voice_enabled: Optional[bool] = None,
+    adaptive_enabled: Optional[bool] = None,
+    ai_generated: Optional[bool] = None,
+    use_snapshot: bool = True,
+    use_aggregates: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    Summarize responses for a survey. With use_aggregates and no
+    response-level filter (dates, language, voice), counts come from the
+    materialized aggregates. Otherwise surveys with a columnar snapshot are
+    counted from it plus the delta of newer rows, and the rest push counts
+    into SQL GROUP BY and stream checkbox and numeric answers in column
+    batches. Every source returns the same report. Returns None if the
+    survey does not exist.
+    """
+    survey = db.query(Survey.id, Survey.title).filter(Survey.id == survey_id).first()
+    if not survey:
+        return None
+
+    # Question-level filters (adaptive / AI flags) select which questions count
+    question_query = db.query(
+        Question.id, Question.question_text, Question.question_type, Question.options,
+        Question.validation_rules, Question.order_index, Question.nss_code,
+    ).filter(Question.survey_id == survey_id)
+    if adaptive_enabled is not None:
+        question_query = question_query.filter(Question.adaptive_enabled == adaptive_enabled)
+    if ai_generated is not None:
+        question_query = question_query.filter(Question.ai_generated == ai_generated)
+    questions = question_query.order_by(Question.order_index, Question.id).all()
+    question_ids = [q.id for q in questions]
+
+    start = _parse_day(start_date, "start_date")
+    end = _parse_day(end_date, "end_date")
+    response_filtered = any(f is not None for f in (start, end, language, voice_enabled))
+    if use_aggregates and not response_filtered:
+        source = "aggregates"
+        counts = _aggregate_counts(db, survey_id, questions)
+    elif use_snapshot and (table := snapshot_service.read_table(db, survey_id)) is not None:
+        source = "snapshot"
+        counts = _snapshot_counts(table, questions, start, end, language, voice_enabled)
+    else:
+        # Response-level filters
+        filters = [Response.survey_id == survey_id, Response.question_id.in_(question_ids)]
+        if start:
+            filters.append(Response.created_at >= start)
+        if end:
+            filters.append(Response.created_at < end + timedelta(days=1))  # inclusive end day
+        if language:
+            filters.append(Response.language == language)
+        if voice_enabled is not None:
+            filters.append(Response.voice_enabled == int(voice_enabled))
+        source = "live"
+        counts = _live_counts(db, questions, filters)
+
+    question_stats = []
+    for q in questions:
+        stats: Dict[str, Any] = {
+            "question_id": q.id,
+            "question_text": q.question_text,
+            "question_type": q.question_type,
+            "nss_code": q.nss_code,
+            "order_index": q.order_index,
+            "respondents": counts.reached.get(q.id, 0),
+        }
+        if q.question_type in ("radio", "checkbox"):
+            option_counts = (counts.choice_counts if q.question_type == "radio" else counts.multi_counts).get(q.id, Counter())
+            stats["option_counts"] = {str(opt): option_counts.get(str(opt), 0) for opt in (q.options or [])}
+            stats["other_counts"] = {k: v for k, v in option_counts.items() if k not in stats["option_counts"]}
+        if (q.validation_rules or {}).get("numeric_only"):
+            stats["numeric"] = _numeric_summary(counts.numeric.get(q.id, np.empty(0)))
+        question_stats.append(stats)
+
+    started = counts.respondents_started
+    completed = counts.respondents_completed
+    return {
+        "survey_id": survey.id,
+        "title": survey.title,
+        "source": source,
+        "filters": {
+            "start_date": start_date,
+            "end_date": end_date,
+            "language": language,
+            "voice_enabled": voice_enabled,
+            "adaptive_enabled": adaptive_enabled,
+            "ai_generated": ai_generated,
+        },
+        "total_responses": counts.total_responses,
+        "total_respondents": started,
+        "completion": {
+            "total_questions": len(question_ids),
+            "respondents_started": started,
+            "respondents_completed": completed,
+            "completion_rate": round((completed / started) * 100, 2) if started else 0,
+            "funnel": [
+                {"question_id": q.id, "order_index": q.order_index, "respondents": counts.reached.get(q.id, 0)}
+                for q in questions
+            ],
+        },
+        "languages": counts.languages,
+        "voice": counts.voice,
+        "validation_status": counts.validation_status,
+        "questions": question_stats,
+    }
@@ -0,0 +1,274 @@
+# backend/app/services/audio_upload_service.py
+"""
+Resumable chunked uploads for recorded answers.
+
+    init      -> upload id; chunks are appended to AUDIO_STORE_DIR/partial/<id>.part
+    append    -> body streamed to disk at the client's offset; a mismatch
+                 returns the server offset so the client resumes from there
+    finalize  -> sha256 verified, file moved to the content-addressed
+                 AUDIO_STORE_DIR/objects/<aa>/<sha256>.<ext> and linked into
+                 Response.audio_file_uri / audio_metadata
+
+A recording and its answer can arrive in either order: finalize links the
+answer if it is already stored (and re-validates it), and submits pick up
+the finalized recording through attach_audio. Answers re-submitted without
+audio keep the recording they have.
+
+The partial file's size on disk is the source of truth for the offset, so
+uploads survive dropped connections and process restarts. Appends to one
+upload are serialized per process; run a single writer per upload id.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import uuid
+import wave
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models import AudioUpload, Response
+from app.services import response_service
+
+AUDIO_STORE_DIR = os.getenv("AUDIO_STORE_DIR", "./audio_store")
+AUDIO_UPLOAD_MAX_BYTES = int(os.getenv("AUDIO_UPLOAD_MAX_BYTES", str(512 * 1024 * 1024)))
+AUDIO_URI_PREFIX = "/api/responses/responses/audio/"
+# When set (e.g. /protected-audio/), downloads are handed to nginx via X-Accel-Redirect
+AUDIO_ACCEL_REDIRECT_PREFIX = os.getenv("AUDIO_ACCEL_REDIRECT_PREFIX", "")
+
+EXTENSIONS = {
+    "audio/wav": "wav", "audio/x-wav": "wav", "audio/wave": "wav",
+    "audio/mpeg": "mp3", "audio/mp3": "mp3",
+    "audio/ogg": "ogg", "audio/opus": "opus", "audio/webm": "webm",
+    "audio/mp4": "m4a", "audio/m4a": "m4a", "audio/x-m4a": "m4a", "audio/aac": "aac",
+    "audio/flac": "flac", "audio/amr": "amr", "audio/3gpp": "3gp",
+}
+MEDIA_TYPES = {ext: content_type for content_type, ext in reversed(list(EXTENSIONS.items()))}
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+_append_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}   # upload id -> (lock, appends holding or waiting)
+
+# Columns re-written when a recording is linked to a stored answer
+RELINK_COLUMNS = (
+    "survey_id", "question_id", "respondent_id", "answer", "language",
+    "validation_status", "voice_enabled", "ai_context",
+)
+
+class UploadError(ValueError):
+    pass
+
+class OffsetMismatch(UploadError):
+    def __init__(self, expected: int):
+        super().__init__(f"Upload is at offset {expected}")
+        self.expected = expected
+
+class ChecksumMismatch(UploadError):
+    pass
+
+def _partial_path(upload_id: str) -> str:
+    return os.path.join(AUDIO_STORE_DIR, "partial", f"{upload_id}.part")
+
+def is_sha256(value: str) -> bool:
+    return bool(_SHA256_RE.match(value))
+
+def object_path(sha256: str, ext: str) -> str:
+    return os.path.join(AUDIO_STORE_DIR, "objects", sha256[:2], f"{sha256}.{ext}")
+
+def current_offset(upload_id: str) -> int:
+    try:
+        return os.path.getsize(_partial_path(upload_id))
+    except FileNotFoundError:
+        return 0
+
+def create_upload(db: Session, survey_id: int, question_id: int, respondent_id: str, content_type: str, total_bytes: Optional[int]) -> AudioUpload:
+    """Register an upload and create its empty partial file. Does not commit."""
+    if content_type not in EXTENSIONS:
+        raise UploadError(f"Unsupported audio type: {content_type}")
+    if total_bytes is not None and total_bytes > AUDIO_UPLOAD_MAX_BYTES:
+        raise UploadError(f"Upload exceeds {AUDIO_UPLOAD_MAX_BYTES} bytes")
+    upload = AudioUpload(
+        id=uuid.uuid4().hex,
+        survey_id=survey_id,
+        question_id=question_id,
+        respondent_id=respondent_id,
+        content_type=content_type,
+        total_bytes=total_bytes,
+        received_bytes=0,
+        status="uploading",
+    )
+    os.makedirs(os.path.dirname(_partial_path(upload.id)), exist_ok=True)
+    open(_partial_path(upload.id), "wb").close()
+    db.add(upload)
+    return upload
+
+async def append_chunk(upload: AudioUpload, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """
+    Stream a chunk to the end of the partial file if offset matches what is
+    on disk. Returns the new offset; whatever arrived before a dropped
+    connection is kept.
+    """
+    if upload.status != "uploading":
+        raise UploadError("Upload is already finalized")
+    async with _append_lock(upload.id):
+        expected = current_offset(upload.id)
+        if offset != expected:
+            raise OffsetMismatch(expected)
+        limit = upload.total_bytes or AUDIO_UPLOAD_MAX_BYTES
+        written = expected
+        # File writes go to a thread, so a slow disk does not stall the event loop
+        part = await asyncio.to_thread(open, _partial_path(upload.id), "ab")
+        try:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > limit:
+                    raise UploadError(f"Upload exceeds {limit} bytes")
+                await asyncio.to_thread(part.write, chunk)
+        finally:
+            await asyncio.to_thread(part.close)
+        return written
+
+@asynccontextmanager
+async def _append_lock(upload_id: str):
+    """Per-upload lock, dropped once no append holds or waits for it (abandoned uploads leave nothing behind)."""
+    lock, users = _append_locks.get(upload_id, (None, 0))
+    lock = lock or asyncio.Lock()
+    _append_locks[upload_id] = (lock, users + 1)
+    try:
+        async with lock:
+            yield
+    finally:
+        lock, users = _append_locks[upload_id]
+        if users > 1:
+            _append_locks[upload_id] = (lock, users - 1)
+        else:
+            del _append_locks[upload_id]
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _probe(path: str, ext: str) -> Dict[str, Any]:
+    metadata: Dict[str, Any] = {"format": ext, "bytes": os.path.getsize(path)}
+    if ext == "wav":
+        try:
+            with wave.open(path, "rb") as wav:
+                metadata.update(
+                    duration_seconds=round(wav.getnframes() / float(wav.getframerate()), 3),
+                    sample_rate=wav.getframerate(),
+                    channels=wav.getnchannels(),
+                )
+        except (wave.Error, EOFError, ZeroDivisionError):
+            pass
+    return metadata
+
+def store_object(upload: AudioUpload, expected_sha256: str) -> Dict[str, Any]:
+    """
+    Verify the checksum and move the partial file into the object store.
+    Blocking (hashes the whole file); a mismatch discards the partial data.
+    """
+    partial = _partial_path(upload.id)
+    if upload.total_bytes is not None and current_offset(upload.id) != upload.total_bytes:
+        raise UploadError(f"Upload incomplete: {current_offset(upload.id)} of {upload.total_bytes} bytes")
+    actual = _sha256(partial)
+    if actual != expected_sha256.lower():
+        open(partial, "wb").close()
+        raise ChecksumMismatch(f"Checksum mismatch (got {actual}); upload restarted at offset 0")
+
+    ext = EXTENSIONS[upload.content_type]
+    target = object_path(actual, ext)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(target):
+        os.remove(partial)   # identical recording already stored
+    else:
+        os.replace(partial, target)
+    return {"sha256": actual, "uri": f"{AUDIO_URI_PREFIX}{actual}.{ext}", **_probe(target, ext)}
+
+def finalize_upload(db: Session, upload: AudioUpload, stored: Dict[str, Any]) -> bool:
+    """
+    Record a stored object (see store_object) on the upload and link it to
+    the matching response, if one exists yet. Returns whether a response
+    was linked. Does not commit.
+    """
+    upload.status = "complete"
+    upload.sha256 = stored["sha256"]
+    upload.uri = stored["uri"]
+    upload.received_bytes = stored["bytes"]
+    upload.audio_metadata = {k: v for k, v in stored.items() if k not in ("sha256", "uri")}
+    return link_response(db, upload)
+
+def _audio_metadata(upload: AudioUpload, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        **(metadata or {}),
+        **(upload.audio_metadata or {}),
+        "uri": upload.uri,
+        "sha256": upload.sha256,
+        "content_type": upload.content_type,
+        "upload_id": upload.id,
+    }
+
+def link_response(db: Session, upload: AudioUpload) -> bool:
+    """
+    Put a finalized recording on the answer it belongs to, re-validating
+    the answer (a required voice answer submitted first was invalid) and
+    moving its aggregate counts. Returns False if there is no answer yet.
+    """
+    response = db.execute(
+        select(Response).where(
+            Response.survey_id == upload.survey_id,
+            Response.respondent_id == upload.respondent_id,
+            Response.question_id == upload.question_id,
+        )
+    ).scalar_one_or_none()
+    if response is None or upload.uri is None:
+        return False
+    values = {name: getattr(response, name) for name in RELINK_COLUMNS}
+    values["audio_file_uri"] = upload.uri
+    values["audio_metadata"] = _audio_metadata(upload, response.audio_metadata)
+    response_service.validate_responses(db, [values])
+    response_service.upsert_responses(db, [values])
+    return True
+
+def attach_audio(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Fill in the recording of answers submitted without audio_file_uri: the
+    respondent's finalized upload for that question, else the recording the
+    stored answer already has (a re-submit or offline re-sync must not drop
+    it). Call before validation, which checks required voice answers.
+    """
+    missing: Dict[response_service.ResponseKey, List[Dict[str, Any]]] = defaultdict(list)
+    for values in rows:
+        if not values.get("audio_file_uri"):
+            missing[response_service.response_key(values)].append(values)
+    keys = list(missing)
+    for start in range(0, len(keys), response_service.BATCH_CHUNK_SIZE):
+        chunk = keys[start:start + response_service.BATCH_CHUNK_SIZE]
+        found: Dict[response_service.ResponseKey, Tuple[str, Dict[str, Any]]] = {}
+        for row in db.execute(
+            select(*response_service.KEY_COLUMNS, Response.audio_file_uri, Response.audio_metadata)
+            .where(tuple_(*response_service.KEY_COLUMNS).in_(chunk), Response.audio_file_uri.isnot(None))
+        ):
+            found[(row.survey_id, row.respondent_id, row.question_id)] = (row.audio_file_uri, row.audio_metadata or {})
+        # Oldest first, so the latest finalized recording wins
+        uploads = db.execute(
+            select(AudioUpload)
+            .where(
+                tuple_(AudioUpload.survey_id, AudioUpload.respondent_id, AudioUpload.question_id).in_(chunk),
+                AudioUpload.status == "complete",
+            )
+            .order_by(AudioUpload.updated_at, AudioUpload.id)
+        ).scalars()
+        for upload in uploads:
+            key = (upload.survey_id, upload.respondent_id, upload.question_id)
+            found[key] = (upload.uri, _audio_metadata(upload, found.get(key, (None, {}))[1]))
+        for key, (uri, metadata) in found.items():
+            for values in missing[key]:
+                values["audio_file_uri"] = uri
+                values["audio_metadata"] = {**metadata, **(values.get("audio_metadata") or {})}
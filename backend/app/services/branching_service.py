@@ -0,0 +1,225 @@
+# backend/app/services/branching_service.py
+"""
+Skip/branch rules for adaptive surveys, compiled once per survey version.
+
+Rules live in Question.adaptive_config (or validation_rules as a fallback):
+
+    "show_if": <condition>                    ask only when the condition holds
+    "skip_to": [{"when": <condition>, "target": <ref> | "end"}, ...]
+                                              after this question is answered,
+                                              jump forward to the first target
+                                              whose condition holds
+    "roster":  {"source": <ref>, "max": 50}   ask once per roster member; the
+                                              size is the source answer (a
+                                              number, or the length of a list)
+
+A <ref> is a question id or nss_code. A <condition> is
+{"question": <ref>, "op": <op>, "value": ...} or {"all"|"any": [...]} or
+{"not": <condition>}, with op one of answered, not_answered, eq, neq, in,
+not_in, contains, gt, gte, lt, lte.
+
+Rules may only reference earlier questions and jump forward, so the plan is
+a DAG over order_index. A walk can therefore resume from a saved cursor and
+only needs to rewind when an answer before the cursor changes.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+Answers = Mapping[int, Any]
+Condition = Callable[[Answers], bool]
+
+DEFAULT_ROSTER_MAX = 50
+
+def _as_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _compare(op: str, answer: Any, value: Any) -> bool:
+    if op == "eq":
+        return answer == value
+    if op == "neq":
+        return answer != value
+    if op == "in":
+        return answer in (value or [])
+    if op == "not_in":
+        return answer not in (value or [])
+    if op == "contains":
+        return isinstance(answer, list) and value in answer
+    left, right = _as_number(answer), _as_number(value)
+    if left is None or right is None:
+        return False
+    return {
+        "gt": left > right,
+        "gte": left >= right,
+        "lt": left < right,
+        "lte": left <= right,
+    }.get(op, False)
+
+class RuleError(ValueError):
+    pass
+
+class _Node:
+    __slots__ = ("question_id", "position", "show_if", "skips", "roster_source", "roster_max")
+
+    def __init__(self, question_id: int, position: int):
+        self.question_id = question_id
+        self.position = position
+        self.show_if: Optional[Condition] = None
+        self.skips: Tuple[Tuple[Condition, int], ...] = ()
+        self.roster_source: Optional[int] = None
+        self.roster_max = DEFAULT_ROSTER_MAX
+
+    def roster_size(self, answers: Answers) -> int:
+        source = answers.get(self.roster_source)
+        if isinstance(source, list):
+            size = len(source)
+        else:
+            number = _as_number(source)
+            size = int(number) if number is not None else 0
+        return max(0, min(size, self.roster_max))
+
+class NextStep(NamedTuple):
+    position: int
+    question_id: int
+    roster_member: Optional[int]    # 1-based member to ask about, for roster questions
+    roster_size: Optional[int]
+    cursor: int                     # resume point for the next walk
+
+class BranchingPlan:
+    """Compiled rules for one survey, indexed by question position."""
+
+    def __init__(self, question_ids: Sequence[int], nodes: List[_Node], dependencies: Dict[int, Set[int]]):
+        self.question_ids = tuple(question_ids)
+        self._nodes = nodes
+        # question_id -> positions of rules reading that answer
+        self.dependencies = dependencies
+        self.has_rules = any(n.show_if or n.skips or n.roster_source is not None for n in nodes)
+
+    def rewind_position(self, question_id: int) -> Optional[int]:
+        """
+        Earliest position whose decision reads this question's answer, i.e.
+        where a saved cursor must rewind to when that answer changes.
+        None means no rule depends on it and the cursor stays valid.
+        """
+        positions = self.dependencies.get(question_id)
+        return min(positions) if positions else None
+
+    def next_step(self, answers: Answers, cursor: int = 0) -> Optional[NextStep]:
+        """
+        First question to ask given the answers so far, walking from cursor.
+        For roster questions the answer is a list with one entry per member.
+        """
+        nodes = self._nodes
+        position = max(0, cursor)
+        while position < len(nodes):
+            node = nodes[position]
+            if node.show_if is not None and not node.show_if(answers):
+                position += 1
+                continue
+
+            roster_size = None
+            if node.roster_source is not None:
+                roster_size = node.roster_size(answers)
+                if roster_size == 0:
+                    position += 1
+                    continue
+                answer = answers.get(node.question_id)
+                done = len(answer) if isinstance(answer, list) else 0
+                if done < roster_size:
+                    return NextStep(position, node.question_id, done + 1, roster_size, position)
+            elif node.question_id not in answers:
+                return NextStep(position, node.question_id, None, None, position)
+
+            # Answered: follow the first skip rule that fires, else fall through
+            position = next(
+                (target for condition, target in node.skips if condition(answers)),
+                position + 1,
+            )
+        return None
+
+def _rules(question: Any) -> Dict[str, Any]:
+    config = question.adaptive_config or {}
+    fallback = question.validation_rules or {}
+    return {key: config.get(key, fallback.get(key)) for key in ("show_if", "skip_to", "roster")}
+
+def compile_plan(questions: Sequence[Any], adaptive_enabled: bool = True) -> BranchingPlan:
+    """
+    Build a BranchingPlan from questions already sorted in asking order.
+    Invalid rules are logged and dropped so one bad rule cannot block a survey.
+    """
+    question_ids = [q.id for q in questions]
+    position = {qid: idx for idx, qid in enumerate(question_ids)}
+    by_code = {q.nss_code: q.id for q in questions if getattr(q, "nss_code", None)}
+    nodes = [_Node(qid, idx) for idx, qid in enumerate(question_ids)]
+    dependencies: Dict[int, Set[int]] = {}
+
+    if not adaptive_enabled:
+        return BranchingPlan(question_ids, nodes, dependencies)
+
+    def resolve(ref: Any, at: int, inclusive: bool = False) -> int:
+        """Question id for a rule at position `at`; must not look ahead."""
+        qid = by_code.get(ref, ref)
+        if qid not in position:
+            raise RuleError(f"unknown question reference {ref!r}")
+        if position[qid] > at or (position[qid] == at and not inclusive):
+            raise RuleError(f"rule references {ref!r}, which is not an earlier question")
+        dependencies.setdefault(qid, set()).add(at)
+        return qid
+
+    def condition(spec: Any, at: int, inclusive: bool = False) -> Condition:
+        if not isinstance(spec, dict):
+            raise RuleError(f"condition must be an object, got {spec!r}")
+        if "all" in spec:
+            parts = [condition(part, at, inclusive) for part in spec["all"]]
+            return lambda answers: all(part(answers) for part in parts)
+        if "any" in spec:
+            parts = [condition(part, at, inclusive) for part in spec["any"]]
+            return lambda answers: any(part(answers) for part in parts)
+        if "not" in spec:
+            inner = condition(spec["not"], at, inclusive)
+            return lambda answers: not inner(answers)
+
+        qid = resolve(spec.get("question"), at, inclusive)
+        op, value = spec.get("op", "eq"), spec.get("value")
+        if op == "answered":
+            return lambda answers: qid in answers
+        if op == "not_answered":
+            return lambda answers: qid not in answers
+        return lambda answers: qid in answers and _compare(op, answers[qid], value)
+
+    for question, node in zip(questions, nodes):
+        if not getattr(question, "adaptive_enabled", True):
+            continue
+        rules = _rules(question)
+        try:
+            if rules["show_if"]:
+                node.show_if = condition(rules["show_if"], node.position)
+
+            skips = []
+            for rule in rules["skip_to"] or []:
+                target = rule.get("target")
+                if target == "end":
+                    target_position = len(nodes)
+                else:
+                    target_id = by_code.get(target, target)
+                    if target_id not in position or position[target_id] <= node.position:
+                        raise RuleError(f"skip target {target!r} must be a later question")
+                    target_position = position[target_id]
+                # Skip rules run once this question is answered, so it may test itself
+                skips.append((condition(rule.get("when", {}), node.position, inclusive=True), target_position))
+            node.skips = tuple(skips)
+
+            if rules["roster"]:
+                roster = rules["roster"]
+                node.roster_source = resolve(roster.get("source"), node.position)
+                node.roster_max = int(roster.get("max", DEFAULT_ROSTER_MAX))
+                # Each member's answer extends the list, so the node reads itself too
+                dependencies.setdefault(node.question_id, set()).add(node.position)
+        except (RuleError, AttributeError, TypeError, ValueError) as e:
+            logging.warning(f"Dropping branching rules on question {question.id}: {e}")
+            node.show_if, node.skips, node.roster_source = None, (), None
+
+    return BranchingPlan(question_ids, nodes, dependencies)
@@ -0,0 +1,218 @@
+# backend/app/services/export_service.py
+"""
+Streaming survey exports: one row per respondent, one column per question
+(headed by nss_code when the question has one).
+
+Answers are read in EXPORT_BATCH-row partitions ordered by respondent (the
+survey/respondent/question index, so no sort) through a server-side cursor,
+pivoted, rendered and yielded before the next partition is fetched. Memory
+stays at one chunk however large the round. Surveys with a columnar
+snapshot are read from its memory-mapped columns plus the delta instead.
+"""
+
+import csv
+import io
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Question, Response
+from app.services import snapshot_service
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:   # optional: only needed for format=parquet
+    pa = pq = None
+
+EXPORT_BATCH = int(os.getenv("EXPORT_BATCH", "5000"))
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+RESPONDENT_COLUMN = "respondent_id"
+
+Row = Tuple[str, List[Any]]
+
+def export_columns(db: Session, survey_id: int) -> List[Tuple[int, str]]:
+    """(question_id, header) in question order; duplicate codes get the id appended."""
+    questions = db.execute(
+        select(Question.id, Question.nss_code)
+        .where(Question.survey_id == survey_id)
+        .order_by(Question.order_index, Question.id)
+    ).all()
+    seen = {RESPONDENT_COLUMN}
+    columns = []
+    for qid, code in questions:
+        header = code or f"q{qid}"
+        if header in seen:
+            header = f"{header}_{qid}"
+        seen.add(header)
+        columns.append((qid, header))
+    return columns
+
+def iter_respondent_rows(db: Session, survey_id: int, question_ids: List[int]) -> Iterator[List[Row]]:
+    """
+    Batches of (respondent_id, answers in question_ids order). A respondent
+    whose answers straddle a partition boundary is held back to the next batch.
+    """
+    position = {qid: i for i, qid in enumerate(question_ids)}
+    stmt = (
+        select(Response.respondent_id, Response.question_id, Response.answer)
+        .where(Response.survey_id == survey_id)
+        .order_by(Response.respondent_id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    current: Optional[Row] = None
+    for partition in db.execute(stmt).partitions():
+        batch = []
+        for respondent_id, question_id, answer in partition:
+            if current is None or current[0] != respondent_id:
+                if current is not None:
+                    batch.append(current)
+                current = (respondent_id, [None] * len(question_ids))
+            index = position.get(question_id)
+            if index is not None:
+                current[1][index] = answer
+        yield batch
+    if current is not None:
+        yield [current]
+
+def iter_snapshot_rows(db: Session, snapshot: snapshot_service.Snapshot, question_ids: List[int]) -> Iterator[List[Row]]:
+    """
+    Like iter_respondent_rows, from a snapshot in EXPORT_BATCH-row slices.
+    Delta rows override their respondent's snapshot answers; respondents
+    new since the snapshot come last.
+    """
+    position = {qid: i for i, qid in enumerate(question_ids)}
+    delta = snapshot_service.load_delta(db, snapshot)
+    delta_ids = delta.columns["id"]
+    pending: Dict[int, List[Tuple[int, int]]] = {}
+    for code, qid, answer in zip(*(delta.columns[name].tolist() for name in ("respondent", "question_id", "answer"))):
+        pending.setdefault(code, []).append((qid, answer))
+
+    def finish(row: Row, code: int) -> Row:
+        for qid, answer in pending.pop(code, ()):
+            if qid in position:
+                row[1][position[qid]] = delta.answer_value(answer)
+        return row
+
+    current: Optional[Row] = None
+    current_code = -1
+    columns = snapshot.columns
+    for start in range(0, len(snapshot), EXPORT_BATCH):
+        window = slice(start, start + EXPORT_BATCH)
+        keep = np.isin(columns["id"][window], delta_ids, invert=True).tolist()
+        batch = []
+        rows = zip(*(columns[name][window].tolist() for name in ("respondent", "question_id", "answer")))
+        for i, (code, qid, answer) in enumerate(rows):
+            if code != current_code:
+                if current is not None:
+                    batch.append(finish(current, current_code))
+                current = (snapshot.respondent_name(code), [None] * len(question_ids))
+                current_code = code
+            index = position.get(qid)
+            if index is not None and keep[i]:
+                current[1][index] = snapshot.answer_value(answer)
+        yield batch
+    if current is not None:
+        yield [finish(current, current_code)]
+    yield [finish((delta.respondent_name(code), [None] * len(question_ids)), code) for code in sorted(pending)]
+
+def _cell(value: Any) -> Optional[str]:
+    # Checkbox lists and structured answers stay machine-readable
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+def _csv_chunks(headers: List[str], batches: Iterable[List[Row]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for batch in batches:
+        writer.writerows([respondent_id, *map(_cell, answers)] for respondent_id, answers in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def _jsonl_chunks(headers: List[str], batches: Iterable[List[Row]]) -> Iterator[bytes]:
+    for batch in batches:
+        if batch:
+            yield "".join(
+                json.dumps(dict(zip(headers, (respondent_id, *answers))), ensure_ascii=False) + "\n"
+                for respondent_id, answers in batch
+            ).encode("utf-8")
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def _parquet_chunks(headers: List[str], batches: Iterable[List[Row]]) -> Iterator[bytes]:
+    # All-string schema: answer types vary by question and even by respondent
+    schema = pa.schema([(header, pa.string()) for header in headers])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in batches:
+            if not batch:
+                continue
+            columns = [[respondent_id for respondent_id, _ in batch]]
+            for i in range(len(headers) - 1):
+                columns.append([_cell(answers[i]) for _, answers in batch])
+            # One row group per batch, flushed to the client right away
+            writer.write_table(pa.Table.from_arrays([pa.array(c, pa.string()) for c in columns], schema=schema))
+            yield sink.drain()
+    yield sink.drain()   # footer
+
+RENDERERS = {"csv": _csv_chunks, "jsonl": _jsonl_chunks, "parquet": _parquet_chunks}
+
+def export_survey(survey_id: int, fmt: str) -> Iterator[bytes]:
+    """
+    Encoded export chunks. Opens its own session, since the response body
+    is produced after the request's session has been released.
+    """
+    if fmt == "parquet" and pa is None:
+        raise ValueError("Parquet export requires pyarrow")
+    with SessionLocal() as db:
+        columns = export_columns(db, survey_id)
+        headers = [RESPONDENT_COLUMN] + [header for _, header in columns]
+        question_ids = [qid for qid, _ in columns]
+        snapshot = snapshot_service.load_snapshot(survey_id)
+        if snapshot is not None:
+            batches = iter_snapshot_rows(db, snapshot, question_ids)
+        else:
+            batches = iter_respondent_rows(db, survey_id, question_ids)
+        yield from RENDERERS[fmt](headers, batches)
@@ -0,0 +1,259 @@
+# backend/app/services/job_service.py
+"""
+DB-backed job queue for slow external calls (LLM generation, TTS, STT).
+
+Routes enqueue with `enqueue()` and return the job id; workers claim jobs
+with an optimistic UPDATE (safe on SQLite and PostgreSQL), run the
+registered handler in a thread pool and record the result. Failures are
+retried with exponential backoff up to max_attempts. Concurrency is bounded
+per provider across all workers (JOB_PROVIDER_LIMITS, checked at claim time).
+
+    python -m app.services.job_service --processes 2 --threads 8
+
+Set JOB_INPROCESS_THREADS to also run a worker inside the API process.
+Without either, queued jobs are never picked up; 202 replies say so.
+Routes whose work must not wait for a worker (publish's audio pre-render)
+hand the job to run_inline after replying when no in-process worker runs.
+"""
+
+import argparse
+import importlib
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Job
+from app.services import metrics_service
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "5"))     # seconds, doubled per attempt
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "300"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))   # running jobs older than this are requeued
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+JOB_REQUEUE_INTERVAL = 30.0                                         # seconds between stale-lease sweeps per worker
+JOB_INPROCESS_THREADS = int(os.getenv("JOB_INPROCESS_THREADS", "0"))
+# Relative values are taken from backend/, so API processes and workers started elsewhere agree
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+JOB_ARTIFACT_DIR = os.path.join(BACKEND_DIR, os.getenv("JOB_ARTIFACT_DIR", "job_artifacts"))
+DEFAULT_PROVIDER_LIMIT = 2
+
+# Modules whose import registers the job handlers
+HANDLER_MODULES = ("app.routes.survey_routes", "app.routes.voice_routes", "app.routes.analytics_routes")
+
+def _parse_limits(raw: str) -> Dict[str, int]:
+    limits = {}
+    for item in filter(None, raw.split(",")):
+        provider, _, limit = item.partition("=")
+        limits[provider.strip()] = int(limit)
+    return limits
+
+PROVIDER_LIMITS = _parse_limits(os.getenv("JOB_PROVIDER_LIMITS", "openai=4,gtts=8,google_stt=4"))
+
+metrics_service.describe("jobs_finished_total", "counter", "Background jobs finished, by kind and final status")
+metrics_service.describe("job_retries_total", "counter", "Background job attempts that failed and were rescheduled")
+
+class PermanentJobError(Exception):
+    """Raised by handlers for failures that retrying cannot fix."""
+
+Handler = Callable[[Dict[str, Any]], Dict[str, Any]]
+_handlers: Dict[str, Tuple[str, Handler]] = {}
+
+def handler(kind: str, provider: str):
+    """Register fn(payload) -> JSON-serializable result for a job kind."""
+    def register(fn: Handler) -> Handler:
+        _handlers[kind] = (provider, fn)
+        return fn
+    return register
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def artifact_path(job_id: str, suffix: str) -> str:
+    os.makedirs(JOB_ARTIFACT_DIR, exist_ok=True)
+    return os.path.join(JOB_ARTIFACT_DIR, f"{job_id}{suffix}")
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+def enqueue(db: Session, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None, max_attempts: int = JOB_MAX_ATTEMPTS) -> Job:
+    """Add a queued job. Does not commit."""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(
+        id=job_id or new_job_id(),
+        kind=kind,
+        provider=_handlers[kind][0],
+        status="queued",
+        payload=payload,
+        attempts=0,
+        max_attempts=max_attempts,
+        run_after=_now(),
+    )
+    db.add(job)
+    return job
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * 2 ** max(0, attempts - 1))
+    return delay * (0.5 + random.random() / 2)   # jitter spreads retries after a provider outage
+
+def requeue_stale(db: Session) -> int:
+    """Give up leases of workers that died mid-job. Commits."""
+    cutoff = _now() - timedelta(seconds=JOB_LEASE_SECONDS)
+    stale = (Job.status == "running", Job.locked_at < cutoff)
+    failed = db.execute(
+        update(Job).where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status="failed", error="Worker lease expired", finished_at=_now(), locked_by=None)
+    ).rowcount
+    requeued = db.execute(
+        update(Job).where(*stale).values(status="queued", run_after=_now(), locked_by=None)
+    ).rowcount
+    db.commit()
+    return failed + requeued
+
+def claim(db: Session, worker_id: str) -> Optional[Job]:
+    """
+    Lease the oldest runnable job whose provider is under its concurrency
+    limit. The limit check and the claim are separate statements, so a
+    burst of workers can overshoot a limit briefly. Commits.
+    """
+    running = dict(db.execute(
+        select(Job.provider, func.count()).where(Job.status == "running").group_by(Job.provider)
+    ).all())
+    candidates = db.execute(
+        select(Job.id, Job.provider)
+        .where(Job.status == "queued", Job.run_after <= _now())
+        .order_by(Job.run_after)
+        .limit(100)
+    ).all()
+    for candidate in candidates:
+        if running.get(candidate.provider, 0) >= PROVIDER_LIMITS.get(candidate.provider, DEFAULT_PROVIDER_LIMIT):
+            continue
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == candidate.id, Job.status == "queued")
+            .values(status="running", locked_by=worker_id, locked_at=_now(), attempts=Job.attempts + 1)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(Job, candidate.id)
+        # Another worker won this one; try the next
+    db.commit()
+    return None
+
+def execute(job_id: str) -> None:
+    """Run a claimed job's handler and record the outcome in a fresh session."""
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        if job is None:
+            return
+        kind, payload, attempts, max_attempts = job.kind, dict(job.payload or {}), job.attempts, job.max_attempts
+    try:
+        result = _handlers[kind][1](payload)
+    except Exception as e:
+        retry = not isinstance(e, PermanentJobError) and attempts < max_attempts
+        logging.warning(f"Job {job_id} ({kind}) attempt {attempts} failed: {e}")
+        with SessionLocal() as db:
+            values = {"error": str(e), "locked_by": None}
+            if retry:
+                values.update(status="queued", run_after=_now() + timedelta(seconds=backoff_seconds(attempts)))
+                metrics_service.inc("job_retries_total", kind=kind)
+            else:
+                values.update(status="failed", finished_at=_now())
+                metrics_service.inc("jobs_finished_total", kind=kind, status="failed")
+            db.execute(update(Job).where(Job.id == job_id).values(**values))
+            db.commit()
+        return
+    with SessionLocal() as db:
+        db.execute(
+            update(Job).where(Job.id == job_id)
+            .values(status="succeeded", result=result, error=None, locked_by=None, finished_at=_now())
+        )
+        db.commit()
+    metrics_service.inc("jobs_finished_total", kind=kind, status="succeeded")
+
+def run_inline(job_id: str) -> None:
+    """
+    Claim one queued job and run it in the calling thread, e.g. as a route's
+    background task. A worker that claimed it first wins; a failed attempt
+    is requeued for workers as usual.
+    """
+    with SessionLocal() as db:
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(status="running", locked_by=f"{socket.gethostname()}:{os.getpid()}:inline", locked_at=_now(), attempts=Job.attempts + 1)
+        ).rowcount
+        db.commit()
+    if claimed:
+        execute(job_id)
+
+def run_worker(threads: int, stop: threading.Event, worker_id: Optional[str] = None) -> None:
+    """Claim and run jobs on a thread pool until stop is set."""
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    inflight = set()
+    next_requeue = 0.0
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="job") as pool:
+        while not stop.is_set():
+            inflight = {f for f in inflight if not f.done()}
+            if len(inflight) >= threads:
+                wait(inflight, timeout=JOB_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                continue
+            try:
+                with SessionLocal() as db:
+                    job = claim(db, worker_id)
+                    if job is None and time.monotonic() >= next_requeue:
+                        requeue_stale(db)
+                        next_requeue = time.monotonic() + JOB_REQUEUE_INTERVAL
+            except Exception as e:
+                logging.error(f"Job worker {worker_id} claim failed: {e}")
+                job = None
+            if job is None:
+                stop.wait(JOB_POLL_INTERVAL)
+                continue
+            inflight.add(pool.submit(execute, job.id))
+
+def start_inprocess_worker(threads: int = JOB_INPROCESS_THREADS) -> Optional[threading.Event]:
+    """Run a worker on a daemon thread of this process; returns its stop event."""
+    if threads <= 0:
+        return None
+    stop = threading.Event()
+    threading.Thread(target=run_worker, args=(threads, stop), name="job-worker", daemon=True).start()
+    return stop
+
+def _worker_process(threads: int) -> None:
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run_worker(threads, stop)
+
+if __name__ == "__main__":
+    # python -m app.services.job_service [--processes N] [--threads M]
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent jobs per process")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        _worker_process(args.threads)
+    else:
+        workers = [multiprocessing.Process(target=_worker_process, args=(args.threads,)) for _ in range(args.processes)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
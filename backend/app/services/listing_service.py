@@ -0,0 +1,136 @@
+# backend/app/services/listing_service.py
+"""
+Keyset-paginated survey and response listings, newest first.
+
+Pages are ordered by (created_at, id) descending and the next page starts
+strictly after the last row of the previous one, so page 1000 costs the
+same index range scan as page 1 (OFFSET re-reads every skipped row).
+Cursors are opaque to clients. Only scalar columns are selected unless
+JSON blobs are asked for by name.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, cast, select, tuple_, type_coerce
+from sqlalchemy.orm import Session
+
+from app.models import Response, Survey
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SURVEY_COLUMNS = (
+    Survey.id, Survey.title, Survey.survey_type, Survey.nss_template_type, Survey.status,
+    Survey.version, Survey.languages, Survey.adaptive_enabled, Survey.voice_enabled,
+    Survey.ai_generated, Survey.created_at,
+)
+SURVEY_BLOBS = {
+    "description": Survey.description,
+    "translations": Survey.translations,
+    "adaptive_config": Survey.adaptive_config,
+    "audio_metadata": Survey.audio_metadata,
+    "ai_metadata": Survey.ai_metadata,
+}
+
+RESPONSE_COLUMNS = (
+    Response.id, Response.survey_id, Response.question_id, Response.respondent_id,
+    Response.answer, Response.confidence_score, Response.validation_status, Response.language,
+    Response.audio_file_uri, Response.created_at, Response.updated_at,
+)
+RESPONSE_BLOBS = {
+    "extra_metadata": Response.extra_metadata,
+    "translations": Response.translations,
+    "audio_metadata": Response.audio_metadata,
+    "adaptive_data": Response.adaptive_data,
+    "ai_context": Response.ai_context,
+}
+
+Page = Tuple[List[Dict[str, Any]], Optional[str]]
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(created_at: Any, row_id: int) -> str:
+    key = created_at if isinstance(created_at, str) else created_at.isoformat()
+    return base64.urlsafe_b64encode(f"{key}|{row_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        datetime.fromisoformat(created_at)
+        return created_at, int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+def blob_columns(blobs: Dict[str, Any], include: Iterable[str]) -> List[Any]:
+    """Requested JSON columns; raises ValueError naming any unknown field."""
+    names = [name for name in include if name]
+    unknown = sorted(set(names) - set(blobs))
+    if unknown:
+        raise ValueError(f"Unknown include field(s): {', '.join(unknown)}; choose from {', '.join(sorted(blobs))}")
+    return [blobs[name] for name in dict.fromkeys(names)]
+
+def _page(db: Session, stmt, model, cursor: Optional[str], limit: int) -> Page:
+    created_key = model.created_at
+    if db.get_bind().dialect.name == "sqlite":
+        # DateTime is stored as text there, and CURRENT_TIMESTAMP defaults lack the
+        # microseconds a bound datetime would carry: compare the stored text as-is
+        created_key = type_coerce(model.created_at, String)
+    stmt = stmt.add_columns(created_key.label("_cursor"))
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if created_key is model.created_at:
+            created_at = datetime.fromisoformat(created_at)
+        # Row-value comparison, a single range on the (created_at, id) index
+        stmt = stmt.where(tuple_(created_key, model.id) < tuple_(created_at, row_id))
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    # One extra row tells whether another page follows
+    rows = db.execute(stmt.order_by(created_key.desc(), model.id.desc()).limit(limit + 1)).all()
+    items = [row._asdict() for row in rows[:limit]]
+    keys = [item.pop("_cursor") for item in items]
+    next_cursor = encode_cursor(keys[-1], items[-1]["id"]) if len(rows) > limit else None
+    return items, next_cursor
+
+def list_surveys(
+    db: Session,
+    status: Optional[str] = None,
+    language: Optional[str] = None,
+    include: Iterable[str] = (),
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    """One page of surveys and the cursor of the next page (None on the last)."""
+    stmt = select(*SURVEY_COLUMNS, *blob_columns(SURVEY_BLOBS, include))
+    if status:
+        stmt = stmt.where(Survey.status == status)
+    if language:
+        # Survey.languages is a JSON list; match the quoted code in its text form
+        stmt = stmt.where(cast(Survey.languages, String).contains(f'"{language}"', autoescape=True))
+    return _page(db, stmt, Survey, cursor, limit)
+
+def list_responses(
+    db: Session,
+    survey_id: int,
+    language: Optional[str] = None,
+    validation_status: Optional[str] = None,
+    respondent_id: Optional[str] = None,
+    question_id: Optional[int] = None,
+    include: Iterable[str] = (),
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    """One page of a survey's responses and the cursor of the next page (None on the last)."""
+    stmt = select(*RESPONSE_COLUMNS, *blob_columns(RESPONSE_BLOBS, include)).where(Response.survey_id == survey_id)
+    if validation_status:
+        stmt = stmt.where(Response.validation_status == validation_status)
+    if respondent_id:
+        stmt = stmt.where(Response.respondent_id == respondent_id)
+    if question_id is not None:
+        stmt = stmt.where(Response.question_id == question_id)
+    if language:
+        stmt = stmt.where(Response.language == language)
+    return _page(db, stmt, Response, cursor, limit)
@@ -0,0 +1,161 @@
+# backend/app/services/llm_cache_service.py
+"""
+Response cache in front of LLM question generation, persisted in the app
+database (SQLite by default) so it survives restarts.
+
+Lookups try an exact match on sha256(normalized prompt, num_questions, model)
+first, then, if LLM_CACHE_NEAR_DUPLICATES is on, the closest unexpired
+entry by MinHash-estimated Jaccard similarity over prompt shingles.
+"""
+
+import hashlib
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.models import LLMCacheEntry
+from app.services import metrics_service
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))             # seconds
+LLM_CACHE_NEAR_DUPLICATES = os.getenv("LLM_CACHE_NEAR_DUPLICATES", "1") == "1"
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.9"))          # min estimated Jaccard
+LLM_CACHE_SCAN_LIMIT = int(os.getenv("LLM_CACHE_SCAN_LIMIT", "5000"))           # newest entries compared
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+MINHASH_PERMUTATIONS = 64
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(20240601)   # fixed seed: signatures must match across restarts
+_PERM_A = _rng.randint(1, 1 << 31, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+STOPWORDS = frozenset(
+    "a an and are about at by for from how in into is of on or the to with what which who your you "
+    "survey surveys questionnaire question questions".split()
+)
+
+metrics_service.describe("llm_cache_requests_total", "counter", "LLM cache lookups by result (exact, near, miss)")
+metrics_service.describe("llm_cache_saved_seconds_total", "counter", "LLM latency avoided by cache hits")
+metrics_service.describe("llm_cache_lookup_seconds_total", "counter", "Time spent in LLM cache lookups")
+
+CacheHit = Tuple[List[Dict[str, Any]], str]    # (questions, "exact" | "near")
+
+def normalize_prompt(prompt: str) -> str:
+    # Explicit Indic block range: \w would split Devanagari words at vowel signs
+    return " ".join(re.findall(r"[a-z0-9ऀ-෿]+", prompt.lower()))
+
+def _tokens(normalized: str) -> List[str]:
+    # Crude plural folding so "households" and "household" share shingles
+    return [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+            for t in normalized.split() if t not in STOPWORDS]
+
+def shingles(normalized: str) -> set:
+    """Word unigrams plus character trigrams: robust to reordering and small typos."""
+    tokens = _tokens(normalized)
+    grams = set(tokens)
+    for token in tokens:
+        padded = f"#{token}#"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def minhash(normalized: str) -> List[int]:
+    grams = shingles(normalized)
+    if not grams:
+        return []
+    hashed = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "little") >> 1 for g in grams),
+        dtype=np.uint64,
+        count=len(grams),
+    )
+    # (a * x + b) mod p per permutation; 31-bit a, b and x cannot overflow uint64
+    products = (np.outer(_PERM_A, hashed) + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return products.min(axis=1).tolist()
+
+def cache_key(normalized: str, num_questions: int, model: str) -> str:
+    return hashlib.sha256(f"{normalized}\x1f{num_questions}\x1f{model}".encode()).hexdigest()
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def lookup(db: Session, prompt: str, num_questions: int, model: str) -> Optional[CacheHit]:
+    """Cached questions for a prompt, or None on a miss. Commits the hit counter."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    start = time.perf_counter()
+    normalized = normalize_prompt(prompt)
+    now = _now()
+    live = (LLMCacheEntry.model == model, LLMCacheEntry.num_questions == num_questions, LLMCacheEntry.expires_at > now)
+
+    found = db.execute(
+        select(LLMCacheEntry.id, LLMCacheEntry.questions, LLMCacheEntry.generation_seconds)
+        .where(LLMCacheEntry.cache_key == cache_key(normalized, num_questions, model), *live)
+    ).first()
+    kind = "exact"
+
+    if found is None and LLM_CACHE_NEAR_DUPLICATES:
+        signature = minhash(normalized)
+        candidates = db.execute(
+            select(LLMCacheEntry.id, LLMCacheEntry.signature)
+            .where(*live)
+            .order_by(LLMCacheEntry.id.desc())
+            .limit(LLM_CACHE_SCAN_LIMIT)
+        ).all()
+        candidates = [c for c in candidates if c.signature and len(c.signature) == len(signature)]
+        if signature and candidates:
+            matrix = np.array([c.signature for c in candidates], dtype=np.uint64)
+            similarity = (matrix == np.array(signature, dtype=np.uint64)).mean(axis=1)
+            best = int(similarity.argmax())
+            if similarity[best] >= LLM_CACHE_SIMILARITY:
+                found = db.execute(
+                    select(LLMCacheEntry.id, LLMCacheEntry.questions, LLMCacheEntry.generation_seconds)
+                    .where(LLMCacheEntry.id == candidates[best].id)
+                ).first()
+                kind = "near"
+
+    elapsed = time.perf_counter() - start
+    metrics_service.inc("llm_cache_lookup_seconds_total", elapsed)
+    if found is None:
+        metrics_service.inc("llm_cache_requests_total", result="miss")
+        return None
+
+    db.execute(update(LLMCacheEntry).where(LLMCacheEntry.id == found.id).values(hits=LLMCacheEntry.hits + 1))
+    db.commit()
+    metrics_service.inc("llm_cache_requests_total", result=kind)
+    metrics_service.inc("llm_cache_saved_seconds_total", max(0.0, (found.generation_seconds or 0.0) - elapsed))
+    questions = found.questions
+    for q in questions:
+        q["ai_metadata"] = {**(q.get("ai_metadata") or {}), "cache": kind}
+    return questions, kind
+
+def store(db: Session, prompt: str, num_questions: int, model: str, questions: List[Dict[str, Any]], generation_seconds: float) -> None:
+    """Save a generation (replacing any entry under the same key) and prune. Commits."""
+    if not LLM_CACHE_ENABLED or not questions:
+        return
+    normalized = normalize_prompt(prompt)
+    key = cache_key(normalized, num_questions, model)
+    now = _now()
+    db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.cache_key == key))
+    db.add(LLMCacheEntry(
+        cache_key=key,
+        normalized_prompt=normalized,
+        num_questions=num_questions,
+        model=model,
+        signature=minhash(normalized),
+        questions=questions,
+        generation_seconds=generation_seconds,
+        hits=0,
+        expires_at=now + timedelta(seconds=LLM_CACHE_TTL),
+    ))
+    db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= now))
+    oldest_kept = db.execute(
+        select(LLMCacheEntry.id).order_by(LLMCacheEntry.id.desc()).offset(LLM_CACHE_MAX_ENTRIES).limit(1)
+    ).scalar()
+    if oldest_kept is not None:
+        db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.id <= oldest_kept))
+    db.commit()
@@ -1,12 +1,36 @@
 import os
 import json
+import time
+import asyncio
 import logging
 from ast import literal_eval
-from openai import OpenAI
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 from dotenv import load_dotenv
 
+from app.database import AsyncSessionLocal, SessionLocal
+from app.services import llm_cache_service
+from app.services.profiling_service import external_call
+
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+PRIMARY_MODEL = os.getenv("LLM_PRIMARY_MODEL", "gpt-4o-mini")
+FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gpt-4.1-nano")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))           # seconds, deadline per completion call
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "4"))    # seconds before the fallback model is also asked
+
+# The openai package takes most of the app's import time; workers that never
+# generate a survey never load it. OPENAI_BASE_URL (read by the clients) can
+# point at a local OpenAI-compatible server.
+@lru_cache(maxsize=None)
+def get_client():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT, max_retries=0)
+
+@lru_cache(maxsize=None)
+def get_async_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT, max_retries=0)
 
 def fallback_questions():
     return [
@@ -37,7 +61,7 @@ def fallback_questions():
         }
     ]
 
-def generate_questions(prompt: str, num_questions: int = 5):
+def _messages(prompt: str, num_questions: int) -> List[Dict[str, str]]:
     system_prompt = (
         "You are a survey expert. Generate well-structured, diverse, and clear survey questions "
         "based on the provided topic. Respond ONLY with a valid JSON list."
@@ -54,60 +78,251 @@ def generate_questions(prompt: str, num_questions: int = 5):
         "- Include 'options' only if type is 'radio' or 'checkbox'\n"
         "- Do NOT include any extra text outside the JSON"
     )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
 
-    try:
-        # Try first model
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            model_used = "gpt-4o-mini"
-        except Exception as inner_e:
-            logging.warning(f"gpt-4o-mini failed, falling back to gpt-4.1-nano: {inner_e}")
-            response = client.chat.completions.create(
-                model="gpt-4.1-nano",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            model_used = "gpt-4.1-nano"
+def _is_question(q: Any) -> bool:
+    return isinstance(q, dict) and "text" in q and "type" in q
 
-        content = response.choices[0].message.content.strip()
-        logging.info(f"OpenAI response from model {model_used}: {content}")
+def _with_defaults(q: Dict[str, Any], model_used: str) -> Dict[str, Any]:
+    q.setdefault("translations", {})
+    q.setdefault("audio_file_uri", None)
+    q.setdefault("voice_enabled", False)
+    q.setdefault("audio_metadata", {})
+    q.setdefault("adaptive_enabled", True)
+    q.setdefault("adaptive_config", {})
+    q["ai_generated"] = True
+    q["ai_metadata"] = {"model": model_used}
+    return q
 
+def parse_questions(content: str, model_used: str) -> List[Dict[str, Any]]:
+    """Validated question dicts from a completion; raises ValueError on bad output."""
+    content = content.strip()
+    try:
+        questions = json.loads(content)
+    except json.JSONDecodeError:
+        logging.warning("JSON decode failed, trying literal_eval")
         try:
-            questions = json.loads(content)
-        except json.JSONDecodeError:
-            logging.warning("JSON decode failed, trying literal_eval")
             questions = literal_eval(content)
+        except (ValueError, SyntaxError) as e:
+            raise ValueError(f"Unparseable completion: {e}")
+
+    if not isinstance(questions, list) or not all(_is_question(q) for q in questions):
+        raise ValueError("Invalid question format")
+    return [_with_defaults(q, model_used) for q in questions]
 
-        if not isinstance(questions, list) or not all(isinstance(q, dict) and "text" in q and "type" in q for q in questions):
-            raise ValueError("Invalid question format")
+def _log_api_error(e: Exception) -> None:
+    error_str = str(e).lower()
+    logging.error(f"OpenAI API error: {e}")
+    if "quota" in error_str or "insufficient_quota" in error_str or "429" in error_str:
+        logging.error("OpenAI API quota exceeded or rate limit hit.")
 
-        for q in questions:
-            q.setdefault("translations", {})
-            q.setdefault("audio_file_uri", None)
-            q.setdefault("voice_enabled", False)
-            q.setdefault("audio_metadata", {})
-            q.setdefault("adaptive_enabled", True)
-            q.setdefault("adaptive_config", {})
-            q["ai_generated"] = True
-            q["ai_metadata"] = {"model": model_used}
+# --------- Response cache (llm_cache_service), keyed on the requested primary model ---------
+def _cache_lookup(prompt: str, num_questions: int) -> Optional[List[Dict[str, Any]]]:
+    try:
+        with SessionLocal() as db:
+            hit = llm_cache_service.lookup(db, prompt, num_questions, PRIMARY_MODEL)
+        return hit[0] if hit else None
+    except Exception as e:
+        logging.warning(f"LLM cache lookup failed: {e}")
+        return None
+
+def _cache_store(prompt: str, num_questions: int, questions: List[Dict[str, Any]], seconds: float) -> None:
+    try:
+        with SessionLocal() as db:
+            llm_cache_service.store(db, prompt, num_questions, PRIMARY_MODEL, questions, seconds)
+    except Exception as e:
+        logging.warning(f"LLM cache store failed: {e}")
 
-        return questions
+async def _cache_lookup_async(prompt: str, num_questions: int) -> Optional[List[Dict[str, Any]]]:
+    try:
+        async with AsyncSessionLocal() as db:
+            hit = await db.run_sync(llm_cache_service.lookup, prompt, num_questions, PRIMARY_MODEL)
+        return hit[0] if hit else None
+    except Exception as e:
+        logging.warning(f"LLM cache lookup failed: {e}")
+        return None
 
+async def _cache_store_async(prompt: str, num_questions: int, questions: List[Dict[str, Any]], seconds: float) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(llm_cache_service.store, prompt, num_questions, PRIMARY_MODEL, questions, seconds)
     except Exception as e:
-        error_str = str(e).lower()
-        logging.error(f"OpenAI API error: {e}")
-        if "quota" in error_str or "insufficient_quota" in error_str or "429" in error_str:
-            logging.error("OpenAI API quota exceeded or rate limit hit.")
+        logging.warning(f"LLM cache store failed: {e}")
+
+def generate_questions(prompt: str, num_questions: int = 5):
+    """Blocking variant for sync callers: primary model, then the fallback, each with a deadline."""
+    cached = _cache_lookup(prompt, num_questions)
+    if cached:
+        return cached
+    messages = _messages(prompt, num_questions)
+    start = time.perf_counter()
+    for model in (PRIMARY_MODEL, FALLBACK_MODEL):
+        try:
+            with external_call("llm", model):
+                response = get_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1000
+                )
+            content = response.choices[0].message.content
+            logging.info(f"OpenAI response from model {model}: {content}")
+            questions = parse_questions(content, model)
+            _cache_store(prompt, num_questions, questions, time.perf_counter() - start)
+            return questions
+        except Exception as e:
+            _log_api_error(e)
+            logging.warning(f"{model} failed: {e}")
+    return fallback_questions()
+
+# --------- Async path: deadlines + hedged requests ---------
+async def _ask(model: str, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    with external_call("llm", model):
+        response = await asyncio.wait_for(
+            get_async_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000
+            ),
+            LLM_TIMEOUT,
+        )
+    content = response.choices[0].message.content or ""
+    logging.info(f"OpenAI response from model {model}: {content}")
+    return parse_questions(content, model)
+
+async def _generate_hedged(messages: List[Dict[str, str]], hedge_after: float) -> Optional[List[Dict[str, Any]]]:
+    pending = {asyncio.ensure_future(_ask(PRIMARY_MODEL, messages))}
+    hedged = False
+    try:
+        while pending:
+            timeout = None if hedged else hedge_after
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            reason = f"not answered in {hedge_after}s"
+            for task in done:
+                try:
+                    return task.result()
+                except Exception as e:
+                    _log_api_error(e)
+                    reason = f"failed ({type(e).__name__}: {e})"
+            if not hedged:
+                # Primary is slow or failed: race the fallback model against it
+                logging.warning(f"{PRIMARY_MODEL} {reason}, hedging with {FALLBACK_MODEL}")
+                pending.add(asyncio.ensure_future(_ask(FALLBACK_MODEL, messages)))
+                hedged = True
+    finally:
+        for task in pending:
+            task.cancel()
+    return None
+
+async def generate_questions_async(prompt: str, num_questions: int = 5, hedge_after: Optional[float] = None):
+    """
+    Serve from the response cache, else ask the primary model; if it has not
+    answered within hedge_after seconds (or fails), ask the fallback model
+    too and take the first valid result.
+    Never raises: returns fallback_questions() when both calls fail.
+    """
+    cached = await _cache_lookup_async(prompt, num_questions)
+    if cached:
+        return cached
+    hedge_after = LLM_HEDGE_AFTER if hedge_after is None else hedge_after
+    start = time.perf_counter()
+    questions = await _generate_hedged(_messages(prompt, num_questions), hedge_after)
+    if questions is None:
         return fallback_questions()
+    await _cache_store_async(prompt, num_questions, questions, time.perf_counter() - start)
+    return questions
+
+# --------- Streaming path: questions as soon as each JSON element closes ---------
+class _ArrayElementScanner:
+    """Incremental scanner yielding each complete top-level {...} of a JSON array."""
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> Iterator[str]:
+        for ch in text:
+            if self._depth >= 2 or (self._depth == 1 and ch == "{"):
+                self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 1 and ch == "}":
+                    yield "".join(self._buffer)
+                    self._buffer = []
+
+async def _stream_model(model: str, messages: List[Dict[str, str]]) -> AsyncIterator[Dict[str, Any]]:
+    # Timed until the stream opens; the rest is paced by the client reading it
+    with external_call("llm", f"{model}:stream"):
+        stream = await asyncio.wait_for(
+            get_async_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000,
+                stream=True,
+            ),
+            LLM_TIMEOUT,
+        )
+    # The client timeout bounds each read; this bounds the whole stream
+    deadline = asyncio.get_running_loop().time() + LLM_TIMEOUT
+    scanner = _ArrayElementScanner()
+    async for chunk in stream:
+        if asyncio.get_running_loop().time() > deadline:
+            await stream.close()
+            raise TimeoutError(f"{model} stream exceeded {LLM_TIMEOUT}s")
+        if not chunk.choices:
+            continue
+        for element in scanner.feed(chunk.choices[0].delta.content or ""):
+            q = json.loads(element)
+            if _is_question(q):
+                yield _with_defaults(q, model)
+            else:
+                logging.warning(f"Skipping malformed question from {model}: {element}")
+
+async def stream_questions(prompt: str, num_questions: int = 5) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield question dicts as the model streams them (or all at once from the
+    cache). Falls back to the next model only if nothing was emitted yet,
+    and to fallback_questions() last.
+    """
+    cached = await _cache_lookup_async(prompt, num_questions)
+    if cached:
+        for q in cached:
+            yield q
+        return
+
+    messages = _messages(prompt, num_questions)
+    start = time.perf_counter()
+    for model in (PRIMARY_MODEL, FALLBACK_MODEL):
+        emitted = []
+        try:
+            async for q in _stream_model(model, messages):
+                emitted.append(q)
+                yield q
+            if emitted:
+                await _cache_store_async(prompt, num_questions, emitted, time.perf_counter() - start)
+                return
+            logging.warning(f"{model} streamed no questions")
+        except Exception as e:
+            _log_api_error(e)
+            if emitted:
+                return  # keep the partial survey rather than mixing models
+    for q in fallback_questions():
+        yield q
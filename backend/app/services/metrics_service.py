@@ -0,0 +1,94 @@
+# backend/app/services/metrics_service.py
+"""
+In-process metrics registry, rendered in Prometheus text format at /metrics.
+Values are per worker process; scrape every worker or aggregate upstream.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+# Latency buckets in seconds (Prometheus client defaults)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_help: Dict[str, Tuple[str, str]] = {}                 # name -> (type, help)
+_values: Dict[str, Dict[LabelSet, float]] = defaultdict(dict)
+_buckets: Dict[str, Tuple[float, ...]] = {}            # histogram name -> upper bounds
+# Per series: observations per bucket (last one is +Inf), then the sum
+_histograms: Dict[str, Dict[LabelSet, List[float]]] = defaultdict(dict)
+
+def _labels(labels: Dict[str, str]) -> LabelSet:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def describe(name: str, metric_type: str, help_text: str, buckets: Optional[Iterable[float]] = None) -> None:
+    _help[name] = (metric_type, help_text)
+    if metric_type == "histogram":
+        _buckets[name] = tuple(sorted(buckets or DEFAULT_BUCKETS))
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    key = _labels(labels)
+    with _lock:
+        series = _values[name]
+        series[key] = series.get(key, 0.0) + value
+
+def observe(name: str, amount: float, **labels: str) -> None:
+    """Record one observation in a histogram (buckets from describe())."""
+    bounds = _buckets.get(name, DEFAULT_BUCKETS)
+    index = bisect_left(bounds, amount)   # first bucket with le >= amount
+    key = _labels(labels)
+    with _lock:
+        series = _histograms[name].get(key)
+        if series is None:
+            series = _histograms[name][key] = [0] * (len(bounds) + 1) + [0.0]
+        series[index] += 1
+        series[-1] += amount
+
+def value(name: str, **labels: str) -> float:
+    with _lock:
+        return _values.get(name, {}).get(_labels(labels), 0.0)
+
+def histogram_count(name: str, **labels: str) -> int:
+    with _lock:
+        series = _histograms.get(name, {}).get(_labels(labels))
+        return int(sum(series[:-1])) if series else 0
+
+def reset() -> None:
+    with _lock:
+        _values.clear()
+        _histograms.clear()
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+def _render_histogram(lines: List[str], name: str, series: Dict[LabelSet, List[float]]) -> None:
+    bounds = [f"{bound:g}" for bound in _buckets.get(name, DEFAULT_BUCKETS)] + ["+Inf"]
+    for labels, counts in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative:g}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {counts[-1]:g}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative:g}")
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    with _lock:
+        snapshot = {name: dict(series) for name, series in _values.items()}
+        histograms = {name: {labels: list(counts) for labels, counts in series.items()} for name, series in _histograms.items()}
+    for name in sorted(set(snapshot) | set(histograms) | set(_help)):
+        metric_type, help_text = _help.get(name, ("untyped", ""))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        if name in histograms:
+            _render_histogram(lines, name, histograms[name])
+            continue
+        for labels, number in sorted(snapshot.get(name, {}).items()):
+            lines.append(f"{name}{_format_labels(labels)} {number:g}")
+    return "\n".join(lines) + "\n"
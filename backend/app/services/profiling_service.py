@@ -0,0 +1,200 @@
+# backend/app/services/profiling_service.py
+"""
+Request instrumentation behind /metrics and the X-Profile header.
+
+RequestMetricsMiddleware times every HTTP request and keeps a RequestProfile
+in a context variable for its duration. SQLAlchemy cursor hooks (all
+engines, sync and async) and external_call() (LLM, TTS, STT) add to the
+current profile, so a request's query count, DB time and external time are
+known when it finishes. They are recorded as histograms labelled by route
+template, never by raw path.
+
+A request sent with `X-Profile: 1` (or the PROFILE_TOKEN value, when set)
+gets its breakdown back in the X-Profile response header as JSON, plus a
+Server-Timing header for browser devtools. The breakdown covers the work
+done before the response headers; streamed bodies add to the histograms only.
+"""
+
+import hmac
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.services import metrics_service
+
+# When set, X-Profile must carry this value; otherwise any of TRUE_VALUES
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+TRUE_VALUES = {"1", "true", "yes", "on"}
+PROFILE_TOP_QUERIES = int(os.getenv("PROFILE_TOP_QUERIES", "5"))
+PROFILE_SQL_CHARS = 200
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Statement verbs kept as label values; anything else is "other"
+OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+metrics_service.describe("http_request_duration_seconds", "histogram", "HTTP request latency by method, route template and status")
+metrics_service.describe("http_request_db_queries", "histogram", "SQL statements executed per HTTP request, by route template", QUERY_COUNT_BUCKETS)
+metrics_service.describe("http_request_db_seconds", "histogram", "Time spent in SQL per HTTP request, by route template", QUERY_BUCKETS)
+metrics_service.describe("db_query_duration_seconds", "histogram", "SQL statement latency by operation", QUERY_BUCKETS)
+metrics_service.describe("external_call_duration_seconds", "histogram", "LLM/TTS/STT call latency by service, operation and outcome", EXTERNAL_BUCKETS)
+
+class RequestProfile:
+    """What one request spent, filled in by the hooks below."""
+
+    __slots__ = ("started", "detailed", "queries", "db_seconds", "statements", "external")
+
+    def __init__(self, detailed: bool = False):
+        self.started = time.perf_counter()
+        self.detailed = detailed
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Dict[str, List[float]] = {}   # SQL -> [count, seconds], only when detailed
+        self.external: Dict[str, List[float]] = {}     # service -> [calls, seconds]
+
+    def add_query(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if self.detailed:
+            entry = self.statements.setdefault(statement, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_external(self, service: str, seconds: float) -> None:
+        entry = self.external.setdefault(service, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> Dict[str, Any]:
+        # The same statement many times over is what an N+1 looks like
+        top = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:PROFILE_TOP_QUERIES]
+        return {
+            "total_ms": round(self.elapsed() * 1e3, 2),
+            "db_ms": round(self.db_seconds * 1e3, 2),
+            "queries": self.queries,
+            "distinct_queries": len(self.statements),
+            "external": {service: {"calls": int(calls), "ms": round(seconds * 1e3, 2)} for service, (calls, seconds) in self.external.items()},
+            "top_queries": [
+                {"sql": " ".join(sql.split())[:PROFILE_SQL_CHARS], "count": int(count), "ms": round(seconds * 1e3, 2)}
+                for sql, (count, seconds) in top
+            ],
+        }
+
+    def server_timing(self) -> str:
+        parts = [f'db;dur={self.db_seconds * 1e3:.2f};desc="{self.queries} queries"']
+        parts += [f"{service};dur={seconds * 1e3:.2f}" for service, (_, seconds) in self.external.items()]
+        parts.append(f"total;dur={self.elapsed() * 1e3:.2f}")
+        return ", ".join(parts)
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+# --------- SQLAlchemy hooks (every engine) ---------
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:8].split(None, 1)
+    verb = head[0].upper() if head else ""
+    return verb.lower() if verb in OPERATIONS else "other"
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info["query_started"] = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    metrics_service.observe("db_query_duration_seconds", elapsed, operation=_operation(statement))
+    profile = _current.get()
+    if profile is not None:
+        profile.add_query(statement, elapsed)
+
+# --------- External calls ---------
+@contextmanager
+def external_call(service: str, operation: str) -> Iterator[None]:
+    """Time an LLM/TTS/STT call; works around awaits in async code too."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    except BaseException:   # cancelled hedge, abandoned stream
+        outcome = "cancelled"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics_service.observe("external_call_duration_seconds", elapsed, service=service, operation=operation, outcome=outcome)
+        profile = _current.get()
+        if profile is not None:
+            profile.add_external(service, elapsed)
+
+# --------- ASGI middleware ---------
+def _wants_profile(scope) -> bool:
+    for name, raw in scope.get("headers", ()):
+        if name == b"x-profile":
+            given = raw.decode("latin-1").strip()
+            if PROFILE_TOKEN:
+                return hmac.compare_digest(given.encode("latin-1"), PROFILE_TOKEN.encode())
+            return given.lower() in TRUE_VALUES
+    return False
+
+def _route_template(scope) -> str:
+    # Set by the router on the shared scope. Routes of included routers only
+    # know their own path; FastAPI keeps the prefixed one in its route context.
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"   # unmatched paths share one label
+
+class RequestMetricsMiddleware:
+    """Pure ASGI (no body buffering, so streaming responses stay streamed)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(detailed=_wants_profile(scope))
+        token = _current.set(profile)
+        status = 500
+
+        async def send_with_profile(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile.detailed:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-Profile", json.dumps(profile.summary()))
+                    headers.append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _current.reset(token)
+            route = _route_template(scope)
+            metrics_service.observe(
+                "http_request_duration_seconds", profile.elapsed(),
+                method=scope["method"], route=route, status=str(status),
+            )
+            metrics_service.observe("http_request_db_queries", profile.queries, route=route)
+            metrics_service.observe("http_request_db_seconds", profile.db_seconds, route=route)
@@ -0,0 +1,67 @@
+# backend/app/services/question_service.py
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Question
+from app.services import survey_cache_service
+
+def question_values(survey_id: int, q: Dict[str, Any], order_index: Optional[int] = None, **defaults: Any) -> Dict[str, Any]:
+    """
+    Column values for one question from a template, LLM or import dict.
+    `defaults` fill keys the dict leaves out (e.g. is_mandatory for LLM output).
+    """
+    def pick(key: str, fallback: Any = None) -> Any:
+        value = q.get(key)
+        return defaults.get(key, fallback) if value is None else value
+
+    return {
+        "survey_id": survey_id,
+        "question_text": q.get("question_text") or q.get("text", ""),
+        "question_type": q.get("question_type") or q.get("type") or "text",
+        "options": pick("options", []),
+        "validation_rules": pick("validation_rules", {}),
+        "order_index": order_index if order_index is not None else pick("order_index", 0),
+        "is_mandatory": pick("is_mandatory", False),
+        "translations": pick("translations", {}),
+        "nss_code": pick("nss_code"),
+        "lgd_location_type": pick("lgd_location_type"),
+        "audio_file_uri": pick("audio_file_uri"),
+        "voice_enabled": pick("voice_enabled", False),
+        "audio_metadata": pick("audio_metadata", {}),
+        "adaptive_enabled": pick("adaptive_enabled", True),
+        "adaptive_config": pick("adaptive_config", {}),
+        "ai_generated": pick("ai_generated", False),
+        "ai_metadata": pick("ai_metadata", {}),
+    }
+
+def next_order_index(db: Session, survey_id: int) -> int:
+    """First free order_index after the survey's existing questions."""
+    current = db.execute(
+        select(func.max(Question.order_index)).where(Question.survey_id == survey_id)
+    ).scalar()
+    return (current or 0) + 1
+
+def bulk_insert_questions(
+    db: Session,
+    survey_id: int,
+    rows: Iterable[Dict[str, Any]],
+    survey_is_new: bool = False,
+) -> List[int]:
+    """
+    Insert question rows (as built by question_values) with one executemany
+    INSERT ... RETURNING and return the new ids in input order. Does not commit.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    # SQLAlchemy batches this into multi-row VALUES statements ("insertmanyvalues").
+    # sort_by_parameter_order would force row-at-a-time on SQLite; autoincrement
+    # ids are handed out in VALUES order, so sorting them restores input order.
+    ids = sorted(db.execute(insert(Question).returning(Question.id), rows).scalars().all())
+    if not survey_is_new:
+        # Core inserts skip the ORM flush hooks that version cached surveys
+        survey_cache_service.mark_survey_edited(db, survey_id)
+    return ids
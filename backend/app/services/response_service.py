@@ -0,0 +1,247 @@
+# backend/app/services/response_service.py
+
+from collections import Counter
+from datetime import timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import case, func, insert, literal_column, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import Question, Response
+from app.services import aggregate_service, survey_cache_service
+from app.services.validation_service import CHOICE_TYPES, AnswerCheck, option_codes
+
+# Rows per set-based statement; keeps bound parameters under SQLite's limit
+BATCH_CHUNK_SIZE = 500
+
+# Same column order as ix_responses_survey_respondent_question
+KEY_COLUMNS = (Response.survey_id, Response.respondent_id, Response.question_id)
+
+# Previous values needed to take an overwritten answer out of the aggregates
+AGGREGATED_COLUMNS = (
+    Response.answer, Response.answer_code, Response.answer_mask,
+    Response.language, Response.validation_status, Response.voice_enabled,
+)
+
+# An answer saved without a recording keeps the one it has (see audio_upload_service)
+AUDIO_COLUMNS = (Response.audio_file_uri, Response.audio_metadata)
+
+ResponseKey = Tuple[int, str, int]
+
+def response_key(values: Dict[str, Any]) -> ResponseKey:
+    return (values["survey_id"], values["respondent_id"], values["question_id"])
+
+def _existing_rows(db: Session, keys: List[ResponseKey]) -> Dict[ResponseKey, Dict[str, Any]]:
+    rows = db.execute(
+        select(Response.id, *KEY_COLUMNS, *AGGREGATED_COLUMNS, *AUDIO_COLUMNS, Response.submitted_at)
+        .where(tuple_(*KEY_COLUMNS).in_(keys))
+        .with_for_update()
+    )
+    return {(r.survey_id, r.respondent_id, r.question_id): r._asdict() for r in rows}
+
+def _on_conflict_upsert(dialect: str, rows: List[Dict[str, Any]], newer_only: bool = False):
+    """
+    INSERT ... ON CONFLICT DO UPDATE on the unique response key. With
+    newer_only, a stored answer submitted at or after the incoming one is
+    left alone and its key is missing from RETURNING.
+    """
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = dialect_insert(Response).values(rows)
+    key_names = {c.key for c in KEY_COLUMNS}
+    set_ = {name: stmt.excluded[name] for name in rows[0] if name not in key_names}
+    if "audio_file_uri" in set_:
+        set_["audio_file_uri"] = func.coalesce(stmt.excluded.audio_file_uri, Response.audio_file_uri)
+    if "audio_metadata" in set_:
+        set_["audio_metadata"] = case(
+            (stmt.excluded.audio_file_uri.is_(None), Response.audio_metadata),
+            else_=stmt.excluded.audio_metadata,
+        )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.key for c in KEY_COLUMNS],
+        # Column onupdate does not fire for ON CONFLICT, so stamp updated_at here
+        set_={**set_, "updated_at": func.now()},
+        where=(
+            Response.submitted_at.is_(None) | (Response.submitted_at < stmt.excluded.submitted_at)
+        ) if newer_only else None,
+    )
+    returning = [Response.id, *KEY_COLUMNS, aggregate_service.RESPONSE_DAY.label("day")]
+    if dialect == "postgresql":
+        # xmax is only zero for freshly inserted tuples
+        returning.append(literal_column("(xmax = 0)").label("inserted"))
+    return stmt.returning(*returning)
+
+def validate_responses(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Set each row's validation_status from its survey's validation plans,
+    compiled once per survey version. Rows for unknown surveys or questions
+    keep the status they came with.
+    """
+    by_survey: Dict[int, List[Dict[str, Any]]] = {}
+    for values in rows:
+        by_survey.setdefault(values["survey_id"], []).append(values)
+    for survey_id, group in by_survey.items():
+        compiled = survey_cache_service.get_compiled_survey(db, survey_id)
+        if compiled is None:
+            continue
+        verdicts = compiled.validate(
+            AnswerCheck(v["question_id"], v.get("answer"), v.get("language"), v.get("audio_file_uri"), v.get("ai_context"))
+            for v in group
+        )
+        for values, verdict in zip(group, verdicts):
+            if verdict is not None:
+                values["validation_status"] = verdict[0]
+
+def _is_newer(values: Dict[str, Any], stored: Dict[str, Any]) -> bool:
+    if stored["submitted_at"] is None:
+        return True
+    if values.get("submitted_at") is None:
+        return False
+    # SQLite hands back naive datetimes; every submitted_at is UTC
+    incoming, current = values["submitted_at"], stored["submitted_at"]
+    if current.tzinfo is None:
+        current = current.replace(tzinfo=timezone.utc)
+    if incoming.tzinfo is None:
+        incoming = incoming.replace(tzinfo=timezone.utc)
+    return current < incoming
+
+def _kept_audio(values: Dict[str, Any], stored: Dict[str, Any]) -> Dict[str, Any]:
+    if values.get("audio_file_uri") is not None:
+        return {}
+    return {c.key: stored[c.key] for c in AUDIO_COLUMNS if c.key in values}
+
+def upsert_responses(db: Session, rows: List[Dict[str, Any]], newer_only: bool = False) -> Dict[ResponseKey, Tuple[int, bool]]:
+    """
+    Insert or update answers keyed on (survey_id, respondent_id, question_id).
+    Returns {key: (response_id, inserted)}. Does not commit.
+
+    newer_only (write-behind flushes and journal replays): an answer only
+    replaces a stored one submitted before it, by submitted_at. Skipped
+    keys are absent from the result and leave the aggregates alone.
+    """
+    # One statement cannot touch the same row twice, last write wins
+    latest = {response_key(values): values for values in rows}
+    keys = list(latest)
+    dialect = db.get_bind().dialect.name
+    saved: Dict[ResponseKey, Tuple[int, bool]] = {}
+    days: Dict[ResponseKey, Any] = {}   # day bucket of inserted rows, as the database computes it
+
+    questions = {q.id: q for q in db.execute(
+        select(Question.id, Question.question_type, Question.options, Question.translations)
+        .where(Question.id.in_({values["question_id"] for values in latest.values()}))
+    )}
+    # Choice answers also stored as option codes, whichever language the label was in
+    codecs = {qid: option_codes(q) for qid, q in questions.items()}
+    for key, values in latest.items():
+        codes = codecs.get(values["question_id"])
+        answer_code, answer_mask = codes.encode(values.get("answer"), values.get("language")) if codes else (None, None)
+        latest[key] = {**values, "answer_code": answer_code, "answer_mask": answer_mask}
+
+    for start in range(0, len(keys), BATCH_CHUNK_SIZE):
+        chunk = keys[start:start + BATCH_CHUNK_SIZE]
+        chunk_rows = [latest[key] for key in chunk]
+        existing = _existing_rows(db, chunk)
+
+        if dialect in ("postgresql", "sqlite"):
+            for row in db.execute(_on_conflict_upsert(dialect, chunk_rows, newer_only)):
+                key = (row.survey_id, row.respondent_id, row.question_id)
+                # SQLite cannot report insert vs update from RETURNING
+                inserted = row.inserted if dialect == "postgresql" else key not in existing
+                saved[key] = (row.id, inserted)
+                days[key] = row.day
+        else:
+            # Other dialects: executemany UPDATE by primary key plus bulk INSERT
+            updates = [
+                {"id": existing[key]["id"], **latest[key], **_kept_audio(latest[key], existing[key])} for key in chunk
+                if key in existing and (not newer_only or _is_newer(latest[key], existing[key]))
+            ]
+            inserts = [latest[key] for key in chunk if key not in existing]
+            if updates:
+                db.execute(update(Response), updates)
+                saved.update({values_key: (existing[values_key]["id"], False) for values_key in map(response_key, updates)})
+            if inserts:
+                returning = (Response.id, *KEY_COLUMNS, aggregate_service.RESPONSE_DAY.label("day"))
+                for row in db.execute(insert(Response).returning(*returning), inserts):
+                    key = (row.survey_id, row.respondent_id, row.question_id)
+                    saved[key] = (row.id, True)
+                    days[key] = row.day
+
+        # Keep survey_question_aggregates in step within the same transaction.
+        # A row inserted concurrently after our lookup nets to zero here;
+        # rebuild_survey_aggregates corrects any such drift.
+        deltas: Counter = Counter()
+        for key in chunk:
+            if key not in saved:
+                continue   # newer_only: the stored answer was newer
+            values = latest[key]
+            question = questions.get(values["question_id"])
+            deltas.update(aggregate_service.response_deltas(
+                question.question_type if question else None,
+                None if saved[key][1] else existing.get(key, values),
+                values,
+                day=days.get(key),
+                options=question.options if question else None,
+            ))
+        aggregate_service.apply_deltas(db, deltas)
+
+    return saved
+
+def backfill_answer_codes(db: Session, survey_id: Optional[int] = None, batch_size: int = BATCH_CHUNK_SIZE) -> int:
+    """
+    Set answer_code / answer_mask on choice answers stored before they were
+    coded. Returns the number of rows coded; commits per batch.
+    """
+    query = select(Question.id, Question.question_type, Question.options, Question.translations).where(
+        Question.question_type.in_(CHOICE_TYPES)
+    )
+    if survey_id is not None:
+        query = query.where(Question.survey_id == survey_id)
+    codecs = {q.id: option_codes(q) for q in db.execute(query)}
+    coded = 0
+    for qid, codes in codecs.items():
+        last_id = 0
+        while True:
+            # Keyset over the primary key, so batches stay cheap however far in
+            rows = db.execute(
+                select(Response.id, Response.answer, Response.language)
+                .where(
+                    Response.question_id == qid, Response.id > last_id,
+                    Response.answer_code.is_(None), Response.answer_mask.is_(None),
+                )
+                .order_by(Response.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            updates = []
+            for row in rows:
+                answer_code, answer_mask = codes.encode(row.answer, row.language)
+                if answer_code is not None or answer_mask is not None:
+                    updates.append({"id": row.id, "answer_code": answer_code, "answer_mask": answer_mask})
+            if updates:
+                db.execute(update(Response), updates)
+                coded += len(updates)
+            db.commit()
+    return coded
+
+if __name__ == "__main__":
+    # python -m app.services.response_service --backfill-codes [--survey-id N]
+    import argparse
+
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Response maintenance")
+    parser.add_argument("--backfill-codes", action="store_true", help="Code choice answers stored as labels only")
+    parser.add_argument("--survey-id", type=int)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.backfill_codes:
+            print(f"coded {backfill_answer_codes(db, args.survey_id)} answers")
+            # Translated labels now count toward their option
+            survey_ids = [args.survey_id] if args.survey_id else [sid for (sid,) in db.execute(select(Response.survey_id).distinct())]
+            for sid in survey_ids:
+                aggregate_service.rebuild_survey_aggregates(db, sid)
+    finally:
+        db.close()
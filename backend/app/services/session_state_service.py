@@ -0,0 +1,316 @@
+# backend/app/services/session_state_service.py
+"""
+Per-respondent session state for the survey-taking path: the answers so far
+(what the branching plan reads), the branch cursor and the progress count.
+
+The default store is in-process with a TTL. It is per worker, so multi-worker
+deployments should point RESPONDENT_STATE_URL at a Redis-compatible server
+(redis://host:6379/0); the `redis` package is only needed in that case.
+States are written through by the submit routes and rebuilt from the
+responses table (plus any answers still in the write-behind buffer) on a miss.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Response
+from app.services import survey_cache_service, write_buffer_service
+
+RESPONDENT_STATE_URL = os.getenv("RESPONDENT_STATE_URL", "memory://")
+RESPONDENT_STATE_TTL = int(os.getenv("RESPONDENT_STATE_TTL", "3600"))       # seconds since last touch
+RESPONDENT_STATE_MAX = int(os.getenv("RESPONDENT_STATE_MAX", "100000"))     # in-memory entries
+
+StateKey = Tuple[int, str]
+
+class RespondentState:
+    __slots__ = ("survey_id", "respondent_id", "answers", "cursor", "version", "stored_cursor")
+
+    def __init__(
+        self,
+        survey_id: int,
+        respondent_id: str,
+        answers: Optional[Dict[int, Any]] = None,
+        cursor: int = 0,
+        version: Optional[int] = None,
+    ):
+        self.survey_id = survey_id
+        self.respondent_id = respondent_id
+        self.answers = answers or {}
+        self.cursor = cursor          # branching plan position to resume from
+        self.version = version        # survey version the cursor was computed against
+        self.stored_cursor = cursor   # cursor as last read from the store (see RedisStateStore.save)
+
+    @property
+    def answered(self) -> int:
+        return len(self.answers)
+
+def _next_cursor(cursor: int, stored_version: Optional[int], version: Optional[int], rewind: Optional[int]) -> int:
+    """Cursor after an answer changed: rules reading it may sit behind the cursor."""
+    if version is None or stored_version != version:
+        return 0
+    return cursor if rewind is None else min(cursor, rewind)
+
+class MemoryStateStore:
+    """LRU dict with a sliding TTL; states are shared objects, mutate then put()."""
+
+    def __init__(self, ttl: int = RESPONDENT_STATE_TTL, max_entries: int = RESPONDENT_STATE_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[StateKey, Tuple[float, RespondentState]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, survey_id: int, respondent_id: str) -> Optional[RespondentState]:
+        key = (survey_id, respondent_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, state = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            return state
+
+    def put(self, state: RespondentState) -> None:
+        key = (state.survey_id, state.respondent_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, state)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self, state: RespondentState) -> None:
+        self.put(state)
+
+    def add(self, state: RespondentState) -> RespondentState:
+        """
+        Cache a rebuilt state unless one appeared meanwhile; then the cached
+        state wins and only gains the rebuilt answers it lacks. Returns the
+        state now cached.
+        """
+        key = (state.survey_id, state.respondent_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                cached = entry[1]
+                for qid, answer in state.answers.items():
+                    cached.answers.setdefault(qid, answer)
+                state = cached
+            self._entries[key] = (time.monotonic() + self.ttl, state)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return state
+
+    def record_answer(
+        self, survey_id: int, respondent_id: str, question_id: int, answer: Any,
+        version: Optional[int], rewind: Optional[int],
+    ) -> None:
+        """Set one answer on a cached state (no-op when not cached)."""
+        state = self.get(survey_id, respondent_id)
+        if state is None:
+            return
+        with self._lock:
+            state.answers[question_id] = answer
+            state.cursor = _next_cursor(state.cursor, state.version, version, rewind)
+        self.put(state)
+
+    def delete(self, survey_id: int, respondent_id: str) -> None:
+        with self._lock:
+            self._entries.pop((survey_id, respondent_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+# KEYS[1] state hash; ARGV: question field, answer JSON, survey version ("" if
+# unknown), rewind position ("" if none), ttl. Mirrors _next_cursor.
+RECORD_ANSWER_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+local cursor = tonumber(redis.call('HGET', KEYS[1], 'cursor') or '0')
+if ARGV[3] == '' or redis.call('HGET', KEYS[1], 'version') ~= ARGV[3] then
+    cursor = 0
+elseif ARGV[4] ~= '' and tonumber(ARGV[4]) < cursor then
+    cursor = tonumber(ARGV[4])
+end
+redis.call('HSET', KEYS[1], 'cursor', cursor)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1
+"""
+
+# KEYS[1] state hash; ARGV: cursor read at load, new cursor, version, ttl.
+# Only moves a cursor nobody changed since the load, so a rewind from a
+# concurrent submit is never overwritten.
+SAVE_CURSOR_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -1 end
+if redis.call('HGET', KEYS[1], 'cursor') ~= ARGV[1] then return 0 end
+redis.call('HSET', KEYS[1], 'cursor', ARGV[2], 'version', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+# KEYS[1] state hash; ARGV: ttl, cursor, version, then answer field/JSON
+# pairs. Creates the state if missing; an existing one keeps its cursor and
+# answers and only gains missing answers. Returns the resulting hash.
+ADD_STATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'cursor', ARGV[2], 'version', ARGV[3])
+end
+for i = 4, #ARGV, 2 do
+    redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+class RedisStateStore:
+    """
+    Same interface backed by any Redis-compatible server. A state is a hash:
+    cursor, version and one `a:<question_id>` field per answer (JSON), so
+    concurrent submits for one respondent each set their own field
+    atomically instead of rewriting a shared blob.
+    """
+
+    def __init__(self, url: str, ttl: int = RESPONDENT_STATE_TTL):
+        import redis  # optional dependency, only for this backend
+
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+        self._record_answer = self._client.register_script(RECORD_ANSWER_SCRIPT)
+        self._save_cursor = self._client.register_script(SAVE_CURSOR_SCRIPT)
+        self._add_state = self._client.register_script(ADD_STATE_SCRIPT)
+
+    @staticmethod
+    def _key(survey_id: int, respondent_id: str) -> str:
+        # v2: hashes; the JSON strings of the old layout expire with their TTL
+        return f"respondent_state:v2:{survey_id}:{respondent_id}"
+
+    @staticmethod
+    def _version(version: Optional[int]) -> str:
+        return "" if version is None else str(version)
+
+    def get(self, survey_id: int, respondent_id: str) -> Optional[RespondentState]:
+        fields = self._client.hgetall(self._key(survey_id, respondent_id))
+        if not fields:
+            return None
+        return self._from_fields(survey_id, respondent_id, fields)
+
+    @staticmethod
+    def _from_fields(survey_id: int, respondent_id: str, fields: Dict[bytes, bytes]) -> RespondentState:
+        answers = {}
+        for name, raw in fields.items():
+            name = name.decode()
+            if name.startswith("a:"):
+                answers[int(name[2:])] = json.loads(raw)
+        version = fields.get(b"version", b"").decode()
+        return RespondentState(
+            survey_id, respondent_id, answers,
+            cursor=int(fields.get(b"cursor", 0)),
+            version=int(version) if version else None,
+        )
+
+    def put(self, state: RespondentState) -> None:
+        """Write the whole state (a rebuild after a miss)."""
+        key = self._key(state.survey_id, state.respondent_id)
+        mapping = {f"a:{qid}": json.dumps(answer) for qid, answer in state.answers.items()}
+        mapping.update(cursor=state.cursor, version=self._version(state.version))
+        with self._client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        state.stored_cursor = state.cursor
+
+    def add(self, state: RespondentState) -> RespondentState:
+        """Cache a rebuilt state unless one appeared meanwhile (see MemoryStateStore.add)."""
+        args = [self.ttl, state.cursor, self._version(state.version)]
+        for qid, answer in state.answers.items():
+            args += [f"a:{qid}", json.dumps(answer)]
+        flat = self._add_state(keys=[self._key(state.survey_id, state.respondent_id)], args=args)
+        return self._from_fields(state.survey_id, state.respondent_id, dict(zip(flat[::2], flat[1::2])))
+
+    def save(self, state: RespondentState) -> None:
+        """Persist a moved cursor; answers are only written by record_answer."""
+        saved = self._save_cursor(
+            keys=[self._key(state.survey_id, state.respondent_id)],
+            args=[state.stored_cursor, state.cursor, self._version(state.version), self.ttl],
+        )
+        if saved == -1:   # expired meanwhile
+            self.put(state)
+        elif saved:
+            state.stored_cursor = state.cursor
+
+    def record_answer(
+        self, survey_id: int, respondent_id: str, question_id: int, answer: Any,
+        version: Optional[int], rewind: Optional[int],
+    ) -> None:
+        self._record_answer(
+            keys=[self._key(survey_id, respondent_id)],
+            args=[f"a:{question_id}", json.dumps(answer), self._version(version), "" if rewind is None else rewind, self.ttl],
+        )
+
+    def delete(self, survey_id: int, respondent_id: str) -> None:
+        self._client.delete(self._key(survey_id, respondent_id))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter("respondent_state:*"):
+            self._client.delete(key)
+
+SHARED_SCHEMES = ("redis://", "rediss://", "unix://")
+
+def state_store_is_shared(url: str = RESPONDENT_STATE_URL) -> bool:
+    """False for the per-process memory store, which only one worker may use."""
+    return url.startswith(SHARED_SCHEMES)
+
+def _make_store(url: str):
+    if state_store_is_shared(url):
+        return RedisStateStore(url)
+    return MemoryStateStore()
+
+store = _make_store(RESPONDENT_STATE_URL)
+
+def load_state(db: Session, survey_id: int, respondent_id: str, version: Optional[int] = None) -> RespondentState:
+    """Cached state for a respondent, rebuilt with one query on a miss."""
+    state = store.get(survey_id, respondent_id)
+    if state is None:
+        answers = dict(db.execute(
+            select(Response.question_id, Response.answer).where(
+                Response.survey_id == survey_id,
+                Response.respondent_id == respondent_id,
+            )
+        ).all())
+        # Write-behind mode: answers journaled here but not committed yet
+        answers.update(write_buffer_service.pending_answers(survey_id, respondent_id))
+        # A concurrent request may have cached (and recorded answers into) the state meanwhile
+        state = store.add(RespondentState(survey_id, respondent_id, answers, cursor=0, version=version))
+    if version is not None and state.version != version:
+        # Survey changed under the respondent: keep answers, recompute the branch position
+        state.cursor, state.version = 0, version
+    return state
+
+def save_state(state: RespondentState) -> None:
+    store.save(state)
+
+def record_answers(rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Write-through after a committed (or journaled) submit. Only states already
+    cached are touched; others are rebuilt from the database on their next read.
+    Each answer is set atomically in the store, so concurrent submits for
+    one respondent do not lose each other's answers.
+    """
+    for row in rows:
+        qid = row["question_id"]
+        compiled = survey_cache_service.peek_compiled_survey(row["survey_id"])
+        store.record_answer(
+            row["survey_id"], row["respondent_id"], qid, row["answer"],
+            version=compiled.version if compiled else None,
+            rewind=compiled.plan.rewind_position(qid) if compiled else None,
+        )
@@ -0,0 +1,408 @@
+# backend/app/services/snapshot_service.py
+"""
+Columnar response snapshots for reporting reads.
+
+Compaction writes a survey's responses as NumPy .npy columns under
+SNAPSHOT_DIR/survey_<id>/<snapshot_id>/, in (respondent_id, question_id)
+order, with respondents, answers, languages and validation statuses
+dictionary-encoded. Readers memory-map the columns and add the delta: rows
+whose updated_at is at or after the snapshot cut-off, less
+SNAPSHOT_DELTA_MARGIN to cover transactions still open when it was taken.
+Delta rows replace snapshot rows with the same id.
+
+    python -m app.services.snapshot_service [--survey-id N] [--min-responses M]
+
+Run it periodically (cron or the compact_snapshot job); reads stay correct
+in between, they just carry a larger delta.
+"""
+
+import argparse
+import bisect
+import json
+import os
+import shutil
+import time
+import uuid
+from array import array
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Response
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "./snapshots")
+SNAPSHOT_MIN_RESPONSES = int(os.getenv("SNAPSHOT_MIN_RESPONSES", "100000"))
+SNAPSHOT_DELTA_MARGIN = timedelta(seconds=int(os.getenv("SNAPSHOT_DELTA_MARGIN", "300")))
+SNAPSHOT_BATCH = 10000
+
+# created_at of rows that have none; never matches a date filter
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+COLUMNS = {
+    "id": np.int64,
+    "question_id": np.int64,
+    "respondent": np.int32,     # code into respondents (sorted), so bisect finds delta respondents
+    "answer": np.int32,         # code into answers (JSON text); -1 is NULL
+    "answer_code": np.int16,    # radio option id; -1 is NULL
+    "answer_mask": np.int64,    # checkbox option bitmask, valid where has_mask
+    "has_mask": np.bool_,
+    "language": np.int16,       # index into manifest languages; -1 is NULL
+    "validation_status": np.int16,
+    "voice": np.int8,           # voice_enabled; -1 is NULL
+    "created_at": np.int64,     # epoch seconds, UTC
+}
+
+# Answers are read as their JSON text: the dictionary key, decoded once per distinct value
+ROW_COLUMNS = (
+    Response.id, Response.question_id, Response.respondent_id, cast(Response.answer, String).label("answer"),
+    Response.answer_code, Response.answer_mask, Response.language, Response.validation_status, Response.voice_enabled, Response.created_at,
+)
+
+class StringColumn(Sequence):
+    """Variable-length strings stored as utf-8 bytes plus int64 offsets (both mmap-able)."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+def _epoch(value: Optional[datetime]) -> int:
+    if value is None:
+        return int(NO_TIMESTAMP)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)   # SQLite hands back naive UTC
+    return int(value.timestamp())
+
+def to_float(value: Any) -> float:
+    """Numeric value of an answer, NaN where it has none."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+class ResponseTable:
+    """
+    Encoded response columns plus the dictionaries to decode them. A
+    snapshot's columns are memory-mapped; a delta shares (and extends) the
+    snapshot's dictionaries so codes compare across both.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], respondents: Sequence, answers: Sequence,
+                 answer_numbers: np.ndarray, languages: List[Optional[str]], statuses: List[Optional[str]]):
+        self.columns = columns
+        self.respondents = respondents
+        self.answers = answers
+        # One float per answer code, NaN where not numeric; the trailing NaN serves code -1
+        self.answer_numbers = answer_numbers
+        self.languages = languages
+        self.statuses = statuses
+        self.answer_value = lru_cache(maxsize=65536)(self._answer_value)
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def _answer_value(self, code: int) -> Any:
+        return None if code < 0 else json.loads(self.answers[code])
+
+    def respondent_name(self, code: int) -> str:
+        return self.respondents[code]
+
+    def language_code(self, language: str) -> Optional[int]:
+        return self.languages.index(language) if language in self.languages else None
+
+class Snapshot(ResponseTable):
+    def __init__(self, path: str, manifest: Dict[str, Any]):
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        super().__init__(
+            {name: load(name) for name in COLUMNS},
+            StringColumn(load("respondents.offsets"), load("respondents.data")),
+            StringColumn(load("answers.offsets"), load("answers.data")),
+            load("answer_numbers"),
+            manifest["languages"],
+            manifest["validation_statuses"],
+        )
+        self.path = path
+        self.snapshot_id = manifest["snapshot_id"]
+        self.survey_id = manifest["survey_id"]
+        self.cutoff = datetime.fromisoformat(manifest["cutoff"])
+        self.manifest = manifest
+
+class _Encoder:
+    """Assigns dictionary codes, continuing after an existing dictionary's."""
+
+    def __init__(self, existing: Optional[Sequence] = None):
+        self.existing = existing
+        self.codes: Dict[Any, int] = {}
+        self.values: List[Any] = []
+
+    def __call__(self, value: Any) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values) + (len(self.existing) if self.existing is not None else 0)
+            self.values.append(value)
+        return code
+
+class _RespondentEncoder(_Encoder):
+    def __call__(self, value: str) -> int:
+        # Respondents already in the snapshot keep their sorted code
+        if self.existing is not None:
+            i = bisect.bisect_left(self.existing, value)
+            if i < len(self.existing) and self.existing[i] == value:
+                return i
+        return super().__call__(value)
+
+def _survey_dir(survey_id: int) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"survey_{survey_id}")
+
+def _write_strings(path: str, name: str, values: List[str]) -> None:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(os.path.join(path, f"{name}.offsets.npy"), offsets)
+    np.save(os.path.join(path, f"{name}.data.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+def compact_survey(db: Session, survey_id: int) -> Dict[str, Any]:
+    """
+    Write a fresh snapshot of a survey's responses and make it current.
+    Older snapshots are removed; open memory maps of them stay readable.
+    """
+    cutoff = db.execute(select(func.now())).scalar()
+    stmt = (
+        select(*ROW_COLUMNS)
+        .where(Response.survey_id == survey_id)
+        .order_by(Response.respondent_id, Response.question_id)
+        .execution_options(yield_per=SNAPSHOT_BATCH)
+    )
+    typecodes = {"id": "q", "question_id": "q", "respondent": "l", "answer": "l", "answer_code": "l",
+                 "answer_mask": "q", "has_mask": "b", "language": "l", "validation_status": "l",
+                 "voice": "l", "created_at": "q"}
+    data = {name: array(code) for name, code in typecodes.items()}
+    respondents, answers, languages, statuses = _Encoder(), _Encoder(), _Encoder(), _Encoder()
+    for partition in db.execute(stmt).partitions():
+        ids, qids, respondent_ids, texts, codes, masks, langs, states, voice, created = zip(*partition)
+        data["id"].extend(ids)
+        data["question_id"].extend(qids)
+        data["respondent"].extend(map(respondents, respondent_ids))
+        data["answer"].extend(map(answers, texts))
+        data["answer_code"].extend(-1 if code is None else code for code in codes)
+        data["answer_mask"].extend(mask or 0 for mask in masks)
+        data["has_mask"].extend(mask is not None for mask in masks)
+        data["language"].extend(map(languages, langs))
+        data["validation_status"].extend(map(statuses, states))
+        data["voice"].extend(-1 if flag is None else int(bool(flag)) for flag in voice)
+        data["created_at"].extend(map(_epoch, created))
+
+    # Codes were handed out in SQL collation order; re-rank them in Python order for bisect
+    order = sorted(range(len(respondents.values)), key=respondents.values.__getitem__)
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    columns = {name: np.asarray(data[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+    columns["respondent"] = rank[columns["respondent"]] if len(order) else columns["respondent"]
+
+    snapshot_id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    survey_dir = _survey_dir(survey_id)
+    tmp = os.path.join(survey_dir, f".tmp-{snapshot_id}")
+    os.makedirs(tmp)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), values)
+    _write_strings(tmp, "respondents", [respondents.values[i] for i in order])
+    _write_strings(tmp, "answers", answers.values)
+    numbers = [to_float(json.loads(text)) for text in answers.values] + [np.nan]
+    np.save(os.path.join(tmp, "answer_numbers.npy"), np.asarray(numbers, dtype=np.float64))
+    manifest = {
+        "survey_id": survey_id,
+        "snapshot_id": snapshot_id,
+        "cutoff": cutoff.isoformat(),
+        "rows": len(columns["id"]),
+        "respondents": len(order),
+        "distinct_answers": len(answers.values),
+        "languages": languages.values,
+        "validation_statuses": statuses.values,
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    os.rename(tmp, os.path.join(survey_dir, snapshot_id))
+
+    # Atomic switch, then drop what readers can no longer pick up
+    pointer = os.path.join(survey_dir, "CURRENT")
+    with open(f"{pointer}.tmp", "w") as f:
+        f.write(snapshot_id)
+    os.replace(f"{pointer}.tmp", pointer)
+    for name in os.listdir(survey_dir):
+        if name not in (snapshot_id, "CURRENT"):
+            shutil.rmtree(os.path.join(survey_dir, name), ignore_errors=True)
+    return manifest
+
+_loaded: Dict[int, Snapshot] = {}
+
+def load_snapshot(survey_id: int) -> Optional[Snapshot]:
+    """The survey's current snapshot, memory-mapped once per process; None if never compacted."""
+    survey_dir = _survey_dir(survey_id)
+    try:
+        with open(os.path.join(survey_dir, "CURRENT")) as f:
+            snapshot_id = f.read().strip()
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(survey_id)
+    if cached is not None and cached.snapshot_id == snapshot_id:
+        return cached
+    path = os.path.join(survey_dir, snapshot_id)
+    try:
+        with open(os.path.join(path, "manifest.json")) as f:
+            snapshot = Snapshot(path, json.load(f))
+    except FileNotFoundError:
+        return None   # replaced between reading CURRENT and opening the files
+    _loaded[survey_id] = snapshot
+    return snapshot
+
+def drop_snapshot(survey_id: int) -> None:
+    _loaded.pop(survey_id, None)
+    shutil.rmtree(_survey_dir(survey_id), ignore_errors=True)
+
+def load_delta(db: Session, snapshot: Snapshot) -> ResponseTable:
+    """Rows written since the snapshot cut-off, encoded with the snapshot's dictionaries."""
+    rows = db.execute(
+        select(*ROW_COLUMNS).where(
+            Response.survey_id == snapshot.survey_id,
+            Response.updated_at >= snapshot.cutoff - SNAPSHOT_DELTA_MARGIN,
+        )
+    ).all()
+    respondents = _RespondentEncoder(snapshot.respondents)
+    answers = _Encoder(snapshot.answers)
+    languages = list(snapshot.languages)
+    statuses = list(snapshot.statuses)
+
+    def small_code(names: List[Optional[str]], value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        if value not in names:
+            names.append(value)
+        return names.index(value)
+
+    columns = {
+        "id": np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows)),
+        "question_id": np.fromiter((r.question_id for r in rows), dtype=np.int64, count=len(rows)),
+        "respondent": np.fromiter((respondents(r.respondent_id) for r in rows), dtype=np.int32, count=len(rows)),
+        "answer": np.fromiter((answers(r.answer) for r in rows), dtype=np.int32, count=len(rows)),
+        "answer_code": np.fromiter(
+            (-1 if r.answer_code is None else r.answer_code for r in rows), dtype=np.int16, count=len(rows)
+        ),
+        "answer_mask": np.fromiter((r.answer_mask or 0 for r in rows), dtype=np.int64, count=len(rows)),
+        "has_mask": np.fromiter((r.answer_mask is not None for r in rows), dtype=np.bool_, count=len(rows)),
+        "language": np.fromiter((small_code(languages, r.language) for r in rows), dtype=np.int16, count=len(rows)),
+        "validation_status": np.fromiter(
+            (small_code(statuses, r.validation_status) for r in rows), dtype=np.int16, count=len(rows)
+        ),
+        "voice": np.fromiter(
+            (-1 if r.voice_enabled is None else int(bool(r.voice_enabled)) for r in rows), dtype=np.int8, count=len(rows)
+        ),
+        "created_at": np.fromiter((_epoch(r.created_at) for r in rows), dtype=np.int64, count=len(rows)),
+    }
+    new_numbers = np.asarray([to_float(json.loads(text)) for text in answers.values], dtype=np.float64)
+    return ResponseTable(
+        columns,
+        _Extended(snapshot.respondents, respondents.values),
+        _Extended(snapshot.answers, answers.values),
+        np.concatenate([snapshot.answer_numbers[:-1], new_numbers, [np.nan]]),
+        languages,
+        statuses,
+    )
+
+class _Extended(Sequence):
+    """A snapshot dictionary followed by the delta's new entries."""
+
+    def __init__(self, base: Sequence, extra: List[str]):
+        self.base = base
+        self.extra = extra
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.extra)
+
+    def __getitem__(self, i: int) -> str:
+        return self.base[i] if i < len(self.base) else self.extra[i - len(self.base)]
+
+class MergedTable:
+    """
+    Snapshot rows not replaced by the delta, followed by the delta rows.
+    Columns are materialized on first access, so readers only pay for
+    the columns they use.
+    """
+
+    def __init__(self, snapshot: Snapshot, delta: ResponseTable):
+        self.snapshot = snapshot
+        self.delta = delta
+        self.keep = ~np.isin(snapshot.columns["id"], delta.columns["id"]) if len(delta) else None
+        self._columns: Dict[str, np.ndarray] = {}
+        # Decoding goes through the delta, whose dictionaries extend the snapshot's
+        self.answer_value = delta.answer_value
+        self.answer_numbers = delta.answer_numbers
+        self.languages = delta.languages
+        self.statuses = delta.statuses
+        self.language_code = delta.language_code
+
+    def __len__(self) -> int:
+        return len(self.column("id"))
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            base = self.snapshot.columns[name]
+            base = base[self.keep] if self.keep is not None else np.asarray(base)
+            self._columns[name] = np.concatenate([base, self.delta.columns[name]])
+        return self._columns[name]
+
+    def created_mask(self, start: Optional[datetime], end: Optional[datetime]) -> np.ndarray:
+        """Rows created in [start, end); rows without created_at never match."""
+        created = self.column("created_at")
+        mask = created != NO_TIMESTAMP
+        if start:
+            mask &= created >= _epoch(start)
+        if end:
+            mask &= created < _epoch(end)
+        return mask
+
+def read_table(db: Session, survey_id: int) -> Optional[MergedTable]:
+    """Snapshot plus delta for a survey, or None if it has no snapshot."""
+    snapshot = load_snapshot(survey_id)
+    if snapshot is None:
+        return None
+    return MergedTable(snapshot, load_delta(db, snapshot))
+
+def surveys_to_compact(db: Session, min_responses: int) -> List[int]:
+    return [
+        sid for (sid,) in db.execute(
+            select(Response.survey_id)
+            .group_by(Response.survey_id)
+            .having(func.count() >= min_responses)
+        )
+    ]
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Compact survey responses into columnar snapshots")
+    parser.add_argument("--survey-id", type=int, help="Compact one survey (default: all large enough)")
+    parser.add_argument("--min-responses", type=int, default=SNAPSHOT_MIN_RESPONSES)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        survey_ids = [args.survey_id] if args.survey_id else surveys_to_compact(db, args.min_responses)
+        for sid in survey_ids:
+            start = time.perf_counter()
+            manifest = compact_survey(db, sid)
+            print(f"survey {sid}: {manifest['rows']} rows, {manifest['respondents']} respondents "
+                  f"in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
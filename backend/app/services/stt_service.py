@@ -0,0 +1,100 @@
+# backend/app/services/stt_service.py
+"""
+Speech-to-text off the event loop.
+
+Uploads are spooled (in memory up to STT_SPOOL_MAX_BYTES, then on disk) and
+handed as file objects to a bounded thread pool that decodes and recognizes
+them, so a slow recognizer never blocks other requests.
+
+The recognizer is pluggable via STT_BACKEND: a built-in name (google,
+sphinx, whisper, vosk) or "package.module:function" for a custom
+fn(recognizer, audio_data, language) -> str. Offline engines such as sphinx
+or vosk let tests run without network access.
+"""
+
+import asyncio
+import contextvars
+import importlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Union
+
+from app.services.profiling_service import external_call
+
+STT_BACKEND = os.getenv("STT_BACKEND", "google")
+STT_WORKERS = int(os.getenv("STT_WORKERS", "4"))
+STT_SPOOL_MAX_BYTES = int(os.getenv("STT_SPOOL_MAX_BYTES", str(4 * 1024 * 1024)))
+STT_CHUNK_SIZE = 64 * 1024
+
+# fn(speech_recognition.Recognizer, speech_recognition.AudioData, language) -> text
+Backend = Callable[[Any, Any, str], str]
+
+BUILTIN_BACKENDS: Dict[str, Backend] = {
+    "google": lambda r, audio, language: r.recognize_google(audio, language=language),
+    "sphinx": lambda r, audio, language: r.recognize_sphinx(audio, language=language),
+    "whisper": lambda r, audio, language: r.recognize_whisper(audio, language=language.split("-")[0]),
+    "vosk": lambda r, audio, language: r.recognize_vosk(audio),
+}
+
+def load_backend(name: str) -> Backend:
+    if name in BUILTIN_BACKENDS:
+        return BUILTIN_BACKENDS[name]
+    module, _, attr = name.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown STT backend: {name}")
+    return getattr(importlib.import_module(module), attr)
+
+_backend: Backend = load_backend(STT_BACKEND)
+_backend_name = STT_BACKEND   # metrics label
+_executor = ThreadPoolExecutor(max_workers=STT_WORKERS, thread_name_prefix="stt")
+
+def set_backend(backend: Union[str, Backend]) -> None:
+    global _backend, _backend_name
+    _backend = load_backend(backend) if isinstance(backend, str) else backend
+    _backend_name = backend if isinstance(backend, str) else getattr(backend, "__name__", "custom")
+
+def new_spool() -> BinaryIO:
+    return tempfile.SpooledTemporaryFile(max_size=STT_SPOOL_MAX_BYTES)
+
+async def spool_stream(chunks) -> BinaryIO:
+    """
+    Copy an async byte-chunk iterator (e.g. request.stream()) into a spool
+    file. Once the spool rolls over to disk, writes go through a thread so
+    a slow disk does not stall the event loop.
+    """
+    spool = new_spool()
+    size = 0
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        size += len(chunk)
+        if size > STT_SPOOL_MAX_BYTES:
+            await asyncio.to_thread(spool.write, chunk)
+        else:
+            spool.write(chunk)
+    await asyncio.to_thread(spool.seek, 0)
+    return spool
+
+def transcribe_sync(source: Union[str, BinaryIO], language: str = "en") -> Dict[str, Any]:
+    """Decode WAV/AIFF/FLAC from a path or file object and recognize it. Blocking."""
+    import speech_recognition as sr   # loaded by the first transcription, not at worker start
+
+    if not isinstance(source, str):
+        source.seek(0)
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(source) as audio_source:
+        audio_data = recognizer.record(audio_source)
+    try:
+        with external_call("stt", _backend_name):
+            text = _backend(recognizer, audio_data, language)
+        return {"text": text, "error": None}
+    except sr.UnknownValueError:
+        return {"text": "", "error": "Speech unintelligible"}
+
+async def transcribe(source: Union[str, BinaryIO], language: str = "en") -> Dict[str, Any]:
+    """transcribe_sync on the STT pool; awaiting it leaves the event loop free."""
+    loop = asyncio.get_running_loop()
+    # Carry the request's context into the pool thread (per-request profile)
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, context.run, transcribe_sync, source, language)
@@ -0,0 +1,259 @@
+# backend/app/services/survey_cache_service.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import Question, Survey
+from app.schemas import AdaptiveQuestionResponse, SurveyResponse
+from app.services.branching_service import Answers, NextStep, compile_plan
+from app.services.validation_service import AnswerCheck, ValidationPlan, Verdict, validate_many
+
+# Compiled survey definitions kept per process (LRU)
+SURVEY_CACHE_SIZE = int(os.getenv("SURVEY_CACHE_SIZE", "256"))
+
+# session.info keys used by the flush hooks below
+_BUMP_KEY = "survey_cache_bump_ids"
+_INVALIDATE_KEY = "survey_cache_invalidate_ids"
+
+class CompiledQuestion:
+    """A question with its per-language adaptive payloads rendered once and its validation plan."""
+
+    __slots__ = ("id", "order_index", "validation", "_fields", "_payloads")
+
+    def __init__(self, question: Question):
+        self.id = question.id
+        self.order_index = question.order_index
+        self.validation = ValidationPlan(question)
+        self._fields: Dict[str, Any] = {
+            "question_id": question.id,
+            "question_text": question.question_text,
+            "question_type": question.question_type,
+            "options": question.options or [],
+            "order_index": question.order_index,
+            "translations": question.translations or {},
+            "audio_file_uri": question.audio_file_uri,
+            "voice_enabled": bool(question.voice_enabled),
+            "audio_metadata": question.audio_metadata or {},
+            "adaptive_enabled": bool(question.adaptive_enabled),
+            "adaptive_config": question.adaptive_config or {},
+            "ai_generated": bool(question.ai_generated),
+            "ai_metadata": question.ai_metadata or {},
+        }
+        self._payloads: Dict[str, bytes] = {}
+
+    def _language_key(self, language: str) -> str:
+        # Unknown languages share the base payload, so memory stays bounded
+        return language if language in self._fields["translations"] else ""
+
+    def render(self, language: str = "en") -> AdaptiveQuestionResponse:
+        fields = dict(self._fields)
+        translation = fields["translations"].get(self._language_key(language))
+        if isinstance(translation, dict):   # {lang: {text, options}}
+            fields["question_text"] = translation.get("text", fields["question_text"])
+            fields["options"] = translation.get("options", fields["options"])
+        elif translation:                   # {lang: text}
+            fields["question_text"] = translation
+        # Pre-rendered speech for this language (see tts_cache_service.prewarm_survey)
+        clip = (fields["audio_metadata"].get("tts") or {}).get(language)
+        if isinstance(clip, dict) and clip.get("uri"):
+            fields["audio_file_uri"] = clip["uri"]
+        return AdaptiveQuestionResponse(**fields)
+
+    def payload(self, language: str = "en", roster_member: Optional[int] = None, roster_size: Optional[int] = None) -> bytes:
+        """Serialized AdaptiveQuestionResponse JSON for a language."""
+        key = self._language_key(language)
+        if roster_member is not None:
+            # Per-respondent roster position, rendered on demand
+            rendered = self.render(key).model_copy(update={"roster_member": roster_member, "roster_size": roster_size})
+            return rendered.model_dump_json().encode()
+        cached = self._payloads.get(key)
+        if cached is None:
+            cached = self.render(key).model_dump_json().encode()
+            self._payloads[key] = cached
+        return cached
+
+class CompiledSurvey:
+    """Questions of one survey version, pre-sorted by order_index, with branching rules compiled."""
+
+    def __init__(
+        self,
+        survey_id: int,
+        version: int,
+        status: Optional[str],
+        questions: Iterable[Question],
+        adaptive_enabled: bool = True,
+    ):
+        self.survey_id = survey_id
+        self.version = version
+        self.status = status
+        ordered = sorted(questions, key=lambda q: (q.order_index or 0, q.id))
+        self.questions = tuple(CompiledQuestion(q) for q in ordered)
+        self.question_ids = tuple(q.id for q in self.questions)
+        self.position = {qid: idx for idx, qid in enumerate(self.question_ids)}
+        self.plan = compile_plan(ordered, adaptive_enabled=adaptive_enabled is not False)
+        self.validation_plans = {q.id: q.validation for q in self.questions}
+
+    def next_step(self, answers: Answers, cursor: int = 0) -> Optional[NextStep]:
+        """Next question for a respondent's answers ({question_id: answer}), or None when done."""
+        return self.plan.next_step(answers, cursor)
+
+    def question_at(self, step: NextStep) -> CompiledQuestion:
+        return self.questions[step.position]
+
+    def validate(self, checks: Iterable[AnswerCheck]) -> List[Optional[Verdict]]:
+        """(validation_status, score) per answer; None for questions outside this survey."""
+        return validate_many(self.validation_plans, checks)
+
+class SurveyDocument(NamedTuple):
+    """Serialized SurveyResponse bytes for GET /api/surveys/{id}, with a strong ETag."""
+    version: int
+    status: Optional[str]
+    body: bytes
+    etag: str
+
+_cache: "OrderedDict[int, CompiledSurvey]" = OrderedDict()
+_documents: "OrderedDict[int, SurveyDocument]" = OrderedDict()
+_lock = threading.Lock()
+
+def _cached(survey_id: int) -> Optional[CompiledSurvey]:
+    with _lock:
+        compiled = _cache.get(survey_id)
+        if compiled is not None:
+            _cache.move_to_end(survey_id)
+        return compiled
+
+def _store(compiled: CompiledSurvey) -> None:
+    with _lock:
+        _cache[compiled.survey_id] = compiled
+        _cache.move_to_end(compiled.survey_id)
+        while len(_cache) > SURVEY_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def peek_compiled_survey(survey_id: int) -> Optional[CompiledSurvey]:
+    """Cached compiled survey without touching the database (may be stale for drafts)."""
+    return _cached(survey_id)
+
+def invalidate_survey(survey_id: int) -> None:
+    with _lock:
+        _cache.pop(survey_id, None)
+        _documents.pop(survey_id, None)
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
+        _documents.clear()
+
+def get_compiled_survey(db: Session, survey_id: int) -> Optional[CompiledSurvey]:
+    """
+    Return the compiled definition for a survey, rebuilding it when the
+    stored version moved. Returns None if the survey does not exist.
+
+    The version is read on every call, published or not: invalidation hooks
+    only run in the process that made the edit, so this primary-key lookup
+    is how other workers see it.
+    """
+    cached = _cached(survey_id)
+    head = db.execute(
+        select(Survey.version, Survey.status, Survey.adaptive_enabled).where(Survey.id == survey_id)
+    ).first()
+    if head is None:
+        invalidate_survey(survey_id)
+        return None
+    if cached is not None and cached.version == head.version and cached.status == head.status:
+        return cached
+
+    questions = db.execute(select(Question).where(Question.survey_id == survey_id)).scalars().all()
+    compiled = CompiledSurvey(survey_id, head.version, head.status, questions, head.adaptive_enabled)
+    _store(compiled)
+    return compiled
+
+def _build_document(db: Session, survey_id: int) -> Optional[SurveyDocument]:
+    # One round trip: survey and questions via LEFT OUTER JOIN
+    survey = db.execute(
+        select(Survey).options(joinedload(Survey.questions)).where(Survey.id == survey_id)
+    ).unique().scalar_one_or_none()
+    if survey is None:
+        return None
+    document = SurveyResponse.model_validate(survey)
+    # Stable order keeps the bytes, and so the ETag, stable across rebuilds
+    document.questions.sort(key=lambda q: (q.order_index or 0, q.id))
+    body = document.model_dump_json().encode()
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    return SurveyDocument(survey.version, survey.status, body, etag)
+
+def get_survey_document(db: Session, survey_id: int) -> Optional[SurveyDocument]:
+    """
+    Serialized survey definition, revalidated against Survey.version like
+    get_compiled_survey. Returns None if the survey does not exist.
+    """
+    with _lock:
+        cached = _documents.get(survey_id)
+        if cached is not None:
+            _documents.move_to_end(survey_id)
+
+    if cached is not None:
+        head = db.execute(select(Survey.version, Survey.status).where(Survey.id == survey_id)).first()
+        if head is not None and cached.version == head.version and cached.status == head.status:
+            return cached
+
+    document = _build_document(db, survey_id)
+    with _lock:
+        if document is None:
+            _documents.pop(survey_id, None)
+            return None
+        _documents[survey_id] = document
+        _documents.move_to_end(survey_id)
+        while len(_documents) > SURVEY_CACHE_SIZE:
+            _documents.popitem(last=False)
+    return document
+
+def mark_survey_edited(db: Session, survey_id: int) -> None:
+    """Bump a survey's version for Core-level writes that skip the ORM flush hooks."""
+    db.execute(
+        update(Survey).where(Survey.id == survey_id).values(version=Survey.version + 1),
+        execution_options={"synchronize_session": False},
+    )
+    db.info.setdefault(_INVALIDATE_KEY, set()).add(survey_id)
+
+# --------- ORM hooks: version bump + invalidation on survey edits ---------
+@event.listens_for(Session, "before_flush")
+def _track_survey_edits(session: Session, flush_context, instances) -> None:
+    bump = session.info.setdefault(_BUMP_KEY, set())
+    invalidate = session.info.setdefault(_INVALIDATE_KEY, set())
+    with session.no_autoflush:
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if isinstance(obj, Question) and obj.survey_id is not None:
+                bump.add(obj.survey_id)
+            elif isinstance(obj, Survey) and obj in session.deleted:
+                invalidate.add(obj.id)
+            elif isinstance(obj, Survey) and obj.id is not None and session.is_modified(obj):
+                obj.version = (obj.version or 1) + 1
+                invalidate.add(obj.id)
+    bump.difference_update(invalidate)
+
+@event.listens_for(Session, "after_flush")
+def _bump_survey_versions(session: Session, flush_context) -> None:
+    survey_ids = session.info.pop(_BUMP_KEY, set())
+    if survey_ids:
+        table = Survey.__table__
+        session.connection().execute(
+            update(table).where(table.c.id.in_(survey_ids)).values(version=table.c.version + 1)
+        )
+        session.info.setdefault(_INVALIDATE_KEY, set()).update(survey_ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    for survey_id in session.info.pop(_INVALIDATE_KEY, set()):
+        invalidate_survey(survey_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction) -> None:
+    session.info.pop(_BUMP_KEY, None)
+    session.info.pop(_INVALIDATE_KEY, None)
@@ -0,0 +1,154 @@
+# backend/app/services/tts_cache_service.py
+"""
+Content-addressed store for synthesized speech. Audio is keyed by
+sha256(text, language, slow), so every respondent, request and publish
+shares one file per distinct prompt. Files live under TTS_CACHE_DIR and are
+evicted least-recently-used (by mtime, refreshed on access) once the store
+exceeds TTS_CACHE_MAX_BYTES.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Question, Survey
+from app.services.profiling_service import external_call
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "./tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(1024 ** 3)))
+AUDIO_URI_PREFIX = "/api/voice/audio/"
+TOUCH_INTERVAL = 3600      # seconds; mtime is refreshed at most this often per file
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+_lock = threading.Lock()
+_key_locks: Dict[str, threading.Lock] = {}
+_total_bytes: Optional[int] = None     # lazily measured, then tracked on writes/evictions
+
+def audio_key(text: str, language: str = "en", slow: bool = False) -> str:
+    return hashlib.sha256(f"{text.strip()}\x1f{language}\x1f{int(bool(slow))}".encode()).hexdigest()
+
+def is_key(key: str) -> bool:
+    return bool(_KEY_RE.match(key))
+
+def audio_path(key: str) -> str:
+    # Two-level fan-out keeps directories small
+    return os.path.join(TTS_CACHE_DIR, key[:2], f"{key}.mp3")
+
+def audio_uri(key: str) -> str:
+    return f"{AUDIO_URI_PREFIX}{key}.mp3"
+
+def touch(path: str) -> None:
+    """Mark a file as recently used for eviction purposes."""
+    try:
+        if time.time() - os.path.getmtime(path) > TOUCH_INTERVAL:
+            os.utime(path)
+    except OSError:
+        pass
+
+def _files():
+    for root, _, names in os.walk(TTS_CACHE_DIR):
+        for name in names:
+            if name.endswith(".mp3"):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+def _evict_if_needed(added: int) -> None:
+    global _total_bytes
+    with _lock:
+        if _total_bytes is None:
+            _total_bytes = sum(size for _, size, _ in _files())
+        else:
+            _total_bytes += added
+        if _total_bytes <= TTS_CACHE_MAX_BYTES:
+            return
+        # Oldest first until 90% of the budget, so eviction is not triggered on every write
+        for path, size, _ in sorted(_files(), key=lambda f: f[2]):
+            if _total_bytes <= TTS_CACHE_MAX_BYTES * 0.9:
+                break
+            try:
+                os.remove(path)
+                _total_bytes -= size
+            except OSError:
+                pass
+
+def get_or_synthesize(text: str, language: str = "en", slow: bool = False) -> Tuple[str, str]:
+    """(key, path) of the audio for this prompt, synthesizing it once on a miss."""
+    key = audio_key(text, language, slow)
+    path = audio_path(key)
+    if os.path.exists(path):
+        touch(path)
+        return key, path
+
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    # Single flight: concurrent misses for the same prompt wait for one synthesis
+    try:
+        with key_lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                from gtts import gTTS   # imported on first synthesis, not at worker start
+                tts = gTTS(text=text, lang=language, slow=slow)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as tmp, external_call("tts", "gtts"):
+                        tts.write_to_fp(tmp)
+                    os.replace(tmp_path, path)   # atomic: readers never see a partial file
+                except Exception:
+                    os.remove(tmp_path)
+                    raise
+                _evict_if_needed(os.path.getsize(path))
+    finally:
+        with _lock:
+            _key_locks.pop(key, None)
+    return key, path
+
+def _question_texts(question: Question, base_language: str) -> Dict[str, str]:
+    texts = {base_language: question.question_text}
+    for language, translation in (question.translations or {}).items():
+        text = translation.get("text") if isinstance(translation, dict) else translation
+        if text:
+            texts[language] = text
+    return texts
+
+def prewarm_survey(db: Session, survey_id: int) -> Dict[str, Any]:
+    """
+    Synthesize every voice-enabled question in each of its languages and
+    record the URIs: audio_file_uri for the base language and
+    audio_metadata["tts"][language] for all. Does not commit.
+    """
+    survey = db.get(Survey, survey_id)
+    base_language = (survey.languages or ["en"])[0]
+    questions = db.execute(select(Question).where(Question.survey_id == survey_id)).scalars().all()
+    report = {"questions": 0, "clips": 0, "skipped": 0}
+    for question in questions:
+        if not (survey.voice_enabled or question.voice_enabled):
+            continue
+        tts = {}
+        for language, text in _question_texts(question, base_language).items():
+            try:
+                key, path = get_or_synthesize(text, language)
+            except ValueError as e:
+                # gTTS has no voice for this language
+                logging.warning(f"TTS prewarm skipped question {question.id} [{language}]: {e}")
+                report["skipped"] += 1
+                continue
+            tts[language] = {"uri": audio_uri(key), "key": key, "bytes": os.path.getsize(path)}
+            report["clips"] += 1
+        if tts:
+            if base_language in tts:
+                question.audio_file_uri = tts[base_language]["uri"]
+            question.audio_metadata = {**(question.audio_metadata or {}), "tts": tts}
+            report["questions"] += 1
+    return report
@@ -1,65 +1,218 @@
 # backend/app/services/validation_service.py
 
+import logging
+import re
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
 from app.models.question import Question
 
-def validate_answer(question: Question, answer, language: str = "en", audio_file_uri: str = None, ai_context: dict = None):
+CHOICE_TYPES = ("radio", "checkbox")
+
+# Checkbox answers are stored as a bitmask in one BIGINT
+MAX_MASK_OPTIONS = 64
+
+def _label_key(label: Any) -> str:
+    return str(label).strip().casefold()
+
+def _answer_key(answer: Any) -> Optional[str]:
+    """Key of one selected option; only string labels can match (None, numbers and objects never do)."""
+    return answer.strip().casefold() if isinstance(answer, str) else None
+
+def to_int64(mask: int) -> int:
+    """Unsigned 64-bit mask as the signed value a BIGINT column holds."""
+    return mask - (1 << 64) if mask >= (1 << 63) else mask
+
+def mask_bits(mask: int) -> Iterator[int]:
+    """Option ids set in a (signed or unsigned) 64-bit mask."""
+    mask &= (1 << 64) - 1
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class OptionCodes:
+    """
+    Option labels in every language mapped to option ids, the position in
+    Question.options; translations[lang]["options"] are aligned by position.
+    """
+
+    def __init__(self, question_type: Optional[str], options: Optional[List[Any]], translations: Optional[Dict[str, Any]]):
+        self.question_type = question_type
+        self.labels = [str(opt) for opt in options or []]
+        self.by_language: Dict[str, Dict[str, int]] = {}
+        self.any_language: Dict[str, int] = {}
+        for i, label in enumerate(self.labels):
+            self.any_language.setdefault(_label_key(label), i)
+        for language, translation in (translations or {}).items():
+            labels = translation.get("options") if isinstance(translation, dict) else None
+            codes = {_label_key(label): i for i, label in enumerate(labels or []) if i < len(self.labels)}
+            self.by_language[language] = codes
+            for key, i in codes.items():
+                self.any_language.setdefault(key, i)
+
+    def code(self, label: Any, language: Optional[str] = None) -> Optional[int]:
+        # Same key as ValidationPlan._choices_valid, so codes only go to answers that validate.
+        # The respondent's language wins when labels collide across languages
+        key = _answer_key(label)
+        if key is None:
+            return None
+        code = self.by_language.get(language, {}).get(key)
+        return code if code is not None else self.any_language.get(key)
+
+    def _selected(self, answer: Any) -> List[Any]:
+        return answer if isinstance(answer, list) else [answer]
+
+    def valid(self, answer: Any, language: Optional[str] = None) -> bool:
+        return all(self.code(opt, language) is not None for opt in self._selected(answer))
+
+    def encode(self, answer: Any, language: Optional[str] = None) -> Tuple[Optional[int], Optional[int]]:
+        """(answer_code, answer_mask); None where the answer does not map onto the options."""
+        if answer is None or answer == "":
+            return None, None
+        if self.question_type == "radio":
+            selected = self._selected(answer)
+            return (self.code(selected[0], language) if len(selected) == 1 else None), None
+        if len(self.labels) > MAX_MASK_OPTIONS:
+            return None, None
+        mask = 0
+        for opt in self._selected(answer):
+            code = self.code(opt, language)
+            if code is None:
+                return None, None
+            mask |= 1 << code
+        return None, to_int64(mask)
+
+def option_codes(question) -> Optional[OptionCodes]:
+    """OptionCodes for a radio/checkbox question (ORM object or row), else None."""
+    if question.question_type not in CHOICE_TYPES:
+        return None
+    return OptionCodes(question.question_type, question.options, getattr(question, "translations", None))
+
+Verdict = Tuple[str, int]
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
     try:
-        # Check required answer presence
-        if question.is_mandatory and (answer is None or answer == ""):
-            return "invalid", 0
-
-        # Voice/audio validation: if required but not provided
-        if getattr(question, "voice_enabled", False):
-            if not audio_file_uri:
-                return "invalid", 10
-            # Optional: validate audio metadata if present
-            if hasattr(question, "audio_metadata") and isinstance(question.audio_metadata, dict):
-                # Example: min_duration
-                min_dur = question.audio_metadata.get("min_duration")
-                if min_dur:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class ValidationPlan:
+    """
+    A question's validation rules compiled once: option labels of every
+    language folded into one frozenset, regex and range rules precompiled.
+    Cached on the compiled survey (survey_cache_service), so the submit
+    path only runs the checks.
+    """
+
+    __slots__ = (
+        "mandatory", "voice_required", "min_duration", "allowed", "numeric_only",
+        "pattern", "minimum", "maximum", "required_value", "ai_generated", "error",
+    )
+
+    def __init__(self, question):
+        self.mandatory = bool(question.is_mandatory)
+        self.voice_required = bool(getattr(question, "voice_enabled", False))
+        metadata = getattr(question, "audio_metadata", None)
+        self.min_duration = metadata.get("min_duration") if isinstance(metadata, dict) else None
+
+        # Labels in any of the question's languages are accepted (see OptionCodes.valid)
+        codes = option_codes(question)
+        self.allowed: Optional[FrozenSet[str]] = frozenset(codes.any_language) if codes is not None else None
+
+        rules = question.validation_rules or {}
+        self.numeric_only = bool(rules.get("numeric_only"))
+        self.error: Optional[str] = None
+        try:
+            self.pattern = re.compile(rules["pattern"]) if rules.get("pattern") else None
+        except re.error as e:
+            # A bad rule fails every answer to this question, not the whole survey
+            self.pattern, self.error = None, f"invalid pattern rule: {e}"
+        self.minimum = _number(rules.get("min"))
+        self.maximum = _number(rules.get("max"))
+
+        config = question.adaptive_config if getattr(question, "adaptive_enabled", False) else None
+        self.required_value = config.get("required_value") if config else None
+        self.ai_generated = bool(getattr(question, "ai_generated", False))
+
+    def _choices_valid(self, answer: Any) -> bool:
+        allowed = self.allowed
+        if isinstance(answer, list):
+            return all(_answer_key(opt) in allowed for opt in answer)
+        return _answer_key(answer) in allowed
+
+    def validate(self, answer: Any, language: str = "en", audio_file_uri: str = None, ai_context: dict = None) -> Verdict:
+        """(validation_status, score), the verdicts of validate_answer."""
+        if self.error is not None:
+            logging.warning(f"Validation error: {self.error}")
+            return "error", 0
+        try:
+            # Check required answer presence
+            if self.mandatory and (answer is None or answer == ""):
+                return "invalid", 0
+
+            # Voice/audio validation: if required but not provided
+            if self.voice_required:
+                if not audio_file_uri:
+                    return "invalid", 10
+                if self.min_duration:
                     received_dur = ai_context.get("audio_duration") if ai_context else None
-                    if received_dur and received_dur < min_dur:
+                    if received_dur and received_dur < self.min_duration:
                         return "invalid", 25
 
-        # Branch on language: use language-specific options if provided
-        options = question.options
-        if getattr(question, "translations", None) and language in question.translations:
-            trans = question.translations[language]
-            options = trans.get("options", options)
-
-        # Type-based validation
-        if question.question_type in ("radio", "checkbox"):
-            if isinstance(answer, list):
-                valid = all(opt in options for opt in answer)
-            else:
-                valid = answer in options
-            if not valid:
+            # Type-based validation: option labels in any of the question's languages
+            if self.allowed is not None and not self._choices_valid(answer):
                 return "invalid", 30
 
-        # Custom rules (including adaptive logic)
-        rules = question.validation_rules or {}
-        if rules.get("numeric_only") and not str(answer).isdigit():
-            return "invalid", 20
-
-        # Adaptive branching logic (forward to next if rule requires it)
-        if getattr(question, "adaptive_enabled", False) and question.adaptive_config:
-            # Example: check conditional required questions
-            target_val = question.adaptive_config.get("required_value")
-            if target_val and answer != target_val:
-                # Branching: this answer doesn't meet path requirement
+            # Custom rules
+            if self.numeric_only and not str(answer).isdigit():
+                return "invalid", 20
+            if self.pattern is not None and not self.pattern.fullmatch(str(answer)):
+                return "invalid", 20
+            if self.minimum is not None or self.maximum is not None:
+                value = _number(answer)
+                if value is None:
+                    return "invalid", 20
+                if (self.minimum is not None and value < self.minimum) or (self.maximum is not None and value > self.maximum):
+                    return "invalid", 20
+
+            # Adaptive branching logic: this answer doesn't meet the path requirement
+            if self.required_value and answer != self.required_value:
                 return "invalid", 50
 
-        # AI-based validation rules
-        if getattr(question, "ai_generated", False) and ai_context:
-            feedback = ai_context.get("validation_feedback")
-            if feedback == "low_confidence":
-                return "review", 70
-            elif feedback == "invalid":
-                return "invalid", 40
+            # AI-based validation rules
+            if self.ai_generated and ai_context:
+                feedback = ai_context.get("validation_feedback")
+                if feedback == "low_confidence":
+                    return "review", 70
+                elif feedback == "invalid":
+                    return "invalid", 40
 
-        # Passed all checks
-        return "valid", 100
+            # Passed all checks
+            return "valid", 100
 
-    except Exception as e:
-        print(f"Validation error: {e}")
-        return "error", 0
+        except Exception as e:
+            logging.warning(f"Validation error: {e}")
+            return "error", 0
+
+class AnswerCheck(NamedTuple):
+    question_id: int
+    answer: Any
+    language: Optional[str] = "en"
+    audio_file_uri: Optional[str] = None
+    ai_context: Optional[dict] = None
+
+def validate_many(plans: Mapping[int, ValidationPlan], checks: Iterable[AnswerCheck]) -> List[Optional[Verdict]]:
+    """Verdicts in input order; None for questions without a plan (not in the survey)."""
+    results = []
+    append = results.append
+    get = plans.get
+    for check in checks:
+        plan = get(check.question_id)
+        append(None if plan is None else plan.validate(check.answer, check.language, check.audio_file_uri, check.ai_context))
+    return results
+
+def validate_answer(question: Question, answer, language: str = "en", audio_file_uri: str = None, ai_context: dict = None):
+    """One-off validation; hot paths use the plan cached with the survey definition."""
+    return ValidationPlan(question).validate(answer, language, audio_file_uri, ai_context)
@@ -0,0 +1,463 @@
+# backend/app/services/write_buffer_service.py
+"""
+Optional write-behind mode for answer submits (RESPONSE_WRITE_BEHIND=1).
+
+Normally every submit is its own transaction, and on SQLite every writer
+queues on the one database lock. In write-behind mode a submit is
+validated, appended to a local journal and acknowledged once the journal
+is on disk; a flusher thread then upserts the buffered rows in groups
+(every RESPONSE_FLUSH_INTERVAL_MS, or as soon as RESPONSE_FLUSH_MAX_ROWS
+are waiting) through response_service.upsert_responses, one transaction
+per group. Concurrent submits also share journal writes: one write and
+one fsync per batch.
+
+The journal is made of append-only JSON-lines segments in
+RESPONSE_JOURNAL_DIR. Each process has one open segment and holds an
+exclusive flock on it. A segment is deleted once every row in it has been
+committed. At startup, segments that no live process has locked (left by
+a crashed or killed worker) are replayed into the database.
+
+A crashed worker's segments still hold rows it had already committed, and
+the respondent may have answered again through another worker since.
+Every answer carries its submitted_at, and write-behind commits (flushes
+and replays alike) only replace a stored answer submitted before them
+(upsert_responses(newer_only=True)). Replayed rows that are already in the
+database, or were superseded, are skipped without touching the aggregates.
+
+Answers become visible to the respondent's own adaptive flow at once,
+through the session state and pending_answers(). They reach listings and
+aggregates when their group commits.
+
+Submits answer 202 with response_id=None: the answer is durable, but not
+yet committed. A row the database later refuses (e.g. its question was
+deleted meanwhile) is appended to REJECTED_FILE in the journal directory
+instead; status() reports how many, for GET /api/responses/responses/write-behind.
+"""
+
+import glob
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+
+from app.database import SessionLocal
+from app.services import metrics_service
+
+try:
+    import fcntl
+except ImportError:   # no flock (Windows): recovery assumes a single process
+    fcntl = None
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+RESPONSE_WRITE_BEHIND = os.getenv("RESPONSE_WRITE_BEHIND", "0").lower() in TRUE_VALUES
+FLUSH_INTERVAL = float(os.getenv("RESPONSE_FLUSH_INTERVAL_MS", "50")) / 1000
+FLUSH_MAX_ROWS = int(os.getenv("RESPONSE_FLUSH_MAX_ROWS", "500"))
+BUFFER_MAX_ROWS = int(os.getenv("RESPONSE_BUFFER_MAX_ROWS", "50000"))   # beyond this submits get BufferFull
+JOURNAL_DIR = os.getenv("RESPONSE_JOURNAL_DIR", "./response_journal")
+JOURNAL_FSYNC = os.getenv("RESPONSE_JOURNAL_FSYNC", "1").lower() in TRUE_VALUES
+JOURNAL_SEGMENT_BYTES = int(os.getenv("RESPONSE_JOURNAL_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+RETRY_MAX_SECONDS = 5.0
+
+SEGMENT_PATTERN = "segment-*.jsonl"
+REJECTED_FILE = "rejected.jsonl"   # rows the database refused, kept for inspection
+
+FLUSH_ROW_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+metrics_service.describe("response_buffer_pending_rows", "gauge", "Journaled answers not yet committed to the database")
+metrics_service.describe("response_buffer_flush_rows", "histogram", "Answers committed per write-behind group", FLUSH_ROW_BUCKETS)
+metrics_service.describe("response_buffer_flush_seconds", "histogram", "Write-behind group commit latency")
+metrics_service.describe("response_buffer_flush_failures_total", "counter", "Write-behind group commits that failed, by reason")
+metrics_service.describe("response_buffer_rejected_total", "counter", "Buffered answers the database refused (moved to the rejected file)")
+
+StateKey = Tuple[int, str]
+
+class BufferFull(Exception):
+    """Raised when the database has fallen too far behind the journal."""
+
+def _lock_file(fd: int) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _journal_line(seq: int, row: Dict[str, Any]) -> str:
+    row = {**row, "submitted_at": row["submitted_at"].isoformat()}
+    return json.dumps({"seq": seq, "row": row}, separators=(",", ":"), default=str)
+
+def _read_segment(fd: int) -> List[Dict[str, Any]]:
+    with os.fdopen(os.dup(fd), "r", encoding="utf-8") as f:
+        f.seek(0)
+        rows = []
+        for line in f:
+            try:
+                row = json.loads(line)["row"]
+                row["submitted_at"] = datetime.fromisoformat(row["submitted_at"])
+                rows.append(row)
+            except (ValueError, KeyError, TypeError):
+                # Only the last line can be torn (crash mid-append); it was never acknowledged
+                logging.warning(f"Skipping unreadable journal line: {line[:80]!r}")
+        return rows
+
+def _commit_rows(rows: List[Dict[str, Any]]) -> None:
+    # Imported here: session_state_service imports this module, and response_service leads back to it
+    from app.services import response_service
+
+    with SessionLocal() as db:
+        try:
+            # Never over a newer answer, e.g. one given through another worker before a replay
+            response_service.upsert_responses(db, rows, newer_only=True)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+class WriteBuffer:
+    """Journal writer and group-commit flusher for one process."""
+
+    def __init__(
+        self,
+        journal_dir: str = JOURNAL_DIR,
+        flush_interval: float = FLUSH_INTERVAL,
+        flush_max_rows: int = FLUSH_MAX_ROWS,
+        max_rows: int = BUFFER_MAX_ROWS,
+        fsync: bool = JOURNAL_FSYNC,
+        segment_bytes: int = JOURNAL_SEGMENT_BYTES,
+    ):
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval
+        self.flush_max_rows = flush_max_rows
+        self.max_rows = max_rows
+        self.fsync = fsync
+        self.segment_bytes = segment_bytes
+
+        self._lock = threading.Lock()
+        self._incoming: List[Tuple[List[Dict[str, Any]], Future]] = []
+        self._incoming_ready = threading.Condition(self._lock)
+        self._pending: Deque[Tuple[int, Dict[str, Any]]] = deque()   # (seq, row), journaled, not committed
+        self._unflushed: Dict[StateKey, Dict[int, Tuple[int, Any]]] = {}   # respondent -> {qid: (seq, answer)}
+        self._accepted = 0     # rows taken by submit() and not yet committed (journal queue + pending)
+        self._seq = 0
+        self._committed_seq = 0   # every row up to here is in the database
+        self._flush_now = threading.Event()
+        self._stopping = threading.Event()
+        self._journal_thread: Optional[threading.Thread] = None
+        self._flush_thread: Optional[threading.Thread] = None
+
+        self._segment_fd: Optional[int] = None
+        self._segment_path: Optional[str] = None
+        self._segment_size = 0
+        self._segment_last_seq = 0
+        self._closed_segments: List[Tuple[str, int, int]] = []   # (path, fd, last seq in it)
+
+    # --------- Lifecycle ---------
+    def start(self) -> None:
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self.recover()
+        self._open_segment()
+        self._journal_thread = threading.Thread(target=self._journal_loop, name="response-journal", daemon=True)
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="response-flusher", daemon=True)
+        self._journal_thread.start()
+        self._flush_thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Journal and commit everything accepted so far, then stop the threads."""
+        self._stopping.set()
+        with self._lock:
+            self._incoming_ready.notify_all()
+        self._journal_thread.join(timeout)
+        self._flush_now.set()
+        self._flush_thread.join(timeout)
+        self._release_segments(final=True)
+
+    def recover(self) -> int:
+        """Replay journal segments no live process holds. Returns rows replayed."""
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, SEGMENT_PATTERN))):
+            if path == self._segment_path:
+                continue
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue   # another worker finished recovering it
+            try:
+                if not _lock_file(fd) or os.fstat(fd).st_nlink == 0:
+                    continue   # a live process is still writing it, or another worker just replayed it
+                rows = _read_segment(fd)
+                for start in range(0, len(rows), self.flush_max_rows):
+                    _commit_rows(rows[start:start + self.flush_max_rows])
+                os.unlink(path)
+                replayed += len(rows)
+                logging.info(f"Replayed {len(rows)} journaled answers from {os.path.basename(path)}")
+            finally:
+                os.close(fd)
+        return replayed
+
+    # --------- Submit path ---------
+    def submit(self, rows: List[Dict[str, Any]]) -> Future:
+        """Queue validated rows; the future resolves once they are journaled."""
+        now = datetime.now(timezone.utc)
+        rows = [row if row.get("submitted_at") else {**row, "submitted_at": now} for row in rows]
+        future: Future = Future()
+        with self._lock:
+            if self._stopping.is_set():
+                raise RuntimeError("Write buffer is stopped")
+            if self._accepted + len(rows) > self.max_rows:
+                raise BufferFull(f"{self._accepted} answers waiting for the database")
+            self._accepted += len(rows)
+            self._incoming.append((rows, future))
+            self._incoming_ready.notify()
+        return future
+
+    def pending_answers(self, survey_id: int, respondent_id: str) -> Dict[int, Any]:
+        """Journaled answers of one respondent that are not in the database yet."""
+        with self._lock:
+            return {qid: answer for qid, (_, answer) in self._unflushed.get((survey_id, respondent_id), {}).items()}
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._accepted
+
+    def rejected_path(self) -> str:
+        return os.path.join(self.journal_dir, REJECTED_FILE)
+
+    def rejected_count(self) -> int:
+        """Rows in the rejected file, which every process sharing the journal directory appends to."""
+        try:
+            with open(self.rejected_path(), "rb") as f:
+                return sum(1 for _ in f)
+        except FileNotFoundError:
+            return 0
+
+    # --------- Journal ---------
+    def _create_segment(self) -> Tuple[int, str]:
+        # Creation time first, so recovery replays segments oldest first
+        name = f"segment-{time.time_ns()}-{socket.gethostname()}-{os.getpid()}.jsonl"
+        path = os.path.join(self.journal_dir, name)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        _lock_file(fd)
+        return fd, path
+
+    def _open_segment(self) -> None:
+        fd, path = self._create_segment()
+        with self._lock:
+            self._segment_fd, self._segment_path, self._segment_size = fd, path, 0
+
+    def _rotate_segment(self) -> None:
+        fd, path = self._create_segment()
+        # Under the lock: the flush thread replaces _closed_segments in _release_segments
+        with self._lock:
+            # Keep the old segment locked until its rows are committed
+            self._closed_segments.append((self._segment_path, self._segment_fd, self._segment_last_seq))
+            self._segment_fd, self._segment_path, self._segment_size = fd, path, 0
+            committed = self._committed_seq
+        # Its rows may all have been committed already, before it was closed
+        self._release_segments(committed_seq=committed)
+
+    def _journal_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._incoming and not self._stopping.is_set():
+                    self._incoming_ready.wait()
+                batch, self._incoming = self._incoming, []
+            if not batch:
+                return   # stopping and drained
+            try:
+                self._journal(batch)
+            except Exception as e:
+                logging.error(f"Response journal write failed: {e}")
+                with self._lock:
+                    self._accepted -= sum(len(rows) for rows, _ in batch)
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def _journal(self, batch: List[Tuple[List[Dict[str, Any]], Future]]) -> None:
+        """One write and one fsync for every submit that arrived meanwhile."""
+        records, lines = [], []
+        seq = self._seq
+        for rows, _ in batch:
+            for row in rows:
+                seq += 1
+                records.append((seq, row))
+                lines.append(_journal_line(seq, row))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        os.write(self._segment_fd, data)
+        if self.fsync:
+            os.fsync(self._segment_fd)
+        self._seq = self._segment_last_seq = seq
+        self._segment_size += len(data)
+
+        with self._lock:
+            for seq, row in records:
+                self._pending.append((seq, row))
+                key = (row["survey_id"], row["respondent_id"])
+                self._unflushed.setdefault(key, {})[row["question_id"]] = (seq, row["answer"])
+            full = len(self._pending) >= self.flush_max_rows
+        metrics_service.inc("response_buffer_pending_rows", len(records))
+        if full:
+            self._flush_now.set()
+        for _, future in batch:
+            future.set_result(None)
+
+        if self._segment_size >= self.segment_bytes:
+            self._rotate_segment()
+
+    # --------- Group commit ---------
+    def _flush_loop(self) -> None:
+        delay = self.flush_interval
+        while True:
+            self._flush_now.wait(delay)
+            self._flush_now.clear()
+            # stop() sets the event once the journal thread has drained, so this is the last pass
+            last_pass = self._stopping.is_set() and not self._journal_thread.is_alive()
+            try:
+                while self._flush_group():
+                    pass
+                delay = self.flush_interval
+            except OperationalError as e:
+                # Database unavailable or locked: keep the rows, back off
+                metrics_service.inc("response_buffer_flush_failures_total", reason="operational")
+                logging.warning(f"Write-behind flush failed, retrying: {e}")
+                delay = min(RETRY_MAX_SECONDS, delay * 2)
+                if last_pass:
+                    logging.error(f"{self.pending_count()} answers left in the journal for replay at next start")
+            if last_pass:
+                return
+
+    def _flush_group(self) -> bool:
+        """Commit up to flush_max_rows pending rows; True if a full group went."""
+        with self._lock:
+            group = list(islice(self._pending, self.flush_max_rows))
+        if not group:
+            return False
+        started = time.perf_counter()
+        try:
+            _commit_rows([row for _, row in group])
+        except OperationalError:
+            raise
+        except Exception as e:
+            # A row the database refuses must not hold up the rest
+            metrics_service.inc("response_buffer_flush_failures_total", reason="rejected")
+            logging.warning(f"Write-behind group of {len(group)} failed ({e}); committing row by row")
+            self._commit_one_by_one(group)
+        metrics_service.observe("response_buffer_flush_seconds", time.perf_counter() - started)
+        metrics_service.observe("response_buffer_flush_rows", len(group))
+        self._mark_committed(group)
+        return len(group) >= self.flush_max_rows
+
+    def _commit_one_by_one(self, group: List[Tuple[int, Dict[str, Any]]]) -> None:
+        for seq, row in group:
+            try:
+                _commit_rows([row])
+            except OperationalError:
+                raise
+            except Exception as e:
+                metrics_service.inc("response_buffer_rejected_total")
+                logging.error(f"Answer rejected by the database, kept in {REJECTED_FILE}: {e}")
+                with open(self.rejected_path(), "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"seq": seq, "row": row, "error": str(e)}, default=str) + "\n")
+
+    def _mark_committed(self, group: List[Tuple[int, Dict[str, Any]]]) -> None:
+        committed = group[-1][0]
+        with self._lock:
+            self._committed_seq = committed
+            for _ in group:
+                self._pending.popleft()
+            self._accepted -= len(group)
+            for _, row in group:
+                key = (row["survey_id"], row["respondent_id"])
+                answers = self._unflushed.get(key)
+                if answers is None:
+                    continue
+                entry = answers.get(row["question_id"])
+                if entry is not None and entry[0] <= committed:
+                    del answers[row["question_id"]]
+                if not answers:
+                    del self._unflushed[key]
+        metrics_service.inc("response_buffer_pending_rows", -len(group))
+        self._release_segments(committed_seq=committed)
+
+    def _release_segments(self, committed_seq: Optional[int] = None, final: bool = False) -> None:
+        """Delete segments whose rows are all committed (on stop, the open one too)."""
+        with self._lock:
+            if final and not self._pending and self._segment_fd is not None:
+                self._closed_segments.append((self._segment_path, self._segment_fd, self._segment_last_seq))
+                self._segment_fd = self._segment_path = None
+                committed_seq = self._seq
+            done = [s for s in self._closed_segments if committed_seq is not None and s[2] <= committed_seq]
+            self._closed_segments = [s for s in self._closed_segments if s not in done]
+        for path, fd, _ in done:
+            os.unlink(path)   # unlink before unlocking, so recovery never replays it
+            os.close(fd)
+        if final:
+            with self._lock:
+                leftover = [(path, fd) for path, fd, _ in self._closed_segments]
+                if self._segment_fd is not None:
+                    leftover.append((self._segment_path, self._segment_fd))
+                self._closed_segments, self._segment_fd, self._segment_path = [], None, None
+            for _, fd in leftover:
+                os.close(fd)   # unlocked: replayed at the next start
+
+_buffer: Optional[WriteBuffer] = None
+
+def enabled() -> bool:
+    return _buffer is not None
+
+def start(write_behind: bool = RESPONSE_WRITE_BEHIND) -> Optional[WriteBuffer]:
+    """Start this process's buffer when write-behind is on; returns it."""
+    global _buffer
+    if not write_behind or _buffer is not None:
+        return _buffer
+    _buffer = WriteBuffer()
+    _buffer.start()
+    logging.info(
+        f"Write-behind responses on: journal {_buffer.journal_dir}, group commit every "
+        f"{_buffer.flush_interval * 1e3:.0f} ms or {_buffer.flush_max_rows} rows"
+    )
+    return _buffer
+
+def stop() -> None:
+    global _buffer
+    if _buffer is not None:
+        _buffer.stop()
+        _buffer = None
+
+def submit(rows: List[Dict[str, Any]]) -> Future:
+    return _buffer.submit(rows)
+
+def pending_answers(survey_id: int, respondent_id: str) -> Dict[int, Any]:
+    return _buffer.pending_answers(survey_id, respondent_id) if _buffer is not None else {}
+
+def status() -> Dict[str, Any]:
+    """What happened to answers acknowledged with 202."""
+    if _buffer is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "pending": _buffer.pending_count(),
+        "rejected": _buffer.rejected_count(),
+        "rejected_file": _buffer.rejected_path(),
+    }
+
+if __name__ == "__main__":
+    # python -m app.services.write_buffer_service --recover   (replay orphaned journal segments)
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    parser = argparse.ArgumentParser(description="Write-behind response journal maintenance")
+    parser.add_argument("--recover", action="store_true", help="Replay segments left by stopped or crashed processes")
+    args = parser.parse_args()
+    if args.recover:
+        print(f"replayed {WriteBuffer().recover()} answers")
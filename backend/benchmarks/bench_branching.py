@@ -0,0 +1,136 @@
+# backend/benchmarks/bench_branching.py
+"""
+Branching-plan benchmark on a synthetic 300-question NSS-style schedule.
+
+    cd backend && python -m benchmarks.bench_branching [--questions 300] [--respondents 200]
+
+Compares resuming the walk from the respondent's cursor (what the session
+state enables) with re-walking from the first question on every step.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from app.models import Question
+from app.services.survey_cache_service import CompiledSurvey
+
+SECTION_SIZE = 20
+ROSTER_BLOCK = 6
+
+def build_schedule(num_questions: int):
+    """Sections gated by a Yes/No screener, nested sub-gates, and a member roster."""
+    questions = []
+
+    def add(qtype, options=None, config=None, text=None):
+        qid = len(questions) + 1
+        questions.append(Question(
+            id=qid,
+            survey_id=1,
+            question_text=text or f"Question {qid}",
+            question_type=qtype,
+            options=options or [],
+            order_index=qid,
+            nss_code=f"Q{qid:03d}",
+            translations={"hi": f"प्रश्न {qid}"},
+            validation_rules={},
+            adaptive_enabled=True,
+            adaptive_config=config or {},
+            voice_enabled=False,
+            audio_metadata={},
+            ai_generated=False,
+            ai_metadata={},
+        ))
+        return f"Q{qid:03d}"
+
+    household_size = add("text", config={}, text="Number of household members")
+    for _ in range(ROSTER_BLOCK):
+        add("text", config={"roster": {"source": household_size, "max": 12}})
+
+    while len(questions) < num_questions:
+        section_end = min(len(questions) + SECTION_SIZE, num_questions)
+        screener_position = len(questions) + 1
+        end_ref = f"Q{section_end + 1:03d}" if section_end < num_questions else "end"
+        screener = add("radio", ["Yes", "No"], {
+            "skip_to": [{"when": {"question": f"Q{screener_position:03d}", "op": "eq", "value": "No"}, "target": end_ref}],
+        })
+        gate = None
+        while len(questions) < section_end:
+            offset = len(questions) - screener_position
+            if offset % 5 == 0:
+                # Sub-gate: following questions depend on it and on the screener
+                gate = add("radio", ["A", "B", "C"], {
+                    "show_if": {"question": screener, "op": "eq", "value": "Yes"},
+                })
+            elif gate:
+                add("radio", ["1", "2", "3"], {
+                    "show_if": {"all": [
+                        {"question": gate, "op": "in", "value": ["A", "B"]},
+                        {"any": [
+                            {"question": household_size, "op": "gte", "value": 3},
+                            {"question": screener, "op": "answered"},
+                        ]},
+                    ]},
+                })
+            else:
+                add("text")
+    return questions[:num_questions]
+
+def answer_for(question, roster_member, rng):
+    if question.question_type == "radio":
+        return rng.choice(question.options)
+    if question.nss_code == "Q001":
+        return rng.randint(1, 10)
+    return str(rng.randint(0, 100))
+
+def walk(compiled, questions_by_id, rng, resume: bool):
+    """Simulate one respondent; returns per-step latencies in microseconds."""
+    answers, cursor, timings = {}, 0, []
+    while True:
+        start = time.perf_counter()
+        step = compiled.next_step(answers, cursor if resume else 0)
+        timings.append((time.perf_counter() - start) * 1e6)
+        if step is None:
+            return timings
+        question = questions_by_id[step.question_id]
+        value = answer_for(question, step.roster_member, rng)
+        if step.roster_member is not None:
+            answers[step.question_id] = list(answers.get(step.question_id) or []) + [value]
+        else:
+            answers[step.question_id] = value
+        cursor = step.cursor
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--respondents", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    questions = build_schedule(args.questions)
+    start = time.perf_counter()
+    compiled = CompiledSurvey(1, 1, "published", questions)
+    compile_ms = (time.perf_counter() - start) * 1e3
+    questions_by_id = {q.id: q for q in questions}
+    print(f"schedule: {len(questions)} questions, compiled in {compile_ms:.2f} ms")
+
+    for label, resume in (("cursor resume", True), ("re-walk from start", False)):
+        rng = random.Random(args.seed)
+        timings, steps = [], []
+        for _ in range(args.respondents):
+            per_respondent = walk(compiled, questions_by_id, rng, resume)
+            timings.extend(per_respondent)
+            steps.append(len(per_respondent))
+        print(
+            f"{label:>20}: {len(timings)} steps, mean {statistics.mean(timings):7.2f} us, "
+            f"p95 {percentile(timings, 95):7.2f} us, p99 {percentile(timings, 99):7.2f} us, "
+            f"avg path {statistics.mean(steps):.0f} steps"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# backend/benchmarks/bench_cold_start.py
+"""
+Cold-start benchmark: how long a new worker takes before it can serve.
+
+    cd backend && python -m benchmarks.bench_cold_start [--runs 5] [--workers 4]
+
+1. `import app.main` in a fresh interpreter, with the voice/LLM packages
+   left to first use versus imported up front (what every worker paid before).
+2. A single uvicorn process from spawn to the first /healthz answer, with
+   DB_SCHEMA=create (DDL at startup) versus skip.
+3. The gunicorn profile (gunicorn.conf.py): spawn to first /healthz, and
+   fork-to-ready of each worker forked from the preloaded master, which
+   is what a worker added during a spike pays instead of part 2.
+
+Runs against a throwaway SQLite database; needs gunicorn and uvicorn-worker
+installed for part 3. More than one gunicorn worker needs a shared
+respondent state store, so part 3 uses --workers only when
+RESPONDENT_STATE_URL is set to one, and a single worker otherwise.
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app.main
+if {eager}:
+    app.main.preload_heavy_modules()
+print(time.perf_counter() - start)
+"""
+
+def _env(db_path: str, **extra: str) -> dict:
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URL=f"sqlite:///{db_path}", **extra)
+    env.setdefault("OPENAI_API_KEY", "bench")
+    return env
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_healthy(port: int, process: subprocess.Popen, deadline: float = 60.0) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/healthz", timeout=0.5).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError("server did not become healthy")
+
+def _stop(process: subprocess.Popen) -> str:
+    process.terminate()
+    try:
+        output, _ = process.communicate(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        output, _ = process.communicate()
+    return output or ""
+
+def import_time(db_path: str, eager: bool) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(eager=eager)],
+        cwd=BACKEND_DIR, env=_env(db_path), capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+def uvicorn_time(db_path: str, schema: str) -> float:
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(db_path, DB_SCHEMA=schema),
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    try:
+        return _wait_healthy(port, process)
+    finally:
+        _stop(process)
+
+def gunicorn_times(db_path: str, workers: int):
+    """(spawn to first /healthz, per-worker fork-to-ready times) in seconds."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        cwd=BACKEND_DIR,
+        env=_env(db_path, PORT=str(port), WEB_CONCURRENCY=str(workers)),
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    try:
+        healthy = _wait_healthy(port, process)
+        time.sleep(1.0 + 0.5 * workers)   # let every worker finish booting
+    finally:
+        output = _stop(process)
+    ready = [float(ms) / 1e3 for ms in re.findall(r"Worker \d+ ready in (\d+) ms", output)]
+    return healthy, ready
+
+def _ms(values) -> str:
+    return f"median {statistics.median(values) * 1e3:7.0f} ms, max {max(values) * 1e3:7.0f} ms"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+
+        for label, eager in (("import, lazy voice/LLM", False), ("import, eager voice/LLM", True)):
+            print(f"{label:>26}: {_ms([import_time(db_path, eager) for _ in range(args.runs)])}")
+
+        for schema in ("create", "skip"):
+            times = [uvicorn_time(db_path, schema) for _ in range(args.runs)]
+            print(f"{'uvicorn, DB_SCHEMA=' + schema:>26}: {_ms(times)} to first /healthz")
+
+        try:
+            import gunicorn, uvicorn_worker   # noqa: F401
+        except ImportError:
+            print("gunicorn profile skipped: pip install gunicorn uvicorn-worker")
+            return
+        workers = args.workers if os.getenv("RESPONDENT_STATE_URL", "memory://").startswith(("redis://", "rediss://", "unix://")) else 1
+        healthy, ready = gunicorn_times(db_path, workers)
+        print(f"{'gunicorn, preloaded':>26}: first /healthz {healthy * 1e3:5.0f} ms, worker fork-to-ready {_ms(ready)}")
+
+if __name__ == "__main__":
+    main()
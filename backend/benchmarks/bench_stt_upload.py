@@ -0,0 +1,113 @@
+# backend/benchmarks/bench_stt_upload.py
+"""
+Concurrent speech-to-text uploads against the ASGI app, measuring how long
+the event loop stalls while they are processed.
+
+    cd backend && python -m benchmarks.bench_stt_upload [--uploads 50] [--seconds 3] [--latency 0.2]
+
+Recognition uses a local stand-in backend that sleeps for --latency seconds
+(what a network recognizer costs) and needs no network. "inline" replays
+the old route body (read, temp file, recognize on the loop thread) for
+comparison with the current /api/voice/speech-to-text.
+"""
+
+import argparse
+import asyncio
+import io
+import math
+import os
+import struct
+import tempfile
+import time
+import wave
+
+import httpx
+from fastapi import File, Form, UploadFile
+
+from app.main import app
+from app.services import stt_service
+
+RECOGNIZER_LATENCY = 0.2
+
+def slow_recognizer(recognizer, audio_data, language):
+    time.sleep(RECOGNIZER_LATENCY)
+    return f"{len(audio_data.frame_data)} bytes"
+
+def make_wav(seconds: float, rate: int = 16000) -> bytes:
+    frames = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / rate))) for i in range(int(seconds * rate))
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+@app.post("/bench/speech-to-text-inline")
+async def inline_speech_to_text(audio_file: UploadFile = File(...), language: str = Form("en")):
+    # Previous implementation, kept here only as the baseline
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+        tmp.write(await audio_file.read())
+        temp_path = tmp.name
+    try:
+        return stt_service.transcribe_sync(temp_path, language)
+    finally:
+        os.remove(temp_path)
+
+async def measure(path: str, wav: bytes, uploads: int):
+    """(upload latencies, loop stalls) in seconds for `uploads` concurrent requests."""
+    stalls = []
+    done = asyncio.Event()
+
+    async def probe():
+        interval = 0.005
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            stalls.append(max(0.0, time.perf_counter() - start - interval))
+
+    async def upload(client):
+        start = time.perf_counter()
+        response = await client.post(path, files={"audio_file": ("a.wav", wav, "audio/wav")}, data={"language": "en"})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(upload(client) for _ in range(uploads)))
+        wall = time.perf_counter() - start
+        done.set()
+        await prober
+    return latencies, stalls, wall
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    global RECOGNIZER_LATENCY
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=3.0, help="Audio length per upload")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated recognizer latency")
+    args = parser.parse_args()
+    RECOGNIZER_LATENCY = args.latency
+    stt_service.set_backend(slow_recognizer)
+
+    wav = make_wav(args.seconds)
+    print(f"{args.uploads} concurrent uploads of {len(wav) / 1024:.0f} KiB, recognizer {args.latency * 1000:.0f} ms, "
+          f"{stt_service.STT_WORKERS} STT workers")
+    for label, path in (("inline (old)", "/bench/speech-to-text-inline"), ("stt pool", "/api/voice/speech-to-text")):
+        latencies, stalls, wall = asyncio.run(measure(path, wav, args.uploads))
+        print(
+            f"{label:>13}: wall {wall:6.2f} s, upload p50 {percentile(latencies, 50) * 1000:7.1f} ms, "
+            f"p95 {percentile(latencies, 95) * 1000:7.1f} ms | loop stall max {max(stalls) * 1000:7.1f} ms, "
+            f"p99 {percentile(stalls, 99) * 1000:7.1f} ms, total {sum(stalls):6.2f} s"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# backend/benchmarks/bench_validation.py
+"""
+Answer-validation micro-benchmark on a synthetic NSS-style questionnaire.
+
+    cd backend && python -m benchmarks.bench_validation [--questions 300] [--answers 100000]
+
+Compares validate_answer (rules re-derived from the Question on every call)
+with the ValidationPlan cached on the compiled survey, one answer at a time
+and through the batch API.
+"""
+
+import argparse
+import random
+import time
+
+from app.models import Question
+from app.services.survey_cache_service import CompiledSurvey
+from app.services.validation_service import AnswerCheck, validate_answer
+
+LANGUAGES = ("en", "hi", "ta")
+
+def build_questions(num_questions: int):
+    """Radio/checkbox questions with Hindi and Tamil labels, plus numeric and pattern-checked text."""
+    questions = []
+    for qid in range(1, num_questions + 1):
+        kind = qid % 4
+        options = [f"Option {i}" for i in range(8)] if kind in (0, 1) else []
+        rules = {}
+        if kind == 2:
+            rules = {"numeric_only": True, "min": 0, "max": 120}
+        elif kind == 3:
+            rules = {"pattern": r"[A-Z]{2}\d{4}"}
+        questions.append(Question(
+            id=qid,
+            survey_id=1,
+            question_text=f"Question {qid}",
+            question_type=("radio", "checkbox", "text", "text")[kind],
+            options=options,
+            order_index=qid,
+            translations={
+                "hi": {"text": f"प्रश्न {qid}", "options": [f"विकल्प {i}" for i in range(len(options))]},
+                "ta": {"text": f"கேள்வி {qid}", "options": [f"தேர்வு {i}" for i in range(len(options))]},
+            },
+            validation_rules=rules,
+            is_mandatory=qid % 3 == 0,
+            adaptive_enabled=False,
+            adaptive_config={},
+            voice_enabled=False,
+            audio_metadata={},
+            ai_generated=False,
+            ai_metadata={},
+        ))
+    return questions
+
+def answer_for(question, language, rng):
+    labels = question.translations[language]["options"] if language != "en" else question.options
+    if question.question_type == "radio":
+        return rng.choice(labels + ["Not an option"])
+    if question.question_type == "checkbox":
+        return rng.sample(labels, rng.randint(1, 3))
+    if question.validation_rules.get("numeric_only"):
+        return str(rng.randint(0, 150))
+    return rng.choice(["AB1234", "ab12", ""])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--answers", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    questions = build_questions(args.questions)
+    start = time.perf_counter()
+    compiled = CompiledSurvey(1, 1, "published", questions)
+    compile_ms = (time.perf_counter() - start) * 1e3
+    print(f"survey: {len(questions)} questions, compiled in {compile_ms:.2f} ms")
+
+    rng = random.Random(args.seed)
+    checks = []
+    for _ in range(args.answers):
+        question = rng.choice(questions)
+        language = rng.choice(LANGUAGES)
+        checks.append(AnswerCheck(question.id, answer_for(question, language, rng), language))
+    by_id = {q.id: q for q in questions}
+    plans = compiled.validation_plans
+
+    start = time.perf_counter()
+    baseline = [validate_answer(by_id[c.question_id], c.answer, c.language, c.audio_file_uri, c.ai_context) for c in checks]
+    per_call = time.perf_counter() - start
+
+    start = time.perf_counter()
+    planned = [plans[c.question_id].validate(c.answer, c.language, c.audio_file_uri, c.ai_context) for c in checks]
+    cached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = compiled.validate(checks)
+    batch = time.perf_counter() - start
+
+    assert baseline == planned == batched, "plans disagree with validate_answer"
+    for label, elapsed in (("validate_answer", per_call), ("cached plan", cached), ("batch API", batch)):
+        print(
+            f"{label:>16}: {elapsed * 1e3:8.1f} ms, {elapsed / len(checks) * 1e6:6.2f} us/answer, "
+            f"{per_call / elapsed:5.1f}x"
+        )
+    invalid = sum(1 for status, _ in batched if status != "valid")
+    print(f"{len(checks)} answers, {invalid} not valid")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# backend/benchmarks/fake_openai_server.py
+"""
+Local OpenAI-compatible chat completions server for exercising llm_service
+without network access or API keys.
+
+    cd backend && FAKE_OPENAI_DELAYS="gpt-4o-mini=8,gpt-4.1-nano=0.5" \
+        uvicorn benchmarks.fake_openai_server:app --port 8001
+
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+
+FAKE_OPENAI_DELAYS sets the seconds each model waits before answering (so
+hedging can be observed), FAKE_OPENAI_FAIL lists models that answer 500, and
+FAKE_OPENAI_CHUNK_DELAY spaces out streamed chunks.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+def _parse_delays(raw: str) -> dict:
+    delays = {}
+    for item in filter(None, raw.split(",")):
+        model, _, seconds = item.partition("=")
+        delays[model.strip()] = float(seconds or 0)
+    return delays
+
+DELAYS = _parse_delays(os.getenv("FAKE_OPENAI_DELAYS", ""))
+FAILING = set(filter(None, os.getenv("FAKE_OPENAI_FAIL", "").split(",")))
+CHUNK_DELAY = float(os.getenv("FAKE_OPENAI_CHUNK_DELAY", "0.05"))
+
+app = FastAPI(title="Fake OpenAI")
+
+def _questions(prompt: str, count: int, model: str) -> list:
+    topic = prompt.split("\n", 1)[0].removeprefix("Topic: ")
+    questions = []
+    for i in range(count):
+        if i % 2:
+            questions.append({"text": f"[{model}] {topic}: option question {i + 1}?", "type": "radio", "options": ["Yes", "No"]})
+        else:
+            questions.append({"text": f"[{model}] {topic}: open question {i + 1}?", "type": "text"})
+    return questions
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+def _chunk(model: str, completion_id: str, content: str, finish_reason=None) -> str:
+    body = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": content} if content else {}, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(body)}\n\n"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "")
+    prompt = body["messages"][-1]["content"]
+    match = re.search(r"Generate (\d+)", prompt)
+    content = json.dumps(_questions(prompt, int(match.group(1)) if match else 5, model), indent=1)
+
+    await asyncio.sleep(DELAYS.get(model, 0))
+    if model in FAILING:
+        return JSONResponse({"error": {"message": f"{model} unavailable", "type": "server_error"}}, status_code=500)
+    if not body.get("stream"):
+        return _completion(model, content)
+
+    async def events():
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        # Split per line so question objects arrive across several chunks
+        for line in content.splitlines(keepends=True):
+            yield _chunk(model, completion_id, line)
+            await asyncio.sleep(CHUNK_DELAY)
+        yield _chunk(model, completion_id, "", finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
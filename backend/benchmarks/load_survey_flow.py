@@ -0,0 +1,274 @@
+# backend/benchmarks/load_survey_flow.py
+"""
+End-to-end load test of the survey-taking hot path.
+
+    cd backend && python -m benchmarks.load_survey_flow [--respondents 200] [--concurrency 50] [--questions 120]
+    cd backend && python -m benchmarks.load_survey_flow --url http://127.0.0.1:10000   # against a running server
+
+Seeds a synthetic NSS-style survey (bench_branching's schedule: Yes/No
+screeners, nested gates and a household roster), publishes it, then has
+--concurrency respondents at a time walk the adaptive flow over HTTP:
+GET /api/surveys/{id}/adaptive, POST /api/responses/responses/submit with
+an answer, until the survey reports completion. Without --url the app runs
+in-process (httpx ASGITransport) on a throwaway SQLite file, so runs are
+reproducible with no server or network.
+
+Reports p50/p95/p99 latency per endpoint and overall throughput. --save
+writes the numbers as JSON; --baseline compares against such a file and
+exits 1 when p95 or throughput regressed by more than --max-regression.
+--write-behind runs the in-process app with RESPONSE_WRITE_BEHIND on
+(journal in the temporary directory), to compare group commit against a
+transaction per submit. --micro also times get_next_adaptive_question and
+the cached validation plans in-process (see bench_branching and bench_validation for the
+isolated micro benchmarks).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import httpx
+
+ENDPOINTS = ("adaptive", "submit")
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def question_payload(question) -> Dict[str, Any]:
+    return {
+        "question_text": question.question_text,
+        "question_type": question.question_type,
+        "options": question.options,
+        "order_index": question.order_index,
+        "nss_code": question.nss_code,
+        "translations": question.translations,
+        "validation_rules": question.validation_rules,
+        "adaptive_enabled": question.adaptive_enabled,
+        "adaptive_config": question.adaptive_config,
+        "voice_enabled": False,
+        "ai_generated": False,
+    }
+
+async def seed_survey(client: httpx.AsyncClient, num_questions: int):
+    """Create and publish the synthetic survey; returns (survey_id, {question_id: template question})."""
+    from benchmarks.bench_branching import build_schedule
+
+    questions = build_schedule(num_questions)
+    response = await client.post("/api/surveys/", json={"title": f"Load test ({num_questions} questions)", "survey_type": "custom"})
+    response.raise_for_status()
+    survey_id = response.json()["id"]
+    response = await client.post(f"/api/surveys/{survey_id}/questions/bulk", json={"questions": [question_payload(q) for q in questions]})
+    response.raise_for_status()
+    question_ids = response.json()["question_ids"]
+    response = await client.post(f"/api/surveys/{survey_id}/publish")
+    response.raise_for_status()
+    return survey_id, dict(zip(question_ids, questions))
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.completed = 0
+        self.answers: List[Dict[str, Any]] = []
+
+    async def timed(self, name: str, request):
+        start = time.perf_counter()
+        response = await request
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+async def walk(client, recorder: Recorder, survey_id: int, templates, respondent_id: str, language: str, think: float, rng):
+    """One respondent through the adaptive flow; answers like bench_branching.walk."""
+    from benchmarks.bench_branching import answer_for
+
+    answers: Dict[int, Any] = {}
+    while True:
+        response = await recorder.timed("adaptive", client.get(
+            f"/api/surveys/{survey_id}/adaptive", params={"respondent_id": respondent_id, "language": language},
+        ))
+        if response.status_code >= 400:
+            return
+        step = response.json()
+        if step.get("completed"):
+            recorder.completed += 1
+            return
+        question_id = step["question_id"]
+        value = answer_for(templates[question_id], step.get("roster_member"), rng)
+        if step.get("roster_member") is not None:
+            answer = list(answers.get(question_id) or []) + [value]
+        else:
+            answer = value
+        answers[question_id] = answer
+        row = {"survey_id": survey_id, "question_id": question_id, "respondent_id": respondent_id, "answer": answer, "language": language}
+        recorder.answers.append(row)
+        response = await recorder.timed("submit", client.post("/api/responses/responses/submit", json=row))
+        if response.status_code >= 400:
+            return
+        if think:
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+
+async def run_load(client, survey_id: int, templates, args) -> Dict[str, Any]:
+    recorder = Recorder()
+    pending = asyncio.Queue()
+    for i in range(args.respondents):
+        pending.put_nowait(f"load-{survey_id}-{i}")
+
+    async def respondent_worker(seed: int):
+        rng = random.Random(seed)
+        while not pending.empty():
+            respondent_id = pending.get_nowait()
+            language = "hi" if rng.random() < args.hindi_share else "en"
+            await walk(client, recorder, survey_id, templates, respondent_id, language, args.think, rng)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(respondent_worker(args.seed + i) for i in range(args.concurrency)))
+    wall = time.perf_counter() - start
+
+    report: Dict[str, Any] = {"wall_seconds": wall, "respondents_completed": recorder.completed}
+    total = 0
+    for name in ENDPOINTS:
+        values = recorder.latencies.get(name, [])
+        total += len(values)
+        if values:
+            report[name] = {
+                "count": len(values),
+                "errors": recorder.errors.get(name, 0),
+                "mean_ms": statistics.mean(values) * 1e3,
+                "p50_ms": percentile(values, 50) * 1e3,
+                "p95_ms": percentile(values, 95) * 1e3,
+                "p99_ms": percentile(values, 99) * 1e3,
+            }
+    report["throughput_rps"] = total / wall if wall else 0.0
+    report["answers_per_second"] = len(recorder.answers) / wall if wall else 0.0
+    report["_answers"] = recorder.answers
+    return report
+
+def run_micro(survey_id: int, answers: List[Dict[str, Any]], calls: int) -> None:
+    """In-process timings of the functions behind the two endpoints."""
+    from app.database import SessionLocal
+    from app.services import analytics_service, survey_cache_service
+    from app.services.validation_service import AnswerCheck
+
+    with SessionLocal() as db:
+        timings = []
+        for i in range(calls):
+            respondent_id = f"micro-{i % 200}"   # first call per respondent is cold, later ones hit the state cache
+            start = time.perf_counter()
+            analytics_service.get_next_adaptive_question(survey_id, respondent_id, "en", db)
+            timings.append(time.perf_counter() - start)
+        print(
+            f"{'get_next_adaptive_question':>28}: {calls} calls, mean {statistics.mean(timings) * 1e6:8.1f} us, "
+            f"p95 {percentile(timings, 95) * 1e6:8.1f} us, p99 {percentile(timings, 99) * 1e6:8.1f} us"
+        )
+        compiled = survey_cache_service.get_compiled_survey(db, survey_id)
+
+    checks = [AnswerCheck(row["question_id"], row["answer"], row["language"]) for row in answers]
+    if checks:
+        start = time.perf_counter()
+        compiled.validate(checks)
+        elapsed = time.perf_counter() - start
+        print(f"{'validation plans (batch)':>28}: {len(checks)} answers, {elapsed / len(checks) * 1e6:8.2f} us/answer")
+
+def print_report(report: Dict[str, Any]) -> None:
+    for name in ENDPOINTS:
+        stats = report.get(name)
+        if not stats:
+            continue
+        print(
+            f"{name:>10}: {stats['count']:7d} requests, {stats['errors']} errors | mean {stats['mean_ms']:7.2f} ms, "
+            f"p50 {stats['p50_ms']:7.2f} ms, p95 {stats['p95_ms']:7.2f} ms, p99 {stats['p99_ms']:7.2f} ms"
+        )
+    print(
+        f"{report['respondents_completed']} respondents completed in {report['wall_seconds']:.2f} s: "
+        f"{report['throughput_rps']:.0f} requests/s, {report['answers_per_second']:.0f} answers/s"
+    )
+
+def regressions(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    found = []
+    for name in ENDPOINTS:
+        if name in report and name in baseline:
+            now, before = report[name]["p95_ms"], baseline[name]["p95_ms"]
+            if now > before * (1 + tolerance):
+                found.append(f"{name} p95 {now:.2f} ms vs baseline {before:.2f} ms")
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        found.append(f"throughput {report['throughput_rps']:.0f}/s vs baseline {baseline['throughput_rps']:.0f}/s")
+    return found
+
+async def run(args) -> Dict[str, Any]:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from app.main import create_app, prepare_database
+        from app.services import write_buffer_service
+
+        prepare_database("create")
+        write_buffer_service.start()   # no-op unless --write-behind
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(schema="skip")), base_url="http://load", timeout=60)
+    async with client:
+        survey_id, templates = await seed_survey(client, args.questions)
+        print(f"survey {survey_id}: {len(templates)} questions, {args.respondents} respondents, concurrency {args.concurrency}"
+              + (f", think {args.think * 1e3:.0f} ms" if args.think else "") + (f", {args.url}" if args.url else ", in-process")
+              + (", write-behind" if args.write_behind else ""))
+        report = await run_load(client, survey_id, templates, args)
+    if args.write_behind:
+        started = time.perf_counter()
+        write_buffer_service.stop()
+        print(f"write-behind drain at shutdown: {(time.perf_counter() - started) * 1e3:.0f} ms")
+    report["survey_id"] = survey_id
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server; default runs the app in-process")
+    parser.add_argument("--db", help="SQLite file for the in-process app (default: a temporary file)")
+    parser.add_argument("--questions", type=int, default=120)
+    parser.add_argument("--respondents", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--think", type=float, default=0.0, help="Mean seconds a respondent pauses between answers")
+    parser.add_argument("--hindi-share", type=float, default=0.3, help="Share of respondents answering in Hindi")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--write-behind", action="store_true", help="In-process app with write-behind responses")
+    parser.add_argument("--micro", action="store_true", help="Also time the hot-path functions in-process")
+    parser.add_argument("--save", help="Write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95/throughput regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.url:
+            # Before any app import: the engine reads the URL when app.database loads
+            os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{args.db or os.path.join(tmp, 'load.db')}"
+            os.environ.setdefault("OPENAI_API_KEY", "load-test")
+            if args.write_behind:
+                os.environ["RESPONSE_WRITE_BEHIND"] = "1"
+                os.environ["RESPONSE_JOURNAL_DIR"] = os.path.join(tmp, "journal")
+        report = asyncio.run(run(args))
+        answers = report.pop("_answers")
+        print_report(report)
+        if args.micro and not args.url:
+            run_micro(report["survey_id"], answers, calls=2000)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.max_regression)
+        for line in found:
+            print(f"REGRESSION: {line}")
+        if found:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# backend/gunicorn.conf.py
+"""
+Multi-worker production profile:
+
+    cd backend && gunicorn -c gunicorn.conf.py
+
+The master imports the app once (preload) and prepares the schema once
+(DB_SCHEMA, see app.main.prepare_database); workers are forked from it and
+only open their own connection pools, so a worker added during a spike is
+serving in milliseconds instead of re-importing and re-running DDL.
+
+Respondent session state lives in each worker's memory unless
+RESPONDENT_STATE_URL points at a shared store, and a worker that did not
+take a submit would serve stale adaptive steps and progress. So the
+default is one worker per CPU with a shared store and a single worker
+without one, and the master refuses to start more than one worker on the
+memory store.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+
+from app.services.session_state_service import state_store_is_shared
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv("WEB_CONCURRENCY") or (multiprocessing.cpu_count() if state_store_is_shared() else 1))
+worker_class = "uvicorn_worker.UvicornWorker"
+wsgi_app = "app.main:create_app(schema='skip')"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+def on_starting(server):
+    from app.main import DB_SCHEMA, preload_heavy_modules, prepare_database
+
+    if server.cfg.workers > 1 and not state_store_is_shared():
+        raise RuntimeError(
+            f"{server.cfg.workers} workers need a shared respondent state store: "
+            "set RESPONDENT_STATE_URL=redis://host:6379/0, or WEB_CONCURRENCY=1"
+        )
+    started = time.perf_counter()
+    prepare_database(DB_SCHEMA)
+    preload_heavy_modules()
+    logging.info(f"Master ready in {(time.perf_counter() - started) * 1e3:.0f} ms (schema: {DB_SCHEMA})")
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+    from app.main import reset_after_fork
+    reset_after_fork()
+
+def post_worker_init(worker):
+    # Fork to ready to accept: the cold start an autoscaled worker pays
+    worker.log.info(f"Worker {worker.pid} ready in {(time.perf_counter() - worker.forked_at) * 1e3:.0f} ms")
@@ -0,0 +1,26 @@
+# backend/tests/conftest.py
+"""
+Shared fixtures. The app reads SQLALCHEMY_DATABASE_URL when app.database is
+first imported, so the throwaway SQLite file is set up before any app import.
+
+    cd backend && python -m pytest -q
+"""
+
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="survey-tests-")
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+
+from app.database import SessionLocal
+from app.main import prepare_database
+
+prepare_database("create")
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
@@ -0,0 +1,28 @@
+# backend/tests/test_aggregates.py
+
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.models import Question, Survey, SurveyQuestionAggregate
+from app.services import aggregate_service, response_service
+
+def test_day_bucket_matches_rebuild(db):
+    survey = Survey(title="Aggregates")
+    survey.questions = [Question(question_text="Own a phone?", question_type="radio", options=["Yes", "No"], order_index=1)]
+    db.add(survey)
+    db.commit()
+    question_id = survey.questions[0].id
+
+    # Imported rows keep their own created_at; the day bucket must follow it, not the clock
+    response_service.upsert_responses(db, [{
+        "survey_id": survey.id, "question_id": question_id, "respondent_id": "r1", "answer": "Yes",
+        "language": "en", "validation_status": "valid", "created_at": datetime(2024, 3, 1, 23, 30, tzinfo=timezone.utc),
+    }])
+    db.commit()
+    days = db.execute(
+        select(SurveyQuestionAggregate.bucket)
+        .where(SurveyQuestionAggregate.survey_id == survey.id, SurveyQuestionAggregate.dimension == "day")
+    ).scalars().all()
+    assert days == ["2024-03-01"]
+    assert aggregate_service.rebuild_survey_aggregates(db, survey.id)["drifted_buckets"] == 0
@@ -0,0 +1,60 @@
+# backend/tests/test_analytics.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.models import Question, Survey
+from app.services import response_service
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(create_app(schema="skip"))
+
+@pytest.fixture
+def survey_id(db):
+    survey = Survey(title="Analytics")
+    survey.questions = [
+        Question(question_text="Own a phone?", question_type="radio", options=["Yes", "No"], order_index=1),
+        Question(question_text="Which apps?", question_type="checkbox", options=["Maps", "Mail", "Chat"], order_index=2),
+        Question(question_text="Household size", question_type="text", validation_rules={"numeric_only": True}, order_index=3),
+    ]
+    db.add(survey)
+    db.commit()
+    radio, checkbox, number = (q.id for q in survey.questions)
+    rows = []
+    for i in range(12):
+        common = {"survey_id": survey.id, "respondent_id": f"r{i}", "language": "hi" if i % 3 else "en",
+                  "validation_status": "valid", "voice_enabled": i % 2 == 0}
+        rows.append({**common, "question_id": radio, "answer": "Yes" if i % 2 else "No"})
+        if i % 4:
+            rows.append({**common, "question_id": checkbox, "answer": ["Maps", "Chat"] if i % 2 else ["Mail"]})
+        if i % 3:
+            rows.append({**common, "question_id": number, "answer": i})
+    response_service.upsert_responses(db, rows)
+    db.commit()
+    return survey.id
+
+def _shape(report):
+    """Field names of a report, leaving out data-keyed maps (languages, option counts, ...)."""
+    return (
+        set(report),
+        set(report["completion"]),
+        [set(question) for question in report["questions"]],
+        [set(question.get("numeric", {})) for question in report["questions"]],
+    )
+
+def test_unfiltered_and_filtered_reports_have_the_same_schema(client, survey_id):
+    unfiltered = client.get(f"/api/analytics/survey/{survey_id}").json()
+    filtered = client.get(f"/api/analytics/survey/{survey_id}", params={"language": "hi"}).json()
+    assert unfiltered["source"] == "aggregates"
+    assert filtered["source"] == "live"
+    assert _shape(unfiltered) == _shape(filtered)
+
+def test_aggregate_report_matches_live_report(client, survey_id):
+    stored = client.get(f"/api/analytics/survey/{survey_id}").json()
+    live = client.get(f"/api/analytics/survey/{survey_id}", params={"live": True}).json()
+    assert stored.pop("source") == "aggregates"
+    assert live.pop("source") == "live"
+    assert stored == live
+    assert stored["completion"]["respondents_completed"] == 6
@@ -0,0 +1,94 @@
+# backend/tests/test_audio_uploads.py
+
+import asyncio
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.main import create_app
+from app.models import Question, Response, Survey
+from app.services import audio_upload_service
+
+RECORDING = b"RIFF" + bytes(range(256)) * 8
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(create_app(schema="skip"))
+
+@pytest.fixture(autouse=True)
+def audio_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_upload_service, "AUDIO_STORE_DIR", str(tmp_path))
+
+@pytest.fixture
+def question(db):
+    survey = Survey(title="Recorded answers")
+    survey.questions = [Question(question_text="Describe your village", question_type="text", voice_enabled=True, order_index=1)]
+    db.add(survey)
+    db.commit()
+    return survey.questions[0]
+
+def _upload(client, question, respondent_id):
+    base = "/api/responses/responses/audio-uploads"
+    created = client.post(base, json={
+        "survey_id": question.survey_id, "question_id": question.id, "respondent_id": respondent_id,
+        "content_type": "audio/ogg", "total_bytes": len(RECORDING),
+    }).json()
+    upload_id = created["upload_id"]
+    half = len(RECORDING) // 2
+    assert client.put(f"{base}/{upload_id}", params={"offset": 0}, content=RECORDING[:half]).json()["offset"] == half
+    assert client.put(f"{base}/{upload_id}", params={"offset": half}, content=RECORDING[half:]).json()["offset"] == len(RECORDING)
+    finalized = client.post(f"{base}/{upload_id}/finalize", json={"sha256": hashlib.sha256(RECORDING).hexdigest()})
+    assert finalized.status_code == 200
+    return finalized.json()
+
+def _submit(client, question, respondent_id, answer):
+    reply = client.post("/api/responses/responses/submit", json={
+        "survey_id": question.survey_id, "question_id": question.id, "respondent_id": respondent_id,
+        "answer": answer, "voice_enabled": True,
+    })
+    assert reply.status_code == 200
+    return reply.json()
+
+def _stored(db, question, respondent_id):
+    db.expire_all()
+    return db.execute(
+        select(Response).where(Response.question_id == question.id, Response.respondent_id == respondent_id)
+    ).scalar_one()
+
+def test_submit_links_a_recording_finalized_first(client, db, question):
+    upload = _upload(client, question, "r1")
+    assert upload["linked"] is False
+
+    submitted = _submit(client, question, "r1", "Near the river")
+    assert submitted["audio_file_uri"] == upload["uri"]
+    assert submitted["validation_status"] == "valid"
+
+    # A re-submit without audio (e.g. an edited transcript) keeps the recording
+    _submit(client, question, "r1", "Near the big river")
+    stored = _stored(db, question, "r1")
+    assert stored.answer == "Near the big river"
+    assert stored.audio_file_uri == upload["uri"]
+    assert stored.audio_metadata["upload_id"] == upload["upload_id"]
+
+def test_finalize_revalidates_an_answer_submitted_first(client, db, question):
+    assert _submit(client, question, "r2", "Near the hills")["validation_status"] != "valid"
+
+    upload = _upload(client, question, "r2")
+    assert upload["linked"] is True
+    stored = _stored(db, question, "r2")
+    assert stored.audio_file_uri == upload["uri"]
+    assert stored.validation_status == "valid"
+    assert stored.answer == "Near the hills"
+
+def test_append_locks_are_dropped_after_each_append(db, question):
+    async def chunks():
+        yield RECORDING
+
+    upload = audio_upload_service.create_upload(
+        db, question.survey_id, question.id, "r3", "audio/ogg", len(RECORDING),
+    )
+    assert asyncio.run(audio_upload_service.append_chunk(upload, 0, chunks())) == len(RECORDING)
+    assert audio_upload_service._append_locks == {}
+    db.rollback()
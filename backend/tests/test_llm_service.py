@@ -0,0 +1,102 @@
+# backend/tests/test_llm_service.py
+"""Hedging, deadlines and SSE streaming against benchmarks.fake_openai_server."""
+
+import asyncio
+import logging
+import socket
+import threading
+import time
+import uuid
+
+import pytest
+import uvicorn
+
+from app.services import llm_service
+from benchmarks import fake_openai_server
+
+PRIMARY, FALLBACK = llm_service.PRIMARY_MODEL, llm_service.FALLBACK_MODEL
+
+@pytest.fixture(scope="module")
+def fake_openai_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(fake_openai_server.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join(5)
+
+@pytest.fixture
+def fake_openai(fake_openai_url, monkeypatch):
+    """Point the clients at the fake server; tests set its per-model delays and failures."""
+    monkeypatch.setenv("OPENAI_BASE_URL", fake_openai_url)
+    monkeypatch.setattr(fake_openai_server, "DELAYS", {})
+    monkeypatch.setattr(fake_openai_server, "FAILING", set())
+    monkeypatch.setattr(fake_openai_server, "CHUNK_DELAY", 0.05)
+    llm_service.get_async_client.cache_clear()
+    llm_service.get_async_client()   # import openai outside the timed calls
+    yield fake_openai_server
+    llm_service.get_async_client.cache_clear()
+
+def _prompt() -> str:
+    return f"Household water use {uuid.uuid4().hex}"   # never a cache hit
+
+def _models(questions):
+    return {q["ai_metadata"]["model"] for q in questions}
+
+def test_hedge_fires_after_budget(fake_openai, caplog):
+    fake_openai.DELAYS.update({PRIMARY: 3.0, FALLBACK: 0.0})
+    start = time.perf_counter()
+    with caplog.at_level(logging.WARNING):
+        questions = asyncio.run(llm_service.generate_questions_async(_prompt(), 3, hedge_after=0.3))
+    elapsed = time.perf_counter() - start
+    assert _models(questions) == {FALLBACK}
+    assert 0.3 <= elapsed < 2.0
+    assert f"{PRIMARY} not answered in 0.3s, hedging with {FALLBACK}" in caplog.text
+
+def test_first_valid_result_wins(fake_openai):
+    # Hedged at 0.1s, but the primary still answers first
+    fake_openai.DELAYS.update({PRIMARY: 0.4, FALLBACK: 1.5})
+    start = time.perf_counter()
+    questions = asyncio.run(llm_service.generate_questions_async(_prompt(), 3, hedge_after=0.1))
+    assert _models(questions) == {PRIMARY}
+    assert time.perf_counter() - start < 1.2   # the slower fallback was cancelled, not awaited
+
+def test_failed_primary_hedges_at_once_and_says_why(fake_openai, caplog):
+    fake_openai.FAILING.add(PRIMARY)
+    start = time.perf_counter()
+    with caplog.at_level(logging.WARNING):
+        questions = asyncio.run(llm_service.generate_questions_async(_prompt(), 3, hedge_after=5))
+    assert _models(questions) == {FALLBACK}
+    assert time.perf_counter() - start < 2.0
+    assert f"{PRIMARY} failed (" in caplog.text
+    assert "not answered in" not in caplog.text
+
+def test_deadline_returns_default_questions(fake_openai, monkeypatch):
+    monkeypatch.setattr(llm_service, "LLM_TIMEOUT", 0.5)
+    llm_service.get_async_client.cache_clear()
+    llm_service.get_async_client()
+    fake_openai.DELAYS.update({PRIMARY: 3.0, FALLBACK: 3.0})
+    start = time.perf_counter()
+    questions = asyncio.run(llm_service.generate_questions_async(_prompt(), 3, hedge_after=0.1))
+    assert questions == llm_service.fallback_questions()
+    assert time.perf_counter() - start < 1.5
+
+def test_stream_yields_each_question_as_parsed(fake_openai):
+    async def collect():
+        arrivals = []
+        start = time.perf_counter()
+        async for q in llm_service.stream_questions(_prompt(), 4):
+            arrivals.append((time.perf_counter() - start, q))
+        return arrivals
+
+    arrivals = asyncio.run(collect())
+    assert len(arrivals) == 4
+    assert _models(q for _, q in arrivals) == {PRIMARY}
+    times = [t for t, _ in arrivals]
+    # Each question spans several 50 ms chunks, so they arrive spread out, not at the end
+    assert all(later - earlier >= 0.1 for earlier, later in zip(times, times[1:]))
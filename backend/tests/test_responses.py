@@ -0,0 +1,30 @@
+# backend/tests/test_responses.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.models import Question, Survey
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(create_app(schema="skip"))
+
+def test_submit_batch_at_documented_path(client, db):
+    survey = Survey(title="Batch")
+    survey.questions = [Question(question_text="Own a phone?", question_type="radio", options=["Yes", "No"], order_index=1)]
+    db.add(survey)
+    db.commit()
+    item = {"survey_id": survey.id, "question_id": survey.questions[0].id}
+
+    reply = client.post("/api/responses/submit-batch", json={"responses": [
+        {**item, "respondent_id": "r1", "answer": "Yes"},
+        {**item, "respondent_id": "r2", "answer": "Maybe"},
+        {**item, "respondent_id": "r1", "answer": "No"},
+    ]})
+    assert reply.status_code == 200
+    body = reply.json()
+    assert (body["inserted"], body["updated"]) == (2, 0)
+    assert [result["validation_status"] for result in body["results"]] == ["valid", "invalid", "valid"]
+    assert body["results"][0]["response_id"] == body["results"][2]["response_id"]
+    assert client.post("/api/responses/responses/submit-batch", json={"responses": []}).status_code in (404, 405)
@@ -0,0 +1,62 @@
+# backend/tests/test_session_state.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.session_state_service import MemoryStateStore, RedisStateStore, RespondentState
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    redis = pytest.importorskip("redis")
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url", lambda url: fakeredis.FakeRedis(server=server))
+    return RedisStateStore("redis://test")
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return MemoryStateStore()
+    return request.getfixturevalue("redis_store")
+
+def test_concurrent_submits_keep_every_answer(store):
+    store.put(RespondentState(1, "r1", {}, cursor=0, version=3))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda qid: store.record_answer(1, "r1", qid, f"a{qid}", version=3, rewind=None), range(50)))
+    assert store.get(1, "r1").answers == {qid: f"a{qid}" for qid in range(50)}
+
+def test_cursor_save_does_not_undo_a_concurrent_rewind(redis_store):
+    # In memory the step and the submit share one state object; across workers they do not
+    redis_store.put(RespondentState(1, "r1", {10: "Yes"}, cursor=5, version=3))
+    state = redis_store.get(1, "r1")
+    # A submit lands between the adaptive step's load and its save
+    redis_store.record_answer(1, "r1", 10, "No", version=3, rewind=2)
+    state.cursor = 7
+    redis_store.save(state)
+    fresh = redis_store.get(1, "r1")
+    assert fresh.answers == {10: "No"}
+    assert fresh.cursor == 2
+
+def test_answer_for_other_survey_version_resets_cursor(store):
+    store.put(RespondentState(1, "r1", {}, cursor=5, version=3))
+    store.record_answer(1, "r1", 10, "Yes", version=4, rewind=None)
+    assert store.get(1, "r1").cursor == 0
+
+def test_uncached_state_is_left_for_rebuild(store):
+    store.record_answer(1, "nobody", 10, "Yes", version=3, rewind=None)
+    assert store.get(1, "nobody") is None
+
+def test_rebuild_does_not_overwrite_a_state_cached_meanwhile(store):
+    # Another request rebuilt the state and recorded a submit while this one read the database
+    store.put(RespondentState(1, "r1", {10: "Yes"}, cursor=4, version=3))
+    store.record_answer(1, "r1", 11, "No", version=3, rewind=None)
+    state = store.add(RespondentState(1, "r1", {10: "stale", 12: "Maybe"}, cursor=0, version=3))
+    assert state.answers == {10: "Yes", 11: "No", 12: "Maybe"}
+    assert state.cursor == 4
+    assert store.get(1, "r1").answers == state.answers
+
+def test_rebuild_caches_a_missing_state(store):
+    state = store.add(RespondentState(1, "r2", {10: ["a", "b"]}, cursor=0, version=3))
+    assert (state.answers, state.version) == ({10: ["a", "b"]}, 3)
+    assert store.get(1, "r2").answers == {10: ["a", "b"]}
@@ -0,0 +1,39 @@
+# backend/tests/test_snapshot.py
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models import Question, Survey
+from app.services import analytics_service, response_service, snapshot_service
+
+@pytest.fixture
+def survey_id(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_service, "SNAPSHOT_DIR", str(tmp_path))
+    survey = Survey(title="Snapshot")
+    survey.questions = [
+        Question(question_text="Own a phone?", question_type="radio", options=["Yes", "No"], order_index=1),
+        Question(question_text="Household size", question_type="number", order_index=2),
+    ]
+    db.add(survey)
+    db.commit()
+    radio, number = (q.id for q in survey.questions)
+    rows = []
+    for i in range(30):
+        created_at = datetime(2024, 3, 1 + i % 3, 12, tzinfo=timezone.utc)
+        common = {"survey_id": survey.id, "respondent_id": f"r{i}", "language": "en", "created_at": created_at}
+        rows.append({**common, "question_id": radio, "answer": "Yes" if i % 2 else "No"})
+        rows.append({**common, "question_id": number, "answer": i % 7})
+    response_service.upsert_responses(db, rows)
+    db.commit()
+    snapshot_service.compact_survey(db, survey.id)
+    yield survey.id
+    snapshot_service.drop_snapshot(survey.id)
+
+@pytest.mark.parametrize("start, end", [(None, None), ("2024-03-02", None), (None, "2024-03-02"), ("2024-03-02", "2024-03-02")])
+def test_snapshot_counts_match_live_counts(db, survey_id, start, end):
+    live = analytics_service.generate_survey_analytics(survey_id, db, start, end, use_snapshot=False)
+    snapshot = analytics_service.generate_survey_analytics(survey_id, db, start, end)
+    assert snapshot.pop("source") == "snapshot"
+    live.pop("source")
+    assert snapshot == live
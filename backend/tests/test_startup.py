@@ -0,0 +1,15 @@
+# backend/tests/test_startup.py
+
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_migrate_mode_runs_from_backend_dir(tmp_path):
+    # The gunicorn profile and the Docker image both start from backend/
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URL=f"sqlite:///{tmp_path / 'migrate.db'}")
+    subprocess.run(
+        [sys.executable, "-c", "from app.main import prepare_database; prepare_database('migrate'); prepare_database('check')"],
+        cwd=BACKEND_DIR, env=env, check=True, timeout=120,
+    )
@@ -0,0 +1,27 @@
+# backend/tests/test_stt.py
+
+import asyncio
+import tempfile
+import threading
+
+from app.services import stt_service
+
+def test_spool_writes_to_disk_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(stt_service, "STT_SPOOL_MAX_BYTES", 10)
+    writers = []
+
+    class RecordingSpool(tempfile.SpooledTemporaryFile):
+        def write(self, data):
+            writers.append(threading.current_thread() is threading.main_thread())
+            return super().write(data)
+
+    monkeypatch.setattr(stt_service, "new_spool", lambda: RecordingSpool(max_size=stt_service.STT_SPOOL_MAX_BYTES))
+
+    async def chunks():
+        for part in (b"0123", b"4567", b"89ab", b"cdef"):
+            yield part
+
+    spool = asyncio.run(stt_service.spool_stream(chunks()))
+    assert spool.read() == b"0123456789abcdef"
+    # In-memory writes stay on the loop; the rollover and later disk writes do not
+    assert writers == [True, True, False, False]
@@ -0,0 +1,44 @@
+# backend/tests/test_survey_cache.py
+"""Cached survey definitions must follow edits made by other processes."""
+
+from sqlalchemy import update
+
+from app.database import engine
+from app.models import Question, Survey
+from app.services import survey_cache_service
+
+def _published_survey(db) -> Survey:
+    survey = Survey(title="Water use", survey_type="custom", status="published")
+    survey.questions = [Question(question_text="Do you own a well?", question_type="radio", options=["Yes", "No"], order_index=0)]
+    db.add(survey)
+    db.commit()
+    return survey
+
+def _edit_elsewhere(survey_id: int, text: str) -> None:
+    # What another worker's commit looks like here: new rows and version, no local invalidation
+    with engine.begin() as conn:
+        conn.execute(update(Question).where(Question.survey_id == survey_id).values(question_text=text))
+        conn.execute(update(Survey).where(Survey.id == survey_id).values(version=Survey.version + 1))
+
+def test_published_survey_sees_edits_from_other_workers(db):
+    survey = _published_survey(db)
+    compiled = survey_cache_service.get_compiled_survey(db, survey.id)
+    assert survey_cache_service.get_compiled_survey(db, survey.id) is compiled
+
+    _edit_elsewhere(survey.id, "Do you own a borewell?")
+    db.expire_all()
+    recompiled = survey_cache_service.get_compiled_survey(db, survey.id)
+    assert recompiled is not compiled
+    assert recompiled.version == compiled.version + 1
+    assert recompiled.questions[0].render("en").question_text == "Do you own a borewell?"
+
+def test_published_document_etag_changes_after_remote_edit(db):
+    survey = _published_survey(db)
+    before = survey_cache_service.get_survey_document(db, survey.id)
+    assert survey_cache_service.get_survey_document(db, survey.id) is before
+
+    _edit_elsewhere(survey.id, "Do you own a borewell?")
+    db.expire_all()
+    after = survey_cache_service.get_survey_document(db, survey.id)
+    assert after.etag != before.etag
+    assert b"borewell" in after.body
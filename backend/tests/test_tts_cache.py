@@ -0,0 +1,55 @@
+# backend/tests/test_tts_cache.py
+
+import sys
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.models import Question, Survey
+from app.services import job_service, tts_cache_service
+
+class FakeTTS:
+    def __init__(self, text, lang, slow=False):
+        self.text = text
+
+    def write_to_fp(self, fp):
+        fp.write(self.text.encode())
+
+def test_failed_synthesis_releases_key_lock(tmp_path, monkeypatch):
+    class BrokenTTS:
+        def __init__(self, **kwargs):
+            pass
+
+        def write_to_fp(self, fp):
+            raise ConnectionError("gTTS unreachable")
+
+    monkeypatch.setitem(sys.modules, "gtts", types.SimpleNamespace(gTTS=BrokenTTS))
+    monkeypatch.setattr(tts_cache_service, "TTS_CACHE_DIR", str(tmp_path))
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            tts_cache_service.get_or_synthesize("Do you own a well?", "en")
+    assert tts_cache_service._key_locks == {}
+    assert not any(path.is_file() for path in tmp_path.rglob("*"))
+
+def test_publish_prerenders_without_a_worker(db, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "gtts", types.SimpleNamespace(gTTS=FakeTTS))
+    monkeypatch.setattr(tts_cache_service, "TTS_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(job_service, "JOB_INPROCESS_THREADS", 0)
+    survey = Survey(title="Spoken", voice_enabled=True)
+    survey.questions = [Question(question_text="Do you own a well?", question_type="text", order_index=1)]
+    db.add(survey)
+    db.commit()
+
+    client = TestClient(create_app(schema="skip"))
+    accepted = client.post(f"/api/surveys/{survey.id}/publish", params={"background": True})
+    assert accepted.status_code == 202
+    assert "background of this request" in accepted.json()["note"]
+
+    # TestClient runs the background task before returning
+    job = client.get(accepted.json()["status_url"]).json()
+    assert job["status"] == "succeeded"
+    assert job["result"]["clips"] == 1
+    db.expire_all()
+    assert db.get(Question, survey.questions[0].id).audio_file_uri.startswith("/api/")
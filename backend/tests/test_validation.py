@@ -0,0 +1,40 @@
+# backend/tests/test_validation.py
+
+import pytest
+
+from app.models import Question
+from app.services.validation_service import ValidationPlan, option_codes
+
+def _plan(question_type, options, **fields):
+    return ValidationPlan(Question(question_text="Pick one", question_type=question_type, options=options, **fields))
+
+@pytest.mark.parametrize("answer", [None, 1, {"label": "1"}, [1], "None"])
+def test_radio_rejects_answers_that_are_not_option_labels(answer):
+    plan = _plan("radio", ["1", "2", "Other"])
+    assert plan.validate(answer)[0] == "invalid"
+    assert plan.validate("1")[0] == "valid"
+
+def test_radio_does_not_match_none_against_a_none_option():
+    plan = _plan("radio", ["None", "Some"])
+    assert plan.validate(None)[0] == "invalid"
+    assert plan.validate(" none ")[0] == "valid"
+
+@pytest.mark.parametrize("answer", [[None], [1, "Maps"], [{"Maps": True}], {"Maps": True}])
+def test_checkbox_rejects_non_label_elements(answer):
+    plan = _plan("checkbox", ["Maps", "1"])
+    assert plan.validate(answer)[0] == "invalid"
+
+def test_checkbox_matches_labels_in_any_case():
+    plan = _plan("checkbox", ["Maps", "Mail"], translations={"hi": {"options": ["नक्शा", "मेल"]}})
+    assert plan.validate(["maps", "मेल"])[0] == "valid"
+
+@pytest.mark.parametrize("answer", [None, 1, {"label": "1"}, [1], [None]])
+def test_no_option_code_for_answers_that_fail_validation(answer):
+    codes = option_codes(Question(question_type="radio", options=["1", "None"]))
+    assert codes.encode(answer) == (None, None)
+    assert not codes.valid(answer)
+
+def test_checkbox_mask_needs_every_element_to_be_a_label():
+    codes = option_codes(Question(question_type="checkbox", options=["Maps", "1"]))
+    assert codes.encode(["maps", "1"]) == (None, 0b11)
+    assert codes.encode(["maps", 1]) == (None, None)
@@ -0,0 +1,150 @@
+# backend/tests/test_write_buffer.py
+
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Question, Response, Survey
+from app.services import aggregate_service, response_service
+from app.services.write_buffer_service import WriteBuffer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Journals two answers in a separate process, lets only the first commit,
+# then dies without stopping the buffer (its segment stays on disk, unlocked)
+CRASHING_WORKER = textwrap.dedent("""
+    import os, sys, time
+    from app.services.write_buffer_service import WriteBuffer
+
+    journal_dir, survey_id, question_id = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    buffer = WriteBuffer(journal_dir=journal_dir, flush_interval=3600, flush_max_rows=1000)
+    buffer.start()
+
+    def row(respondent_id, answer):
+        return {"survey_id": survey_id, "question_id": question_id, "respondent_id": respondent_id,
+                "answer": answer, "language": "en", "validation_status": "valid"}
+
+    buffer.submit([row("r1", "Yes")]).result()
+    buffer._flush_now.set()
+    while buffer.pending_count():
+        time.sleep(0.01)
+    buffer.submit([row("r2", "Yes")]).result()   # journaled, never committed
+    os._exit(0)
+""")
+
+@pytest.fixture
+def radio_question(db):
+    survey = Survey(title="Write-behind")
+    db.add(survey)
+    db.flush()
+    question = Question(survey_id=survey.id, question_text="Own a phone?", question_type="radio", options=["Yes", "No"], order_index=1)
+    db.add(question)
+    db.commit()
+    return survey.id, question.id
+
+def _answers(db, survey_id):
+    rows = db.execute(select(Response.respondent_id, Response.answer).where(Response.survey_id == survey_id))
+    return dict(rows.all())
+
+def _row(survey_id, question_id, respondent_id, answer):
+    return {
+        "survey_id": survey_id, "question_id": question_id, "respondent_id": respondent_id,
+        "answer": answer, "language": "en", "validation_status": "valid",
+        "submitted_at": datetime.now(timezone.utc),
+    }
+
+def test_replay_after_crash_keeps_newer_answers(db, radio_question, tmp_path):
+    survey_id, question_id = radio_question
+    subprocess.run(
+        [sys.executable, "-c", CRASHING_WORKER, str(tmp_path), str(survey_id), str(question_id)],
+        cwd=BACKEND_DIR, env=os.environ, check=True, timeout=60,
+    )
+    assert _answers(db, survey_id) == {"r1": "Yes"}
+
+    # r1 answers again through another worker before the crashed one restarts
+    response_service.upsert_responses(db, [_row(survey_id, question_id, "r1", "No")])
+    db.commit()
+
+    assert WriteBuffer(journal_dir=str(tmp_path)).recover() == 2
+    db.expire_all()
+    assert _answers(db, survey_id) == {"r1": "No", "r2": "Yes"}
+    assert not list(tmp_path.glob("segment-*.jsonl"))
+    # Skipped replays left the incremental counts exact
+    assert aggregate_service.rebuild_survey_aggregates(db, survey_id)["drifted_buckets"] == 0
+
+def test_later_submit_wins_across_groups(db, radio_question, tmp_path):
+    survey_id, question_id = radio_question
+    buffer = WriteBuffer(journal_dir=str(tmp_path), flush_interval=0.01, flush_max_rows=1)
+    buffer.start()
+    try:
+        for answer in ("Yes", "No", "Yes", "No"):
+            buffer.submit([_row(survey_id, question_id, "r1", answer)]).result()
+    finally:
+        buffer.stop()
+    assert _answers(db, survey_id) == {"r1": "No"}
+    assert not list(tmp_path.glob("segment-*.jsonl"))
+    assert aggregate_service.rebuild_survey_aggregates(db, survey_id)["drifted_buckets"] == 0
+
+def test_refused_rows_are_counted_as_rejected(db, radio_question, tmp_path):
+    survey_id, question_id = radio_question
+    buffer = WriteBuffer(journal_dir=str(tmp_path), flush_interval=0.01)
+    buffer.start()
+    try:
+        refused = {**_row(survey_id, question_id, "r2", "No"), "respondent_id": None}   # NOT NULL
+        buffer.submit([_row(survey_id, question_id, "r1", "Yes"), refused]).result()
+    finally:
+        buffer.stop()
+    assert _answers(db, survey_id) == {"r1": "Yes"}
+    assert buffer.rejected_count() == 1
+
+class SlowSegmentListBuffer(WriteBuffer):
+    """
+    Stretches both sides of a rotate/release race: the journal thread pauses
+    before touching _closed_segments, the flush thread before replacing it.
+    """
+
+    @property
+    def _closed_segments(self):
+        if threading.current_thread().name == "response-journal":
+            time.sleep(0.001)
+        return self.__dict__["_closed_segments"]
+
+    @_closed_segments.setter
+    def _closed_segments(self, value):
+        if threading.current_thread().name == "response-flusher":
+            time.sleep(0.001)
+        self.__dict__["_closed_segments"] = value
+
+def test_segments_rotated_while_flushing_are_released(db, radio_question, tmp_path):
+    survey_id, question_id = radio_question
+    # Every journal write rotates, every row is its own group: rotation and release race constantly
+    buffer = SlowSegmentListBuffer(journal_dir=str(tmp_path), flush_interval=0.001, flush_max_rows=1, fsync=False, segment_bytes=1)
+    buffer.start()
+
+    def submit_many(worker):
+        for i in range(50):
+            buffer.submit([_row(survey_id, question_id, f"w{worker}-{i}", "Yes")]).result()
+
+    threads = [threading.Thread(target=submit_many, args=(worker,)) for worker in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        deadline = time.monotonic() + 30
+        while buffer.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Everything committed: only the open segment may remain
+        assert [path for path, _, _ in buffer._closed_segments] == []
+        assert [p.name for p in tmp_path.glob("segment-*.jsonl")] == [os.path.basename(buffer._segment_path)]
+    finally:
+        buffer.stop()
+    assert len(_answers(db, survey_id)) == 200
+    assert not list(tmp_path.glob("segment-*.jsonl"))